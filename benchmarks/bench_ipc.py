@@ -0,0 +1,61 @@
+"""Shared memory benchmarks
+
+- SharedMemArrayManager create, load and update cost
+- SharedMemMultiBuffer write and read cost (positions exchange)
+
+"""
+
+import numpy as np
+
+from common import measure, record
+
+from helios.layouts.ipc_tools import SharedMemArrayManager
+from helios.layouts.ipc_tools import SharedMemMultiBuffer
+
+
+def bench_shared_mem_array(sizes, repeat=10):
+    results = []
+    for num_nodes in sizes:
+        data = np.random.normal(size=(num_nodes, 3)).astype('float32')
+
+        def create():
+            SharedMemArrayManager(dtype='float32', data=data).cleanup()
+
+        stats = measure(create, repeat=repeat)
+        results.append(record('shared_mem_array.create', num_nodes, stats))
+
+        shm = SharedMemArrayManager(dtype='float32', data=data)
+
+        def load():
+            SharedMemArrayManager(
+                dtype='float32', buffer_name=shm._buffer_name).cleanup()
+
+        stats = measure(load, repeat=repeat)
+        results.append(record('shared_mem_array.load', num_nodes, stats))
+
+        def update():
+            shm._repr[:] = data
+
+        stats = measure(update, repeat=repeat)
+        results.append(record('shared_mem_array.update', num_nodes, stats))
+        shm.cleanup()
+    return results
+
+
+def bench_multi_buffer(sizes, repeat=10):
+    results = []
+    for num_nodes in sizes:
+        data = np.random.normal(size=(num_nodes, 3)).astype('float32')
+        out = np.empty_like(data)
+        shm = SharedMemMultiBuffer(dtype='float32', data=data)
+        stats = measure(lambda: shm.write(data), repeat=repeat)
+        results.append(record('multi_buffer.write', num_nodes, stats))
+        stats = measure(lambda: shm.read(out), repeat=repeat)
+        results.append(record('multi_buffer.read', num_nodes, stats))
+        shm.cleanup()
+    return results
+
+
+def run(sizes, repeat=10):
+    return bench_shared_mem_array(sizes, repeat=repeat) + \
+        bench_multi_buffer(sizes, repeat=repeat)
@@ -0,0 +1,79 @@
+"""Layout throughput benchmarks
+
+- HeliosFr.steps: iterations per second of the octree solver
+- MDEServerCalc.start: iterations per second of the MDE server loop,
+  executed in the current process over real shared memory resources
+
+"""
+
+import numpy as np
+
+from common import measure, record, synthetic_graph
+
+
+class _DrawStub:
+    """The minimal NetworkDraw interface used by the layouts"""
+    def __init__(self, positions):
+        self.positions = positions
+        self._is_2d = False
+
+    def refresh(self):
+        pass
+
+
+def bench_heliosfr(sizes, iterations=20, repeat=3, max_workers=8):
+    from helios.layouts import HeliosFr
+
+    results = []
+    for num_nodes in sizes:
+        edges, positions = synthetic_graph(num_nodes)
+        layout = HeliosFr(
+            edges, _DrawStub(positions), max_workers=max_workers)
+        stats = measure(
+            lambda: layout.steps(iterations), repeat=repeat)
+        results.append(record(
+            'heliosfr.steps', num_nodes, stats, len(edges),
+            iterations=iterations,
+            iterations_per_second=iterations/stats['mean']))
+    return results
+
+
+def bench_mde_server(sizes, steps=10, iters_by_step=5, repeat=3):
+    try:
+        from helios.layouts.mde import MDEServerCalc
+    except ImportError:
+        return []
+    from helios.layouts.ipc_tools import ShmManagerMultiArrays
+
+    results = []
+    for num_nodes in sizes:
+        edges, positions = synthetic_graph(num_nodes)
+        shm_manager = ShmManagerMultiArrays()
+        shm_manager.add_multi_buffer('positions', positions[:, 0:2], 'float32')
+        shm_manager.add_array(
+            'info', np.zeros(4, dtype='float32'), 'float32')
+        shm_manager.add_array('edges', edges, 'int64')
+
+        def setup():
+            return MDEServerCalc(
+                edges_buffer_name=shm_manager.edges._buffer_name,
+                positions_buffer_name=shm_manager.positions._buffer_name,
+                info_buffer_name=shm_manager.info._buffer_name,
+                constraint_name='standardized',
+            )
+
+        stats = measure(
+            lambda server: server.start(steps, iters_by_step),
+            repeat=repeat, setup=setup)
+        iterations = steps*iters_by_step
+        results.append(record(
+            'mde_server.start', num_nodes, stats, len(edges),
+            iterations=iterations,
+            iterations_per_second=iterations/stats['mean']))
+        shm_manager.cleanup()
+    return results
+
+
+def run(sizes, repeat=3):
+    return bench_heliosfr(sizes, repeat=repeat) + \
+        bench_mde_server(sizes, repeat=repeat)
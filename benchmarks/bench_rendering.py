@@ -0,0 +1,77 @@
+"""Rendering hot paths benchmarks
+
+- FurySuperNode.positions and FurySuperEdge.positions update cost
+- NetworkDraw.refresh frame time using an offscreen window
+
+"""
+
+import numpy as np
+
+from common import measure, record, synthetic_graph
+
+from helios import NetworkDraw
+
+
+def _offscreen_draw(positions, edges, **kwargs):
+    # the render window is offscreen before its first render, so no X11
+    # window is opened and refresh times the offscreen frame
+    return NetworkDraw(
+        positions=positions, edges=edges, window_size=(600, 600),
+        offscreen=True, **kwargs)
+
+
+def bench_actors(sizes, repeat=10, **draw_kwargs):
+    results = []
+    for num_nodes in sizes:
+        edges, positions = synthetic_graph(num_nodes)
+        network_draw = _offscreen_draw(positions, edges, **draw_kwargs)
+        new_positions = positions + 1
+
+        def update_nodes():
+            network_draw.nodes.positions = new_positions
+
+        stats = measure(update_nodes, repeat=repeat)
+        results.append(record(
+            'super_node.positions', num_nodes, stats, len(edges),
+            **draw_kwargs))
+
+        def update_edges():
+            network_draw.edges.positions = new_positions
+
+        stats = measure(update_edges, repeat=repeat)
+        results.append(record(
+            'super_edge.positions', num_nodes, stats, len(edges),
+            **draw_kwargs))
+    return results
+
+
+def bench_refresh(sizes, repeat=10, **draw_kwargs):
+    results = []
+    for num_nodes in sizes:
+        edges, positions = synthetic_graph(num_nodes)
+        network_draw = _offscreen_draw(positions, edges, **draw_kwargs)
+        network_draw.refresh()
+        rng = np.random.default_rng(0)
+
+        def move_and_refresh():
+            network_draw.positions = positions + rng.normal(
+                scale=.01, size=positions.shape).astype('float32')
+            network_draw.refresh()
+
+        stats = measure(network_draw.refresh, repeat=repeat)
+        results.append(record(
+            'network_draw.refresh', num_nodes, stats, len(edges),
+            fps=1/stats['mean'], **draw_kwargs))
+        stats = measure(move_and_refresh, repeat=repeat)
+        results.append(record(
+            'network_draw.positions_and_refresh', num_nodes, stats,
+            len(edges), fps=1/stats['mean'], **draw_kwargs))
+    return results
+
+
+def run(sizes, repeat=10):
+    results = []
+    for draw_kwargs in [{}, {'better_performance': True}]:
+        results += bench_actors(sizes, repeat=repeat, **draw_kwargs)
+        results += bench_refresh(sizes, repeat=repeat, **draw_kwargs)
+    return results
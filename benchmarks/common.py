@@ -0,0 +1,120 @@
+"""Shared helpers of the Helios benchmarks"""
+
+import platform
+import time
+
+import numpy as np
+
+
+def synthetic_graph(num_nodes, avg_degree=4, seed=0):
+    """Return a random graph with approximately avg_degree edges by node
+
+    The edges are sampled uniformly (Erdős–Rényi like) without self loops.
+    Duplicated edges are kept, which doesn't matter for the benchmarks.
+
+    Parameters
+    ----------
+    num_nodes : int
+    avg_degree : float, optional, default 4
+    seed : int, optional
+
+    Returns
+    -------
+    edges : ndarray
+        array with shape (n_edges, 2) and dtype int64
+    positions : ndarray
+        random initial positions with shape (num_nodes, 3)
+
+    """
+    rng = np.random.default_rng(seed)
+    num_edges = int(num_nodes*avg_degree/2)
+    sources = rng.integers(0, num_nodes, num_edges)
+    offsets = rng.integers(1, num_nodes, num_edges)
+    targets = (sources + offsets) % num_nodes
+    edges = np.c_[sources, targets].astype(np.int64)
+    positions = rng.normal(size=(num_nodes, 3)).astype(np.float32)
+    return edges, positions
+
+
+def measure(func, repeat=5, warmup=1, setup=None):
+    """Measure the wall time of a function
+
+    Parameters
+    ----------
+    func : callable
+        receives the value returned by setup (if any)
+    repeat : int, optional, default 5
+    warmup : int, optional, default 1
+        calls which are not measured
+    setup : callable, optional
+        called before each measure, its time is not taken into account
+
+    Returns
+    -------
+    stats : dict
+        mean, std, min and max in seconds and the number of repeats
+
+    """
+    times = []
+    for i in range(warmup + repeat):
+        args = () if setup is None else (setup(), )
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            times.append(elapsed)
+    times = np.array(times)
+    return {
+        'mean': float(times.mean()),
+        'std': float(times.std()),
+        'min': float(times.min()),
+        'max': float(times.max()),
+        'repeat': int(repeat),
+    }
+
+
+def record(benchmark, num_nodes, stats, num_edges=None, **extra):
+    """Build a result entry
+
+    Parameters
+    ----------
+    benchmark : str
+    num_nodes : int
+    stats : dict
+        returned by measure
+    num_edges : int, optional
+    **extra : values, optional
+        other information, like the number of iterations
+
+    Returns
+    -------
+    entry : dict
+
+    """
+    entry = {
+        'benchmark': benchmark,
+        'num_nodes': int(num_nodes),
+        'num_edges': None if num_edges is None else int(num_edges),
+        'unit': 's',
+    }
+    entry.update(stats)
+    entry.update(extra)
+    return entry
+
+
+def metadata():
+    """Return information about the environment of the run"""
+    versions = {'numpy': np.__version__}
+    for module_name in ['vtk', 'fury', 'torch', 'pymde', 'heliosFR']:
+        try:
+            module = __import__(module_name)
+            versions[module_name] = getattr(module, '__version__', None)
+        except ImportError:
+            versions[module_name] = None
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'versions': versions,
+    }
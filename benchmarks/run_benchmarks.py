@@ -0,0 +1,58 @@
+"""Run the Helios benchmarks and write the results as JSON
+
+Examples
+--------
+
+    $ python benchmarks/run_benchmarks.py --sizes 1000 10000 100000
+    $ python benchmarks/run_benchmarks.py --suites ipc --output ipc.json
+
+"""
+
+import argparse
+import json
+import sys
+
+from common import metadata
+
+SUITES = ['layouts', 'ipc', 'rendering']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+        help='number of nodes of the synthetic graphs')
+    parser.add_argument(
+        '--suites', nargs='+', default=SUITES, choices=SUITES)
+    parser.add_argument(
+        '--repeat', type=int, default=None,
+        help='number of measures by benchmark')
+    parser.add_argument(
+        '--output', default=None,
+        help='path of the JSON file. If not given, the JSON is printed')
+    args = parser.parse_args(argv)
+
+    results = []
+    for suite in args.suites:
+        module = __import__(f'bench_{suite}')
+        kwargs = {} if args.repeat is None else {'repeat': args.repeat}
+        suite_results = module.run(args.sizes, **kwargs)
+        for entry in suite_results:
+            entry['suite'] = suite
+            print(
+                f'{entry["benchmark"]:40s} {entry["num_nodes"]:>9d} '
+                f'{entry["mean"]*1000:10.3f} ms', file=sys.stderr)
+        results += suite_results
+
+    report = {'metadata': metadata(), 'results': results}
+    report['metadata']['sizes'] = args.sizes
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,9 @@
 API reference
 """
 from helios.backends.fury.draw import NetworkDraw
+from helios.backends.fury.offscreen import BatchRenderer
 
 __version__ = '0.1.0'
 __release__ = 'beta'
 
-__all__ = ['NetworkDraw']
+__all__ = ['NetworkDraw', 'BatchRenderer']
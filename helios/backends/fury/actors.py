@@ -7,6 +7,7 @@ network visualization.
 """
 
 import numpy as np
+from vtkmodules.util import numpy_support
 from fury.shaders import add_shader_callback, attribute_to_actor
 from fury.shaders import shader_to_actor, load
 import fury.primitive as fp
@@ -14,6 +15,9 @@ from fury.utils import get_actor_from_primitive
 from fury.utils import vertices_from_actor, array_from_actor
 from fury.utils import update_actor
 from fury.actor import line as line_actor
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData
+from vtkmodules.vtkRenderingCore import vtkActor, vtkPolyDataMapper
 try:
     from fury.shaders import shader_apply_effects
 except ImportError:
@@ -21,12 +25,57 @@ except ImportError:
 
 from fury import window
 
+from helios.backends.fury.aggregation import FuryEdgeDensity
 from helios.backends.fury.tools import Uniform, Uniforms
+from helios.core import instrumentation
+from helios.core.spatial import SpatialIndex
+from helios.core.network import edges_and_weights
 
 _MARKER2Id = {
     'o': 0, 's': 1, 'd': 2, '^': 3, 'p': 4,
     'h': 5, 's6': 6, 'x': 7, '+': 8, '3d': 0}
 
+# node attributes stored by vertex: the numpy view of the VTK array, the
+# name of the VTK array and the flag of the uniform (shared) variant
+_NODE_ATTRIBUTES = {
+    'colors': ('_colors_geo', 'colors', None),
+    'marker': ('_marker', 'vMarker', '_marker_is_uniform'),
+    'edge_width': ('_edge_width', 'vEdgeWidth', '_edge_width_is_uniform'),
+    'edge_color': ('_edge_color', 'vEdgeColor', '_edge_color_is_uniform'),
+    'edge_opacity': (
+        '_edge_opacity', 'vEdgeOpacity', '_edge_opacity_is_uniform'),
+    'marker_opacity': (
+        '_marker_opacity', 'vMarkerOpacity', '_marker_opacity_is_uniform'),
+}
+
+# Billboard vertex shader used when the vertex buffer stores only the
+# node centers. The corner of each billboard comes from the vOffset
+# attribute, which never changes after the actor creation.
+_OFFSET_BILLBOARD_DEC_VERT = """
+/* Billboard vertex shader declaration (centers as vertices) */
+in vec3 vOffset;
+
+out vec3 centerVertexMCVSOutput;
+out vec3 normalizedVertexMCVSOutput;
+"""
+
+_OFFSET_BILLBOARD_IMPL_VERT = """
+/* Billboard vertex shader implementation (centers as vertices) */
+vec3 center = vertexMC.xyz;
+centerVertexMCVSOutput = center;
+normalizedVertexMCVSOutput = vOffset; // 1st Norm. [-scale, scale]
+float scalingFactor = 1. / abs(normalizedVertexMCVSOutput.x);
+float size = abs(normalizedVertexMCVSOutput.x) * 2;
+normalizedVertexMCVSOutput *= scalingFactor; // 2nd Norm. [-1, 1]
+vec2 billboardSize = vec2(size, size);
+vec3 cameraRightMC = vec3(MCVCMatrix[0][0], MCVCMatrix[1][0], MCVCMatrix[2][0]);
+vec3 cameraUpMC = vec3(MCVCMatrix[0][1], MCVCMatrix[1][1], MCVCMatrix[2][1]);
+vec3 vertexPositionMC = center +
+    cameraRightMC * billboardSize.x * normalizedVertexMCVSOutput.x +
+    cameraUpMC * billboardSize.y * normalizedVertexMCVSOutput.y;
+gl_Position = MCDCMatrix * vec4(vertexPositionMC, 1.);
+"""
+
 
 class FurySuperNode:
     def __init__(
@@ -39,10 +88,33 @@ class FurySuperNode:
         edge_opacity=1,
         edge_color=(1, 1, 1),
         marker_opacity=.8,
-        write_frag_depth=True
+        write_frag_depth=True,
+        shader_offsets=False,
     ):
+        """
+
+        Parameters
+        ----------
+        positions : ndarray
+            Array of the nodes positions.
+        colors : tuple or ndarray, optional
+        scales : float or ndarray, optional
+        marker : str or list, optional
+        edge_width : float or ndarray, optional
+        edge_opacity : float or ndarray, optional
+        edge_color : tuple or ndarray, optional
+        marker_opacity : float or ndarray, optional
+        write_frag_depth : bool, optional
+        shader_offsets : bool, optional, default False
+            If True, the vertex buffer stores only the node centers as
+            float32 and the billboard corners are applied in the vertex
+            shader. A position update is then a single broadcast write
+            into the buffer viewed by VTK, without any temporary array.
+
+        """
         self._vcount = positions.shape[0]
         self._composed_by_superactors = False
+        self._shader_offsets = shader_offsets
 
         # to avoid any kind of expansive calculations when we
         # are dealing with just 2d markers
@@ -60,6 +132,10 @@ class FurySuperNode:
         self._positions_is_uniform = False
         self._init_actor(
             positions.shape[0], colors, scales)
+        # VTK arrays written since the last render
+        self._dirty_attributes = set()
+        self._attributes_observer = self.vtk_actor.GetMapper().AddObserver(
+            'StartEvent', self._upload_attributes)
         self.positions = positions
         self.uniforms_list = []
 
@@ -122,13 +198,28 @@ class FurySuperNode:
         actor.GetMapper().SetVBOShiftScaleMethod(False)
         actor.GetProperty().BackfaceCullingOff()
 
-        attribute_to_actor(actor, big_centers, 'center')
+        self._centers_length = int(big_centers.shape[0] / num_nodes)
+        # half size of each billboard in world units
+        self._radii = 2*np.abs(big_verts[:, 0] - big_centers[:, 0]).reshape(
+            num_nodes, self._centers_length).max(axis=1)
+        if self._shader_offsets:
+            attribute_to_actor(actor, big_verts - big_centers, 'vOffset')
+            # the VTK points array views this buffer directly
+            self._centers_geo = np.zeros(
+                (big_centers.shape[0], 3), dtype='float32')
+            self._centers_vtk = numpy_support.numpy_to_vtk(
+                self._centers_geo, deep=False)
+            actor.GetMapper().GetInput().GetPoints().SetData(
+                self._centers_vtk)
+            self._verts_geo = self._centers_geo
+        else:
+            attribute_to_actor(actor, big_centers, 'center')
 
-        self._centers_geo = array_from_actor(actor, array_name="center")
-        self._centers_geo_orig = np.array(self._centers_geo)
-        self._centers_length = int(self._centers_geo.shape[0] / num_nodes)
-        self._verts_geo = vertices_from_actor(actor)
-        self._verts_geo_orig = np.array(self._verts_geo)
+            self._centers_vtk = array_from_actor(
+                actor, array_name="center", as_vtk=True)
+            self._centers_geo = array_from_actor(actor, array_name="center")
+            self._verts_geo = vertices_from_actor(actor)
+            self._verts_geo_orig = np.array(self._verts_geo)
 
         self._colors_geo = array_from_actor(actor, array_name="colors")
 
@@ -229,7 +320,10 @@ class FurySuperNode:
 
     @property
     def shader_dec_vert(self):
-        shader = load("billboard_dec.vert")
+        if self._shader_offsets:
+            shader = _OFFSET_BILLBOARD_DEC_VERT
+        else:
+            shader = load("billboard_dec.vert")
         if not self._marker_is_3d and not self._marker_is_uniform:
             shader += """
                     in float vMarker;\n
@@ -247,7 +341,10 @@ class FurySuperNode:
 
     @property
     def shader_impl_vert(self):
-        shader = load("billboard_impl.vert")
+        if self._shader_offsets:
+            shader = _OFFSET_BILLBOARD_IMPL_VERT
+        else:
+            shader = load("billboard_impl.vert")
         if not self._marker_is_3d and not self._marker_is_uniform:
             shader += "marker = vMarker;\n"
         if not self._edge_width_is_uniform:
@@ -543,9 +640,7 @@ class FurySuperNode:
         if self._edge_width_is_uniform:
             self.Uniforms.edgeWidth.value = data
         else:
-            self._edge_width[:] = np.repeat(
-                data, self._centers_length, axis=0)
-            self.update()
+            self._write_attribute('edge_width', slice(None), data)
 
     @property
     def marker(self):
@@ -564,11 +659,7 @@ class FurySuperNode:
                 data = _MARKER2Id[data]
             self.Uniforms.marker.value = data
         else:
-            if isinstance(data[0], str):
-                data = [_MARKER2Id[i] for i in data]
-            self._marker[:] = np.repeat(
-                data, self._centers_length, axis=0)
-            self.update()
+            self._write_attribute('marker', slice(None), data)
 
     @property
     def edge_color(self):
@@ -582,9 +673,7 @@ class FurySuperNode:
         if self._edge_color_is_uniform:
             self.Uniforms.edgeColor.value = data
         else:
-            self._edge_color[:] = np.repeat(
-                data, self._centers_length, axis=0)
-            self.update()
+            self._write_attribute('edge_color', slice(None), data)
 
     @property
     def marker_opacity(self):
@@ -598,9 +687,7 @@ class FurySuperNode:
         if self._marker_opacity_is_uniform:
             self.Uniforms.markerOpacity.value = data
         else:
-            self._marker_opacity[:] = np.repeat(
-                data, self._centers_length, axis=0)
-            self.update()
+            self._write_attribute('marker_opacity', slice(None), data)
 
     @property
     def edge_opacity(self):
@@ -614,9 +701,7 @@ class FurySuperNode:
         if self._edge_opacity_is_uniform:
             self.Uniforms.edgeOpacity.value = data
         else:
-            self._edge_opacity[:] = np.repeat(
-                data, self._centers_length, axis=0)
-            self.update()
+            self._write_attribute('edge_opacity', slice(None), data)
 
     @property
     def specular_strength(self):
@@ -648,11 +733,20 @@ class FurySuperNode:
 
     @positions.setter
     def positions(self, positions):
-        # avoids memory corruption
-        self._centers_geo[:] = np.repeat(
-            positions, self._centers_length, axis=0).astype('float64')
-        self._verts_geo[:] = self._verts_geo_orig + self._centers_geo
-        self.update()
+        # broadcast each center to all the vertices of its billboard
+        # writing in place to avoid memory corruption and temporaries
+        with instrumentation.timer('nodes.positions'):
+            dimension = positions.shape[1]
+            centers = self._centers_geo.reshape(
+                self._vcount, self._centers_length, 3)
+            centers[:, :, 0:dimension] = positions[:, np.newaxis, :]
+            # only the centers (and the vertices) are uploaded again,
+            # the attribute arrays keep their modification time
+            update_actor(self.vtk_actor, all_arrays=False)
+            if not self._shader_offsets:
+                np.add(self._verts_geo_orig, self._centers_geo,
+                       out=self._verts_geo)
+                self._centers_vtk.Modified()
 
     @property
     def colors(self):
@@ -660,11 +754,81 @@ class FurySuperNode:
 
     @colors.setter
     def colors(self, new_colors):
-        self._colors_geo[:] = np.repeat(
-            new_colors, self._centers_length, axis=0)
+        self._write_attribute('colors', slice(None), new_colors)
+
+    def _write_attribute(self, name, nodes, values):
+        """Write the values of an attribute in the vertices of the nodes
+
+        The VTK array is only marked as dirty, it's uploaded once at the
+        start of the next render.
+
+        """
+        view_name, array_name, uniform_flag = _NODE_ATTRIBUTES[name]
+        if uniform_flag is not None and getattr(self, uniform_flag):
+            raise ValueError(
+                f'{name} is uniform, it cannot be set by node')
+        if name == 'marker':
+            if self._marker_is_3d:
+                raise ValueError('3d markers cannot be changed')
+            if not np.isscalar(values) and isinstance(values[0], str):
+                values = [_MARKER2Id[marker] for marker in values]
+            elif isinstance(values, str):
+                values = _MARKER2Id[values]
+        view = getattr(self, view_name)
+        by_vertex = view.reshape(self._vcount, self._centers_length, -1)
+        components = by_vertex.shape[2]
+        values = np.asarray(values)
+        if components > 1 and values.ndim == 1:
+            # the same vector for all the nodes
+            values = values[np.newaxis]
+        by_vertex[nodes] = values.reshape(-1, 1, components)
+        self._dirty_attributes.add(array_name)
+
+    def set_node_attributes(self, nodes, **values):
+        """Set the attributes of a subset of the nodes
+
+        Only the vertices of the given nodes are written and each
+        modified attribute is uploaded once at the start of the next
+        render, so many changes made between two frames are coalesced.
+
+        Parameters
+        ----------
+        nodes : array
+            indices of the nodes
+        **values : optional
+            values by node, or a single value for all the nodes, of the
+            attributes colors, marker, edge_width, edge_color,
+            edge_opacity or marker_opacity. The attribute must have been
+            created by node.
+
+        Examples
+        --------
+
+            >>> nodes.set_node_attributes(
+            ...     [3, 7, 9], colors=(255, 0, 0), edge_width=.2)
+
+        """
+        unknown = set(values) - set(_NODE_ATTRIBUTES)
+        if unknown:
+            raise ValueError(f'unknown node attributes: {sorted(unknown)}')
+        nodes = np.asarray(nodes, dtype=np.int64)
+        with instrumentation.timer('nodes.set_attributes'):
+            for name, value in values.items():
+                self._write_attribute(name, nodes, value)
+
+    def _upload_attributes(self, caller=None, event=None):
+        if not self._dirty_attributes:
+            return
+        point_data = self.vtk_actor.GetMapper().GetInput().GetPointData()
+        for array_name in self._dirty_attributes:
+            point_data.GetArray(array_name).Modified()
+        instrumentation.count(
+            'nodes.attribute_uploads', len(self._dirty_attributes))
+        self._dirty_attributes.clear()
 
     def update(self):
         update_actor(self.vtk_actor)
+        self._dirty_attributes.clear()
 
     def __str__(self):
         return f'FurySuperActorNode num_nodes {self._vcount}'
@@ -682,16 +846,43 @@ class FurySuperEdge:
         opacity=.5,
         line_width=3,
         blending='additive',
+        nodes=None,
     ):
+        """
 
+        Parameters
+        ----------
+        edges : ndarray
+            Array of the edges with shape (n_edges, 2).
+        positions : ndarray
+            Array of the nodes positions.
+        colors : tuple or ndarray
+            The color of the edges. If nodes is None this can be a
+            color by edge endpoint, otherwise a single color or one
+            color by node.
+        opacity : float, optional
+        line_width : float, optional
+        blending : str, optional
+        nodes : FurySuperNode, optional
+            If given, the edges are drawn through an index buffer
+            (the edges themselves) over the node centers buffer,
+            which is shared with the FurySuperNode. Moving the nodes
+            then requires no work on the edges side.
+
+        """
         self.edges = edges
         self._num_edges = len(self.edges)
-        self.vtk_actor = line_actor(
-            np.zeros((self._num_edges, 2, 3)),
-            colors=colors,
-            linewidth=line_width,
-            opacity=opacity
-        )
+        self._nodes = nodes
+        if nodes is None:
+            self.vtk_actor = line_actor(
+                np.zeros((self._num_edges, 2, 3)),
+                colors=colors,
+                linewidth=line_width,
+                opacity=opacity
+            )
+        else:
+            self.vtk_actor = self._init_indexed_actor(
+                nodes, colors, opacity, line_width)
 
         self._is_2d = len(positions[0]) == 2
         self.positions = positions
@@ -702,6 +893,47 @@ class FurySuperEdge:
         self.depth_test = True
         self._id_observer_effects = None
 
+    def _init_indexed_actor(self, nodes, colors, opacity, line_width):
+        points = vtkPoints()
+        points.SetData(nodes._centers_vtk)
+
+        # each node owns _centers_length vertices in the shared buffer
+        connectivity = np.ascontiguousarray(
+            self.edges, dtype=np.int64).ravel()*nodes._centers_length
+        offsets = np.arange(
+            0, connectivity.shape[0] + 1, 2, dtype=np.int64)
+        lines = vtkCellArray()
+        lines.SetData(
+            numpy_support.numpy_to_vtkIdTypeArray(offsets, deep=True),
+            numpy_support.numpy_to_vtkIdTypeArray(connectivity, deep=True))
+
+        colors = np.asarray(colors, dtype='float64')
+        if colors.ndim == 1:
+            colors = np.broadcast_to(colors, (nodes._vcount, colors.shape[0]))
+        elif colors.shape[0] != nodes._vcount:
+            raise ValueError(
+                'Edges drawn through an index buffer accept a single color'
+                ' or one color by node')
+        vtk_colors = numpy_support.numpy_to_vtk(
+            np.repeat(
+                255*colors, nodes._centers_length, axis=0).astype('uint8'),
+            deep=True)
+        vtk_colors.SetName('colors')
+
+        polydata = vtkPolyData()
+        polydata.SetPoints(points)
+        polydata.SetLines(lines)
+        polydata.GetPointData().SetScalars(vtk_colors)
+
+        mapper = vtkPolyDataMapper()
+        mapper.SetInputData(polydata)
+        mapper.SetVBOShiftScaleMethod(False)
+        actor = vtkActor()
+        actor.SetMapper(mapper)
+        actor.GetProperty().SetLineWidth(line_width)
+        actor.GetProperty().SetOpacity(opacity)
+        return actor
+
     def start_effects(self, render_window):
 
         if self._id_observer_effects is not None:
@@ -732,12 +964,18 @@ class FurySuperEdge:
     def positions(self, positions):
         """positions never it's a uniform variable
         """
-        # avoids memory corruption
+        if self._nodes is not None:
+            # the node centers buffer is shared with the edges
+            return
 
-        edges_positions = vertices_from_actor(self.vtk_actor)
-        edges_positions[::2] = positions[self.edges[:, 0]]
-        edges_positions[1::2] = positions[self.edges[:, 1]]
-        update_actor(self.vtk_actor)
+        # avoids memory corruption
+        with instrumentation.timer('edges.positions'):
+            dimension = positions.shape[1]
+            edges_positions = vertices_from_actor(self.vtk_actor)
+            edges_positions[::2, 0:dimension] = positions[self.edges[:, 0]]
+            edges_positions[1::2, 0:dimension] = \
+                positions[self.edges[:, 1]]
+            update_actor(self.vtk_actor, all_arrays=False)
 
     @property
     def colors(self):
@@ -745,7 +983,12 @@ class FurySuperEdge:
 
     @colors.setter
     def colors(self, new_colors):
-        self._colors_geo[:] = new_colors
+        if self._nodes is not None:
+            self._colors_geo.reshape(
+                self._nodes._vcount, self._nodes._centers_length, -1)[:] = \
+                np.asarray(new_colors).reshape(-1, 1, 3)
+        else:
+            self._colors_geo[:] = new_colors
 
     def update(self):
         update_actor(self.vtk_actor)
@@ -766,9 +1009,36 @@ class NetworkSuperActor():
         edge_line_color=(1, 1, 1),
         edge_line_opacity=.5,
         edge_line_width=1,
-        write_frag_depth=True
+        write_frag_depth=True,
+        shader_offsets=False,
+        edge_index_buffer=False,
+        edge_density=None,
     ):
         self._is_2d = positions.shape[1] == 2
+        self._actor_kwargs = dict(
+            colors=colors,
+            scales=scales,
+            marker=marker,
+            node_edge_width=node_edge_width,
+            node_opacity=node_opacity,
+            node_edge_opacity=node_edge_opacity,
+            node_edge_color=node_edge_color,
+            edge_line_color=edge_line_color,
+            edge_line_opacity=edge_line_opacity,
+            edge_line_width=edge_line_width,
+            write_frag_depth=write_frag_depth,
+            shader_offsets=shader_offsets,
+            edge_index_buffer=edge_index_buffer,
+            edge_density=edge_density,
+        )
+        self._build_actors(positions, edges, **self._actor_kwargs)
+
+    def _build_actors(
+            self, positions, edges, colors, scales, marker, node_edge_width,
+            node_opacity, node_edge_opacity, node_edge_color,
+            edge_line_color, edge_line_opacity, edge_line_width,
+            write_frag_depth, shader_offsets, edge_index_buffer,
+            edge_density):
         if self._is_2d:
             positions = np.array([
                             positions[:, 0], positions[:, 1],
@@ -783,19 +1053,78 @@ class NetworkSuperActor():
             edge_width=node_edge_width,
             edge_color=node_edge_color,
             marker_opacity=node_opacity,
-            write_frag_depth=write_frag_depth
+            write_frag_depth=write_frag_depth,
+            shader_offsets=shader_offsets,
         )
 
         self.vtk_actors = [self.nodes.vtk_actor]
 
         if edges is not None:
-            edges = FurySuperEdge(
-                edges, positions, edge_line_color, opacity=edge_line_opacity,
-                line_width=edge_line_width)
+            edges, _ = edges_and_weights(edges)
+            if edge_density is not None:
+                edges = FuryEdgeDensity(
+                    edges, positions, edge_line_color,
+                    opacity=edge_line_opacity, resolution=edge_density)
+            else:
+                edges = FurySuperEdge(
+                    edges, positions, edge_line_color,
+                    opacity=edge_line_opacity, line_width=edge_line_width,
+                    nodes=self.nodes if edge_index_buffer else None)
 
             self.vtk_actors += [edges.vtk_actor]
 
         self.edges = edges
+        self._spatial_index = None
+
+    def set_network(self, positions, edges=None, vertex_map=None,
+                    **attributes):
+        """Replace the nodes and the edges of the network.
+
+        The VTK actors are rebuilt. Node attributes given as arrays by
+        node (colors, scales, ...) are carried to the new nodes through
+        vertex_map, the new nodes take the values of the first node.
+
+        Parameters
+        ----------
+        positions : ndarray
+            the positions of the new set of nodes
+        edges : ndarray or Network, optional
+        vertex_map : ndarray, optional
+            array with shape (old_num_nodes, ) which maps the old node
+            indices to the new ones; removed nodes map to -1. If None,
+            the first nodes are kept.
+        **attributes : optional
+            new values of the NetworkSuperActor parameters.
+
+        """
+        old_count = self.nodes._vcount
+        new_count = positions.shape[0]
+        if vertex_map is None:
+            vertex_map = np.arange(old_count)
+            vertex_map[vertex_map >= new_count] = -1
+        vertex_map = np.asarray(vertex_map)
+        kept = vertex_map >= 0
+
+        kwargs = dict(self._actor_kwargs)
+        for name, value in kwargs.items():
+            if name in attributes or name.startswith('edge_') or \
+                    isinstance(value, (str, bool)):
+                continue
+            is_list = isinstance(value, list) and len(value) == old_count
+            value = np.asarray(value)
+            by_node = value.ndim == 2 or (
+                value.ndim == 1 and name not in [
+                    'colors', 'node_edge_color'])
+            if is_list or (by_node and value.shape[0] == old_count):
+                new_value = np.repeat(value[0:1], new_count, axis=0)
+                new_value[vertex_map[kept]] = value[kept]
+                kwargs[name] = new_value.tolist() if is_list else new_value
+        edge_line_color = np.asarray(kwargs['edge_line_color'])
+        if edge_line_color.ndim == 2 and 'edge_line_color' not in attributes:
+            kwargs['edge_line_color'] = tuple(edge_line_color[0])
+        kwargs.update(attributes)
+        self._actor_kwargs = kwargs
+        self._build_actors(positions, edges, **kwargs)
 
     @property
     def positions(self):
@@ -803,13 +1132,38 @@ class NetworkSuperActor():
 
     @positions.setter
     def positions(self, positions):
-        if positions.shape[1] == 2:
-            positions = np.array([
-                positions[:, 0], positions[:, 1],
-                np.zeros(positions.shape[0])]).T
+        # 2d positions are written directly in the x, y components
         self.nodes.positions = positions
         if self.edges is not None:
             self.edges.positions = positions
+        if self._spatial_index is not None:
+            self._spatial_index.update(self._index_positions())
+
+    def _index_positions(self):
+        positions = self.nodes.positions
+        return positions[:, 0:2] if self._is_2d else positions
+
+    @property
+    def spatial_index(self):
+        """SpatialIndex over the node positions
+
+        It's built on the first access and then updated each time the
+        positions are set. The positions of 2D networks are indexed
+        in 2D.
+
+        """
+        if self._spatial_index is None:
+            with instrumentation.timer('spatial.build'):
+                self._spatial_index = SpatialIndex(self._index_positions())
+        return self._spatial_index
+
+    def set_node_attributes(self, nodes, **values):
+        """Set the attributes of a subset of the nodes
+
+        See FurySuperNode.set_node_attributes.
+
+        """
+        self.nodes.set_node_attributes(nodes, **values)
 
     def update(self):
         for actor in self.vtk_actors:
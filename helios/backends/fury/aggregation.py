@@ -0,0 +1,331 @@
+"""Edge Density Aggregation
+
+Dense networks can be drawn as the density of their edges instead of
+one line by edge. The edges are rasterized in a regular grid over the
+xy plane of the layout and the grid is drawn as a single textured quad,
+so the drawing cost doesn't depend on the number of edges.
+
+When the nodes move, only the edges with an endpoint that has moved by
+more than a fraction of a cell are rasterized again: their previous
+contribution is subtracted from the grid and the new one added.
+
+"""
+
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkFiltersSources import vtkPlaneSource
+from vtkmodules.vtkRenderingCore import vtkActor, vtkPolyDataMapper
+from vtkmodules.vtkRenderingCore import vtkTexture
+try:
+    from fury.shaders import shader_apply_effects
+except ImportError:
+    shader_apply_effects = None
+
+from fury import window
+
+from helios.core import instrumentation
+
+
+def rasterize_edges(
+        sources, targets, origin, cell_size, shape, weight=1., out=None,
+        chunk_size=65536):
+    """Accumulate the cells crossed by a set of segments
+
+    Each segment is sampled once by cell crossed along its major axis,
+    so a segment adds weight to the cells it crosses.
+
+    Parameters
+    ----------
+    sources : ndarray
+        array with shape (num_edges, 2)
+    targets : ndarray
+        array with shape (num_edges, 2)
+    origin : ndarray
+        position of the corner of the cell (0, 0)
+    cell_size : float
+    shape : tuple
+        (num_rows, num_cols), the rows follow the y axis
+    weight : float, optional, default 1
+    out : ndarray, optional
+        float64 array with the given shape which receives the sums
+    chunk_size : int, optional
+        number of segments rasterized at once, it bounds the memory
+
+    Returns
+    -------
+    density : ndarray
+
+    """
+    if out is None:
+        out = np.zeros(shape, dtype=np.float64)
+    flat_out = out.reshape(-1)
+    num_rows, num_cols = shape
+    for start in range(0, len(sources), chunk_size):
+        start_cells = (sources[start:start + chunk_size] - origin)/cell_size
+        end_cells = (targets[start:start + chunk_size] - origin)/cell_size
+        delta = end_cells - start_cells
+        # one sample by cell crossed along the major axis
+        counts = np.abs(
+            np.floor(end_cells) - np.floor(start_cells)).max(axis=1)
+        counts = counts.astype(np.int64) + 1
+        segments = np.repeat(np.arange(len(counts)), counts)
+        firsts = np.cumsum(counts) - counts
+        steps = np.arange(counts.sum()) - firsts[segments]
+        t = steps/np.maximum(counts - 1, 1)[segments]
+        cells = np.floor(
+            start_cells[segments] + delta[segments]*t[:, np.newaxis])
+        cols = np.clip(cells[:, 0], 0, num_cols - 1).astype(np.int64)
+        rows = np.clip(cells[:, 1], 0, num_rows - 1).astype(np.int64)
+        flat_out += weight*np.bincount(
+            rows*num_cols + cols, minlength=flat_out.shape[0])
+    return out
+
+
+class EdgeDensityGrid:
+    """A square grid with the number of edges crossing each cell"""
+    def __init__(
+            self, edges, resolution=256, padding=.05, tolerance=.5,
+            chunk_size=65536):
+        """
+
+        Parameters
+        ----------
+        edges : ndarray
+            array with shape (num_edges, 2)
+        resolution : int, optional, default 256
+            number of cells by side
+        padding : float, optional, default 0.05
+            margin around the nodes relative to the size of the grid
+        tolerance : float, optional, default 0.5
+            displacement, in cells, below which a node is not moved in
+            the grid
+        chunk_size : int, optional
+
+        """
+        self.edges = np.asarray(edges, dtype=np.int64)
+        self.resolution = int(resolution)
+        self.padding = padding
+        self.tolerance = tolerance
+        self.chunk_size = chunk_size
+        self.density = np.zeros(
+            (self.resolution, self.resolution), dtype=np.float64)
+        self.origin = None
+        self.cell_size = None
+        self._positions = None
+
+    @property
+    def bounds(self):
+        """(xmin, xmax, ymin, ymax) of the grid"""
+        size = self.cell_size*self.resolution
+        return (self.origin[0], self.origin[0] + size,
+                self.origin[1], self.origin[1] + size)
+
+    def _rasterize(self, positions, edges, weight):
+        rasterize_edges(
+            positions[edges[:, 0]], positions[edges[:, 1]], self.origin,
+            self.cell_size, self.density.shape, weight, self.density,
+            self.chunk_size)
+
+    def _fits(self, lower, upper):
+        xmin, xmax, ymin, ymax = self.bounds
+        size = xmax - xmin
+        inside = np.all(lower >= [xmin, ymin]) and \
+            np.all(upper <= [xmax, ymax])
+        # a layout which has contracted is drawn with a smaller grid
+        return inside and (upper - lower).max() > size/3
+
+    def reset(self, positions):
+        """Recompute the bounds and the whole grid
+
+        Parameters
+        ----------
+        positions : ndarray
+            array with shape (num_nodes, 2)
+
+        """
+        positions = np.array(positions[:, 0:2], dtype=np.float64)
+        lower = positions.min(axis=0)
+        upper = positions.max(axis=0)
+        size = max((upper - lower).max(), 1e-6)*(1 + 2*self.padding)
+        self.cell_size = size/self.resolution
+        self.origin = (lower + upper)/2 - size/2
+        self.density[:] = 0
+        self._rasterize(positions, self.edges, 1.)
+        self._positions = positions
+        instrumentation.count('edge_density.resets')
+
+    def update(self, positions):
+        """Update the grid with new node positions
+
+        Parameters
+        ----------
+        positions : ndarray
+            array with shape (num_nodes, 2) or (num_nodes, 3). Only
+            the x and y components are used.
+
+        Returns
+        -------
+        changed : bool
+            False if no node has moved by more than the tolerance
+
+        """
+        positions = positions[:, 0:2]
+        if self._positions is None or \
+                len(positions) != len(self._positions) or \
+                not self._fits(positions.min(axis=0),
+                               positions.max(axis=0)):
+            self.reset(positions)
+            return True
+        displacement = np.abs(positions - self._positions).max(axis=1)
+        moved = displacement > self.tolerance*self.cell_size
+        if not moved.any():
+            return False
+        affected = moved[self.edges[:, 0]] | moved[self.edges[:, 1]]
+        if affected.mean() > .5:
+            self.reset(positions)
+            return True
+        edges = self.edges[affected]
+        with instrumentation.timer('edge_density.update'):
+            self._rasterize(self._positions, edges, -1.)
+            self._positions[moved] = positions[moved]
+            self._rasterize(self._positions, edges, 1.)
+        instrumentation.count('edge_density.edges', len(edges))
+        return True
+
+
+class FuryEdgeDensity:
+    """Draw the edge density of a network as a textured quad
+
+    This has the interface of FurySuperEdge. The density is computed in
+    the xy plane, so it's meant to be used with 2D layouts.
+
+    """
+    def __init__(
+        self,
+        edges,
+        positions,
+        colors=(1, 1, 1),
+        opacity=.5,
+        resolution=256,
+        blending='additive',
+    ):
+        """
+
+        Parameters
+        ----------
+        edges : ndarray
+            Array of the edges with shape (n_edges, 2).
+        positions : ndarray
+            Array of the nodes positions.
+        colors : tuple, optional
+            color of the densest cells
+        opacity : float, optional
+            opacity of the densest cells
+        resolution : int, optional, default 256
+            number of cells (texels) by side
+        blending : str, optional
+
+        """
+        self.edges = edges
+        self._grid = EdgeDensityGrid(edges, resolution)
+        self._color = np.asarray(colors, dtype=np.float64).reshape(-1, 3)[0]
+        self._opacity = opacity
+        self._rgba = np.zeros((resolution, resolution, 4), dtype=np.uint8)
+        self._init_actor()
+        self._bounds = None
+        self.positions = positions
+
+        self.blending = blending
+        self.depth_test = True
+        self._id_observer_effects = None
+
+    def _init_actor(self):
+        resolution = self._grid.resolution
+        image = vtkImageData()
+        image.SetDimensions(resolution, resolution, 1)
+        # the image views the rgba buffer
+        self._vtk_rgba = numpy_support.numpy_to_vtk(
+            self._rgba.reshape(-1, 4), deep=False)
+        image.GetPointData().SetScalars(self._vtk_rgba)
+        self._image = image
+        texture = vtkTexture()
+        texture.SetInputData(image)
+        texture.InterpolateOn()
+
+        self._plane = vtkPlaneSource()
+        mapper = vtkPolyDataMapper()
+        mapper.SetInputConnection(self._plane.GetOutputPort())
+        actor = vtkActor()
+        actor.SetMapper(mapper)
+        actor.SetTexture(texture)
+        actor.GetProperty().LightingOff()
+        self.vtk_actor = actor
+
+    def start_effects(self, render_window):
+
+        if self._id_observer_effects is not None:
+            self.vtk_actor.GetMapper().RemoveObserver(
+                self._id_observer_effects)
+        effects = [window.gl_enable_blend]
+        if self.depth_test:
+            effects += [window.gl_enable_depth]
+        else:
+            effects += [window.gl_disable_depth]
+
+        blendings = {
+            'additive': window.gl_set_additive_blending,
+            'subtractive': window.gl_set_subtractive_blending,
+            'multiplicative': window.gl_set_multiplicative_blending,
+            'normal': window.gl_set_normal_blending,
+        }
+        effects += [blendings[self.blending]]
+        self._id_observer_effects = shader_apply_effects(
+            render_window, self.vtk_actor,
+            effects=effects)
+
+    @property
+    def density(self):
+        """The number of edges crossing each cell"""
+        return self._grid.density
+
+    @property
+    def positions(self):
+        pass
+
+    @positions.setter
+    def positions(self, positions):
+        with instrumentation.timer('edges.positions'):
+            if self._grid.update(positions):
+                self._update_texture()
+
+    def _update_texture(self):
+        bounds = self._grid.bounds
+        if bounds != self._bounds:
+            xmin, xmax, ymin, ymax = bounds
+            self._plane.SetOrigin(xmin, ymin, 0)
+            self._plane.SetPoint1(xmax, ymin, 0)
+            self._plane.SetPoint2(xmin, ymax, 0)
+            self._bounds = bounds
+        # logarithmic scale, the densest cell is fully opaque
+        density = np.log1p(np.maximum(self._grid.density, 0))
+        maximum = density.max()
+        if maximum > 0:
+            density /= maximum
+        self._rgba[..., 0:3] = np.rint(255*self._color).astype(np.uint8)
+        self._rgba[..., 3] = np.rint(255*self._opacity*density)
+        self._vtk_rgba.Modified()
+        self._image.Modified()
+
+    @property
+    def colors(self):
+        return self._color
+
+    @colors.setter
+    def colors(self, new_colors):
+        self._color = np.asarray(
+            new_colors, dtype=np.float64).reshape(-1, 3)[0]
+        self._update_texture()
+
+    def update(self):
+        self._update_texture()
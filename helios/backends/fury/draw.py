@@ -1,9 +1,14 @@
 """FURY NetworkDraw
 
 """
+import numpy as np
 from fury import window
 
 from helios.backends.fury.actors import NetworkSuperActor
+from helios.backends.fury.lod import NodeLOD
+from helios.backends.fury.tools import PixelBuffer
+from helios.backends.fury.tools import offscreen_render_window
+from helios.core import instrumentation
 
 
 class NetworkDraw(NetworkSuperActor):
@@ -14,6 +19,9 @@ class NetworkDraw(NetworkSuperActor):
         showm : ShowManager
             A ShowManager instance from FURY
             `fury.gl/fury.window.html#showmanager <https://fury.gl/latest/reference/fury.window.html#showmanager>`_
+        offscreen : bool
+            True if the network is drawn without interactor nor
+            ShowManager (showm and iren are None)
 
     """
     def __init__(
@@ -32,8 +40,15 @@ class NetworkDraw(NetworkSuperActor):
         edge_line_width=1,
         better_performance=False,
         write_frag_depth=True,
+        shader_offsets=False,
+        edge_index_buffer=False,
+        edge_density=None,
         window_size=(400, 400),
         showm=None,
+        offscreen=False,
+        render_window=None,
+        lod=False,
+        lod_pixel_threshold=1.,
         **kwargs
 
     ):
@@ -43,8 +58,8 @@ class NetworkDraw(NetworkSuperActor):
         ----------
         positions : ndarray
             Array of the nodes positions.
-        edges : ndarray, optional
-            Array of the edges.
+        edges : ndarray or Network, optional
+            Array of the edges or a Network instance.
         colors : tuple or ndarray, optional
             Tuple of the colors of the nodes.
         scales : float or ndarray, optional
@@ -66,18 +81,48 @@ class NetworkDraw(NetworkSuperActor):
         edge_line_width : float or ndarray, optional
             Width of the edges.
         better_performance : bool, optional
-            Improves the performance of the draw function.
+            Improves the performance of the draw function. This disables
+            write_frag_depth and enables shader_offsets.
         write_frag_depth : bool, optional
             Writes in the depth buffer.
+        shader_offsets : bool, optional
+            Stores only the node centers (float32) in the vertex buffer
+            and applies the billboard offsets in the vertex shader. This
+            makes each positions update a single write.
+        edge_index_buffer : bool, optional
+            Draws the edges through an index buffer over the node centers
+            buffer. Moving the nodes then costs no work on the edges side,
+            but edge_line_color must be a single color or one color by
+            node.
+        edge_density : int, optional
+            If given, the edges are drawn as their density in a grid
+            with this number of cells by side, rendered as a single
+            textured quad. Meant for dense 2D networks, see
+            helios.backends.fury.aggregation.
         window_size : tuple, optional
             Size of the window.
         showm : ShowManager, optional
             Fury ShowManager instance.
             `fury.gl/fury.window.html#showmanager <https://fury.gl/latest/reference/fury.window.html#showmanager>`_
+        offscreen : bool, optional
+            Draws in an offscreen render window without interactor nor
+            ShowManager, for headless rendering. showm and iren are
+            None, start and initialize only render the scene.
+        render_window : RenderWindow, optional
+            Offscreen render window (OpenGL context) shared with other
+            NetworkDraw instances. If None, a new one is created. Only
+            used when offscreen is True.
+        lod : bool, optional
+            Culls the nodes outside of the view and draws the nodes
+            smaller than lod_pixel_threshold as points. See
+            helios.backends.fury.lod.
+        lod_pixel_threshold : float, optional
+            radius in pixels below which the nodes are drawn as points
 
         """
         if better_performance:
             write_frag_depth = False
+            shader_offsets = True
 
         super().__init__(
             positions,
@@ -92,18 +137,39 @@ class NetworkDraw(NetworkSuperActor):
             edge_line_color,
             edge_line_opacity,
             edge_line_width,
-            write_frag_depth
+            write_frag_depth,
+            shader_offsets,
+            edge_index_buffer,
+            edge_density,
         )
 
         self.scene = window.Scene()
         for actor in self.vtk_actors:
             self.scene.add(actor)
+        self._lod_kwargs = dict(pixel_threshold=lod_pixel_threshold) \
+            if lod else None
+        self.lod = None
+        self._init_lod()
 
         if self._is_2d:
             interactor_style = 'image'
             self.scene.SetBackground((255, 255, 255))
         else:
             interactor_style = 'custom'
+        self._pixel_buffer = None
+        self.offscreen = bool(offscreen)
+        if offscreen:
+            if render_window is None:
+                render_window = offscreen_render_window(window_size)
+            render_window.AddRenderer(self.scene)
+            self.showm = None
+            self.iren = None
+            self.window = render_window
+            self.Render = render_window.Render
+            self.start = render_window.Render
+            self.initialize = render_window.Render
+            return
+
         if showm is None:
             showm = window.ShowManager(
                 self.scene,
@@ -118,6 +184,119 @@ class NetworkDraw(NetworkSuperActor):
         self.start = self.showm.start
         self.initialize = self.showm.initialize
 
+    def set_network(self, positions, edges=None, vertex_map=None,
+                    **attributes):
+        """Replace the nodes and the edges of the network in the scene
+
+        Parameters
+        ----------
+        positions : ndarray
+        edges : ndarray or Network, optional
+        vertex_map : ndarray, optional
+            maps the old node indices to the new ones (-1 if removed)
+        **attributes : optional
+            new values of the NetworkDraw parameters (colors, scales...)
+
+        """
+        for actor in self.vtk_actors:
+            self.scene.rm(actor)
+        if self.lod is not None:
+            self.lod.close()
+            self.scene.rm(self.lod.points_actor)
+        super().set_network(positions, edges, vertex_map, **attributes)
+        for actor in self.vtk_actors:
+            self.scene.add(actor)
+        self._init_lod()
+
+    def _init_lod(self):
+        if self._lod_kwargs is None:
+            return
+        self.lod = NodeLOD(self.nodes, self.scene, **self._lod_kwargs)
+        self.scene.add(self.lod.points_actor)
+
+    def _display_to_plane(self, points):
+        """Project display coordinates on the z=0 plane of the scene"""
+        scene = self.scene
+        world = []
+        for x, y in np.asarray(points, dtype=np.float64).reshape(-1, 2):
+            ends = []
+            for depth in (0., 1.):
+                scene.SetDisplayPoint(x, y, depth)
+                scene.DisplayToWorld()
+                point = np.array(scene.GetWorldPoint())
+                ends.append(point[0:3]/point[3])
+            near, far = ends
+            direction = far - near
+            t = -near[2]/direction[2] if direction[2] != 0 else 0.
+            world.append((near + t*direction)[0:2])
+        return np.array(world)
+
+    def _query_point(self, xy):
+        if self._is_2d:
+            return xy
+        return np.append(xy, 0.)
+
+    def pick(self, x, y, radius=5):
+        """Return the node under a display position
+
+        The display coordinates are projected on the z=0 plane, so this
+        is meant for 2D layouts. Use spatial_index with world
+        coordinates for 3D layouts.
+
+        Parameters
+        ----------
+        x, y : float
+            display coordinates in pixels, y grows upwards
+        radius : float, optional, default 5
+            maximum distance in pixels to the node center
+
+        Returns
+        -------
+        node : int
+            index of the closest node or -1 if there is no node within
+            the radius
+
+        """
+        center, side = self._display_to_plane([(x, y), (x + radius, y)])
+        with instrumentation.timer('draw.pick'):
+            return self.spatial_index.pick(
+                self._query_point(center), np.linalg.norm(side - center))
+
+    def select_box(self, x0, y0, x1, y1):
+        """Return the nodes inside of a rectangle in display coordinates
+
+        Parameters
+        ----------
+        x0, y0, x1, y1 : float
+            two opposite corners in pixels
+
+        Returns
+        -------
+        nodes : ndarray
+
+        """
+        corners = self._display_to_plane(
+            [(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
+        with instrumentation.timer('draw.select'):
+            return self.spatial_index.query_polygon(corners)
+
+    def select_lasso(self, points):
+        """Return the nodes inside of a polygon in display coordinates
+
+        Parameters
+        ----------
+        points : ndarray
+            array with shape (num_vertices, 2) in pixels
+
+        Returns
+        -------
+        nodes : ndarray
+
+        """
+        polygon = self._display_to_plane(points)
+        with instrumentation.timer('draw.select'):
+            return self.spatial_index.query_polygon(polygon)
+
     def refresh(self):
         """This will refresh the FURY window instance.
 
@@ -126,5 +305,30 @@ class NetworkDraw(NetworkSuperActor):
 
         """
         ...
-        self.window.Render()
-        self.iren.Render()
+        with instrumentation.timer('draw.refresh'):
+            with instrumentation.timer('draw.window_render'):
+                self.window.Render()
+            if self.iren is not None:
+                with instrumentation.timer('draw.iren_render'):
+                    self.iren.Render()
+        instrumentation.count('draw.frames')
+
+    def capture(self, out=None):
+        """Return the pixels of the last frame rendered
+
+        Parameters
+        ----------
+        out : ndarray, optional
+            uint8 array with shape (height, width, 3)
+
+        Returns
+        -------
+        image : ndarray
+            uint8 array with shape (height, width, 3). If out is None,
+            the array is reused by the next capture.
+
+        """
+        if self._pixel_buffer is None:
+            self._pixel_buffer = PixelBuffer()
+        with instrumentation.timer('draw.capture'):
+            return self._pixel_buffer.read(self.window, out)
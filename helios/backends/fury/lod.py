@@ -0,0 +1,191 @@
+"""Level of Detail for the Nodes
+
+The node billboards are split in three buckets each time the camera,
+the viewport or the positions change:
+
+- culled: the billboard is outside of the view frustum
+- point: the billboard is smaller than a pixel threshold on the
+  screen, it's drawn as a single point by a second actor
+- marker: the billboard is drawn with the full SDF marker shader
+
+The buckets are computed on the CPU by projecting the node centers. The
+index buffers (cell arrays) of the two actors are rebuilt only when a
+node changes of bucket, so the vertex and fragment shaders run only for
+the visible nodes and the SDF markers only for the nodes large enough
+to show them.
+
+"""
+
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData
+from vtkmodules.vtkRenderingCore import vtkActor, vtkPolyDataMapper
+
+from helios.core import instrumentation
+
+CULLED = 0
+POINT = 1
+MARKER = 2
+# radius of the SDF markers relative to the half size of the billboards
+_MARKER_FRACTION = .5
+
+
+def _id_array(values):
+    return numpy_support.numpy_to_vtkIdTypeArray(
+        np.ascontiguousarray(values, dtype=np.int64), deep=True)
+
+
+class NodeLOD:
+    """Level of detail of the nodes of a FurySuperNode"""
+    def __init__(self, nodes, scene, pixel_threshold=1., point_size=1.):
+        """
+
+        Parameters
+        ----------
+        nodes : FurySuperNode
+        scene : Scene
+            the renderer which draws the nodes. The buckets are updated
+            at the start of each render of the scene.
+        pixel_threshold : float, optional, default 1
+            nodes with a radius smaller than this number of pixels are
+            drawn as points
+        point_size : float, optional, default 1
+            size in pixels of the points
+
+        """
+        self._nodes = nodes
+        self._scene = scene
+        self.pixel_threshold = pixel_threshold
+        polydata = nodes.vtk_actor.GetMapper().GetInput()
+        self._polydata = polydata
+        self._polys = polydata.GetPolys()
+        connectivity = numpy_support.vtk_to_numpy(
+            self._polys.GetConnectivityArray()).copy()
+        offsets = numpy_support.vtk_to_numpy(self._polys.GetOffsetsArray())
+        self._cell_size = int(offsets[1] - offsets[0])
+        self._faces = connectivity.reshape(nodes._vcount, -1)
+        self.buckets = np.full(nodes._vcount, MARKER, dtype=np.uint8)
+        self.points_actor = self._init_points_actor(point_size)
+        self._key = None
+        self._observer = scene.AddObserver('StartEvent', self._on_render)
+
+    def _init_points_actor(self, point_size):
+        nodes = self._nodes
+        points = vtkPoints()
+        points.SetData(nodes._centers_vtk)
+        self._verts = vtkCellArray()
+        polydata = vtkPolyData()
+        polydata.SetPoints(points)
+        polydata.SetVerts(self._verts)
+        # the colors are shared with the billboards
+        polydata.GetPointData().SetScalars(
+            self._polydata.GetPointData().GetArray('colors'))
+        self._points_polydata = polydata
+
+        mapper = vtkPolyDataMapper()
+        mapper.SetInputData(polydata)
+        mapper.SetVBOShiftScaleMethod(False)
+        actor = vtkActor()
+        actor.SetMapper(mapper)
+        actor.GetProperty().SetPointSize(point_size)
+        actor.GetProperty().LightingOff()
+        if nodes._marker_opacity_is_uniform:
+            actor.GetProperty().SetOpacity(nodes.marker_opacity)
+        return actor
+
+    def _on_render(self, caller, event):
+        self.update()
+
+    def classify(self):
+        """Compute the bucket of each node for the current camera
+
+        Returns
+        -------
+        buckets : ndarray
+            uint8 array with CULLED, POINT or MARKER for each node
+
+        """
+        scene = self._scene
+        height = scene.GetSize()[1]
+        camera = scene.GetActiveCamera()
+        matrix = camera.GetCompositeProjectionTransformMatrix(
+            scene.GetTiledAspectRatio(), -1, 1)
+        matrix = np.array(
+            [[matrix.GetElement(i, j) for j in range(4)] for i in range(4)])
+        clip = self._nodes.positions @ matrix[:, 0:3].T + matrix[:, 3]
+        w = clip[:, 3]
+        in_front = w > 0
+        w = np.where(in_front, w, 1)
+        radii = self._nodes._radii/w
+        radius_x = radii*np.linalg.norm(matrix[0, 0:3])
+        radius_y = radii*np.linalg.norm(matrix[1, 0:3])
+        visible = in_front & \
+            (np.abs(clip[:, 0]/w) <= 1 + radius_x) & \
+            (np.abs(clip[:, 1]/w) <= 1 + radius_y)
+        # the markers fill half of the billboards
+        small = _MARKER_FRACTION*radius_y*height/2 < self.pixel_threshold
+        buckets = np.full(len(w), CULLED, dtype=np.uint8)
+        buckets[visible] = MARKER
+        buckets[visible & small] = POINT
+        return buckets
+
+    def update(self, force=False):
+        """Update the buckets if the camera, the viewport or the
+        positions have changed
+
+        Parameters
+        ----------
+        force : bool, optional
+
+        Returns
+        -------
+        rebuilt : bool
+            True if the index buffers have been rebuilt
+
+        """
+        scene = self._scene
+        key = (
+            scene.GetActiveCamera().GetMTime(),
+            self._nodes._centers_vtk.GetMTime(), scene.GetSize())
+        if key == self._key and not force:
+            return False
+        self._key = key
+        with instrumentation.timer('lod.classify'):
+            buckets = self.classify()
+        if not force and np.array_equal(buckets, self.buckets):
+            return False
+        self.buckets = buckets
+        self._rebuild()
+        instrumentation.count('lod.rebuilds')
+        return True
+
+    def _rebuild(self):
+        markers = np.flatnonzero(self.buckets == MARKER)
+        connectivity = self._faces[markers].ravel()
+        self._polys.SetData(
+            _id_array(np.arange(
+                0, len(connectivity) + 1, self._cell_size)),
+            _id_array(connectivity))
+        self._polydata.Modified()
+
+        points = np.flatnonzero(self.buckets == POINT)
+        self._verts.SetData(
+            _id_array(np.arange(len(points) + 1)),
+            _id_array(points*self._nodes._centers_length))
+        self._points_polydata.Modified()
+
+    @property
+    def counts(self):
+        """Number of nodes by bucket: (culled, points, markers)"""
+        counts = np.bincount(self.buckets, minlength=3)
+        return tuple(int(count) for count in counts)
+
+    def close(self):
+        """Stop updating the buckets and draw all the billboards"""
+        if self._observer is None:
+            return
+        self._scene.RemoveObserver(self._observer)
+        self._observer = None
+        self.buckets[:] = MARKER
+        self._rebuild()
@@ -0,0 +1,214 @@
+"""Headless Batch Rendering
+
+Renders many networks with a single offscreen render window, so the
+OpenGL context is created once for the whole batch. Each network is
+rendered once, without interactor, and its pixels are read into a
+reusable buffer which is passed to a writer.
+
+Examples
+--------
+
+    >>> graphs = [{'positions': p, 'edges': e} for p, e in layouts]
+    >>> with BatchRenderer(window_size=(256, 256)) as renderer:
+    ...     renderer.render_batch(graphs, PNGWriter('thumb_{:05d}.png'))
+
+"""
+
+from fury.io import save_image
+
+from helios.backends.fury.draw import NetworkDraw
+from helios.backends.fury.tools import PixelBuffer
+from helios.backends.fury.tools import offscreen_render_window
+from helios.core import instrumentation
+
+try:
+    import imageio
+    IMAGEIO_AVAILABLE = True
+except ImportError:
+    IMAGEIO_AVAILABLE = False
+
+
+class PNGWriter:
+    """Write each image in a PNG file"""
+    def __init__(self, pattern='frame_{:05d}.png'):
+        """
+
+        Parameters
+        ----------
+        pattern : str, optional
+            file name formatted with the index of the image
+
+        """
+        self.pattern = pattern
+        self.count = 0
+
+    def write(self, image):
+        save_image(image, self.pattern.format(self.count))
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+class VideoWriter:
+    """Append each image as a frame of a video (requires imageio)"""
+    def __init__(self, path, fps=30, **kwargs):
+        """
+
+        Parameters
+        ----------
+        path : str
+        fps : float, optional, default 30
+        **kwargs : optional
+            passed to imageio.get_writer, e.g. codec or quality
+
+        """
+        if not IMAGEIO_AVAILABLE:
+            raise ImportError('VideoWriter requires imageio')
+        self._writer = imageio.get_writer(path, fps=fps, **kwargs)
+        self.count = 0
+
+    def write(self, image):
+        self._writer.append_data(image)
+        self.count += 1
+
+    def close(self):
+        self._writer.close()
+
+
+class BatchRenderer:
+    """Render many networks with a single offscreen OpenGL context"""
+    def __init__(self, window_size=(400, 400), multi_samples=0,
+                 **draw_kwargs):
+        """
+
+        Parameters
+        ----------
+        window_size : tuple, optional
+            size of the images
+        multi_samples : int, optional, default 0
+            number of samples used by the anti-aliasing
+        **draw_kwargs : optional
+            default NetworkDraw parameters (colors, scales, marker...)
+
+        """
+        self.window = offscreen_render_window(window_size)
+        self.window.SetMultiSamples(multi_samples)
+        self.window_size = tuple(window_size)
+        self._draw_kwargs = draw_kwargs
+        self._pixel_buffer = PixelBuffer()
+        self._scene = None
+
+    def network_draw(self, positions, edges=None, **kwargs):
+        """Create a NetworkDraw which uses the window of this renderer
+
+        Parameters
+        ----------
+        positions : ndarray
+        edges : ndarray or Network, optional
+        **kwargs : optional
+            NetworkDraw parameters, they override the defaults of the
+            renderer
+
+        Returns
+        -------
+        network_draw : NetworkDraw
+
+        """
+        params = dict(self._draw_kwargs)
+        params.update(kwargs)
+        network_draw = NetworkDraw(
+            positions, edges, offscreen=True, render_window=self.window,
+            window_size=self.window_size, **params)
+        # the draw is attached to the window by render
+        self.window.RemoveRenderer(network_draw.scene)
+        return network_draw
+
+    def _attach(self, scene):
+        if scene is self._scene:
+            return
+        if self._scene is not None:
+            self.window.RemoveRenderer(self._scene)
+        self.window.AddRenderer(scene)
+        self._scene = scene
+
+    def render(self, network_draw, out=None, reset_camera=True):
+        """Render a network once and return its pixels
+
+        Parameters
+        ----------
+        network_draw : NetworkDraw
+        out : ndarray, optional
+            uint8 array with shape (height, width, 3)
+        reset_camera : bool, optional, default True
+            fit the camera to the network
+
+        Returns
+        -------
+        image : ndarray
+            uint8 array with shape (height, width, 3). If out is None,
+            the array is reused by the next render.
+
+        """
+        self._attach(network_draw.scene)
+        if reset_camera:
+            network_draw.scene.ResetCamera()
+        with instrumentation.timer('batch.render'):
+            self.window.Render()
+        with instrumentation.timer('batch.read_pixels'):
+            image = self._pixel_buffer.read(self.window, out)
+        instrumentation.count('batch.frames')
+        return image
+
+    def render_batch(self, graphs, writer=None, reset_camera=True):
+        """Render a sequence of networks
+
+        The NetworkDraw created for each network is released before the
+        next one is rendered.
+
+        Parameters
+        ----------
+        graphs : iterable
+            NetworkDraw instances or dicts with the arguments of
+            network_draw (positions, edges and NetworkDraw parameters)
+        writer : object, optional
+            object with a write(image) method, e.g. a PNGWriter or a
+            VideoWriter. The writer is not closed.
+        reset_camera : bool, optional, default True
+
+        Returns
+        -------
+        images : list or int
+            a copy of each image if writer is None, otherwise the number
+            of images written
+
+        """
+        images = []
+        count = 0
+        for graph in graphs:
+            if isinstance(graph, dict):
+                graph = self.network_draw(**graph)
+            image = self.render(graph, reset_camera=reset_camera)
+            if writer is None:
+                images.append(image.copy())
+            else:
+                writer.write(image)
+            count += 1
+        self._detach()
+        return images if writer is None else count
+
+    def _detach(self):
+        if self._scene is not None:
+            self.window.RemoveRenderer(self._scene)
+            self._scene = None
+
+    def close(self):
+        """Release the OpenGL context"""
+        self._detach()
+        self.window.Finalize()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -3,6 +3,45 @@
 This module implements a set o tools to enhance VTK given new functionalities.
 
 """
+import os
+import sys
+
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkUnsignedCharArray
+from vtkmodules.vtkRenderingCore import vtkRenderWindow
+try:
+    from vtkmodules.vtkRenderingOpenGL2 import vtkEGLRenderWindow
+    EGL_AVAILABLE = True
+except ImportError:
+    EGL_AVAILABLE = False
+
+
+def offscreen_render_window(size=None):
+    """Create a render window which draws offscreen
+
+    Without an X11 display, the EGL window is created directly. The VTK
+    factory would probe the X11 libraries before choosing it.
+
+    Parameters
+    ----------
+    size : tuple, optional
+
+    Returns
+    -------
+    render_window : vtkRenderWindow
+
+    """
+    headless = sys.platform.startswith('linux') and \
+        not os.environ.get('DISPLAY')
+    if headless and EGL_AVAILABLE:
+        render_window = vtkEGLRenderWindow()
+    else:
+        render_window = vtkRenderWindow()
+    render_window.SetOffScreenRendering(1)
+    if size is not None:
+        render_window.SetSize(*size)
+    return render_window
 
 
 class Uniform:
@@ -112,3 +151,47 @@ class Uniforms:
 
     def __repr__(self):
         return f'Uniforms({[obj.name for obj in self.uniforms]})'
+
+
+class PixelBuffer:
+    """Read the pixels of a render window into reusable arrays
+
+    The VTK array receiving the pixels and the returned image are
+    allocated once and reused while the window size doesn't change.
+
+    """
+    def __init__(self):
+        self._data = vtkUnsignedCharArray()
+        self._image = None
+
+    def read(self, render_window, out=None):
+        """Read the RGB pixels of the last frame rendered
+
+        Parameters
+        ----------
+        render_window : vtkRenderWindow
+        out : ndarray, optional
+            uint8 array with shape (height, width, 3)
+
+        Returns
+        -------
+        image : ndarray
+            uint8 array with shape (height, width, 3), the first row is
+            the top of the image. If out is None, the array is
+            overwritten by the next read.
+
+        """
+        width, height = render_window.GetSize()
+        # the offscreen frames are rendered in the back buffer
+        front = int(not render_window.GetOffScreenRendering())
+        render_window.GetPixelData(
+            0, 0, width - 1, height - 1, front, self._data, 0)
+        pixels = numpy_support.vtk_to_numpy(self._data).reshape(
+            height, width, 3)
+        if out is None:
+            if self._image is None or self._image.shape != pixels.shape:
+                self._image = np.empty_like(pixels)
+            out = self._image
+        # VTK rows start at the bottom of the image
+        np.copyto(out, pixels[::-1])
+        return out
@@ -0,0 +1,4 @@
+"""Core data structures"""
+from helios.core.network import Network, CSRNetwork
+
+__all__ = ['Network', 'CSRNetwork']
@@ -0,0 +1,256 @@
+"""Opt-in Instrumentation
+
+Low-overhead timers and counters used by the layouts and the draw hot
+paths. Nothing is recorded until enable() is called; while disabled,
+timer() returns a shared no-op context manager.
+
+Examples
+--------
+
+    >>> from helios.core import instrumentation
+    >>> instrumentation.enable()
+    >>> layout.steps(100)
+    >>> network_draw.refresh()
+    >>> instrumentation.summary()['timers']['draw.refresh']['p90']
+
+Stages
+------
+    heliosfr.steps, layout.update, ipc.read_positions, nodes.positions,
+    edges.positions, draw.refresh, draw.window_render, draw.iren_render
+    and, inside of the layout servers, server.update. The counters
+    heliosfr.iterations, draw.frames, ipc.frames and server.steps give
+    the steps/sec and frames/sec rates.
+
+"""
+
+import bisect
+import json
+import time
+from contextlib import nullcontext
+
+# log-spaced latency bins from 1us to 100s, five bins per decade
+_BIN_EDGES = [10**(exp/5) for exp in range(-30, 11)]
+
+
+class _Stats:
+    __slots__ = ('count', 'total', 'min', 'max', 'first', 'last', 'bins')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.
+        self.min = float('inf')
+        self.max = 0.
+        self.first = None
+        self.last = None
+        self.bins = [0]*(len(_BIN_EDGES) + 1)
+
+    def add(self, value, now):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.bins[bisect.bisect_right(_BIN_EDGES, value)] += 1
+
+    def rate(self):
+        if self.first is None or self.last <= self.first:
+            return 0.
+        return (self.count - 1)/(self.last - self.first)
+
+    def percentile(self, q):
+        """Estimate a percentile using the upper edge of the bins"""
+        if self.count == 0:
+            return 0.
+        target = q/100*self.count
+        accumulated = 0
+        for i, count in enumerate(self.bins):
+            accumulated += count
+            if accumulated >= target:
+                if i == len(_BIN_EDGES):
+                    return self.max
+                return min(_BIN_EDGES[i], self.max)
+        return self.max
+
+
+class _Timer:
+    __slots__ = ('_instrumentation', '_name', '_start')
+
+    def __init__(self, instrumentation, name):
+        self._instrumentation = instrumentation
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        end = time.perf_counter()
+        self._instrumentation.add_sample(self._name, end - self._start, end)
+
+
+_NULL_TIMER = nullcontext()
+
+
+class Instrumentation:
+    """A registry of timers and counters"""
+    def __init__(self):
+        self.enabled = False
+        self._timers = {}
+        self._counters = {}
+        self._callbacks = []
+
+    def timer(self, name):
+        """Return a context manager which measures the time of a stage
+
+        Parameters
+        ----------
+        name : str
+
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def add_sample(self, name, seconds, now=None):
+        """Record a latency sample (in seconds) of a stage"""
+        if not self.enabled:
+            return
+        if now is None:
+            now = time.perf_counter()
+        stats = self._timers.get(name)
+        if stats is None:
+            stats = self._timers[name] = _Stats()
+        stats.add(seconds, now)
+        for callback in self._callbacks:
+            callback(name, seconds)
+
+    def count(self, name, value=1):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        stats = self._counters.get(name)
+        if stats is None:
+            stats = self._counters[name] = [0, now, now]
+        stats[0] += value
+        stats[2] = now
+
+    def add_callback(self, callback):
+        """Register a function called as callback(name, seconds) after
+        each timer sample
+
+        """
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    def reset(self):
+        self._timers = {}
+        self._counters = {}
+
+    def summary(self, histograms=False):
+        """Return the statistics of all the stages and counters
+
+        Parameters
+        ----------
+        histograms : bool, optional, default False
+            include the latency histogram (bin edges in seconds and
+            counts) of each stage
+
+        Returns
+        -------
+        summary : dict
+            {'timers': {name: {count, total, mean, min, max, p50, p90,
+            p99, rate}}, 'counters': {name: {count, rate}}}. The rates
+            are given by second.
+
+        """
+        timers = {}
+        for name, stats in self._timers.items():
+            timers[name] = {
+                'count': stats.count,
+                'total': stats.total,
+                'mean': stats.total/stats.count,
+                'min': stats.min,
+                'max': stats.max,
+                'p50': stats.percentile(50),
+                'p90': stats.percentile(90),
+                'p99': stats.percentile(99),
+                'rate': stats.rate(),
+            }
+            if histograms:
+                timers[name]['histogram'] = {
+                    'edges': list(_BIN_EDGES),
+                    'counts': list(stats.bins),
+                }
+        counters = {}
+        for name, (value, first, last) in self._counters.items():
+            counters[name] = {
+                'count': value,
+                'rate': value/(last - first) if last > first else 0.,
+            }
+        return {'timers': timers, 'counters': counters}
+
+    def export_json(self, path, histograms=True):
+        """Write the summary in a JSON file"""
+        with open(path, 'w') as f:
+            json.dump(self.summary(histograms), f, indent=2)
+
+
+_instrumentation = Instrumentation()
+
+
+def get_instrumentation():
+    """Return the Instrumentation registry of this process"""
+    return _instrumentation
+
+
+def enable(reset=True):
+    """Start recording the timers and counters
+
+    Parameters
+    ----------
+    reset : bool, optional, default True
+        discard the previous records
+
+    """
+    if reset:
+        _instrumentation.reset()
+    _instrumentation.enabled = True
+
+
+def disable():
+    _instrumentation.enabled = False
+
+
+def is_enabled():
+    return _instrumentation.enabled
+
+
+def timer(name):
+    return _instrumentation.timer(name)
+
+
+def count(name, value=1):
+    _instrumentation.count(name, value)
+
+
+def summary(histograms=False):
+    return _instrumentation.summary(histograms)
+
+
+def add_callback(callback):
+    _instrumentation.add_callback(callback)
+
+
+def remove_callback(callback):
+    _instrumentation.remove_callback(callback)
+
+
+def export_json(path, histograms=True):
+    _instrumentation.export_json(path, histograms)
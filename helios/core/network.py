@@ -1,41 +1,415 @@
+"""Network data structures
+
+This module provides the abstract Network interface and a concrete
+array-backed implementation which stores the adjacency in the
+compressed sparse row (CSR) format.
+
+"""
+
 from abc import ABC, abstractmethod
 import numpy as np
 
 
 class Network(ABC):
     @abstractmethod
-    def vertex_count():
-        ...
-    @abstractmethod
-    def edge_count():
+    def vertex_count(self):
         ...
+
     @abstractmethod
-    def edges():
+    def edge_count(self):
         ...
+
     @abstractmethod
-    def vertices():
+    def edges(self):
         ...
+
     @abstractmethod
-    def neighbors_of_vertex():
+    def vertices(self):
         ...
+
     @abstractmethod
-    def edge_properties():
+    def neighbors_of_vertex(self, vertex):
         ...
+
     @abstractmethod
-    def vertex_properties():
+    def edge_properties(self):
         ...
+
     @abstractmethod
-    def vertex_properties():
+    def vertex_properties(self):
         ...
+
     @abstractmethod
-    def add_edges():
+    def add_edges(self, edges):
         ...
+
     @abstractmethod
-    def add_vertices():
+    def add_vertices(self, count):
         ...
+
     @abstractmethod
-    def delete_edges():
+    def delete_edges(self, edge_ids):
         ...
+
     @abstractmethod
-    def delete_vertices():
+    def delete_vertices(self, vertices):
         ...
+
+
+class CSRNetwork(Network):
+    """A Network stored as an edge list plus a CSR adjacency.
+
+    The edge list is kept as a contiguous (n_edges, 2) int64 array and
+    the CSR structure (indptr, indices) is built lazily, with a single
+    argsort, every time it is requested after a modification. Edges
+    added through add_edges are buffered and concatenated only once,
+    which amortizes the cost of many small insertions.
+
+    Examples
+    --------
+
+        >>> net = CSRNetwork(np.array([[0, 1], [1, 2]]))
+        >>> net.add_edges(np.array([[2, 3]]))
+        >>> net.degrees()
+        array([1, 2, 2, 1])
+
+    """
+    def __init__(
+            self, edges=None, num_vertices=None, weights=None,
+            directed=False):
+        """
+
+        Parameters
+        ----------
+        edges : ndarray, optional
+            a bi-dimensional array with shape (n_edges, 2)
+        num_vertices : int, optional
+            If None, the number of vertices will be the greatest
+            vertex index in the edges plus one.
+        weights : array, optional
+            a one-dimensional array with the edge weights
+        directed : bool, optional, default False
+
+        """
+        self._directed = directed
+        if edges is None:
+            edges = np.zeros((0, 2), dtype=np.int64)
+        edges = np.ascontiguousarray(edges, dtype=np.int64).reshape(-1, 2)
+        max_vertex = int(edges.max()) + 1 if edges.shape[0] > 0 else 0
+        if num_vertices is None:
+            num_vertices = max_vertex
+        elif num_vertices < max_vertex:
+            raise ValueError(
+                f'The edges reference the vertex {max_vertex - 1} but '
+                f'num_vertices is {num_vertices}')
+
+        self._num_vertices = int(num_vertices)
+        self._edges = edges
+        self._edge_properties = {}
+        self._vertex_properties = {}
+        if weights is not None:
+            self._edge_properties['weight'] = self._check_edge_property(
+                weights, edges.shape[0])
+
+        self._pending_edges = []
+        self._pending_edge_properties = {}
+        self._csr = None
+
+    @property
+    def directed(self):
+        return self._directed
+
+    def _check_edge_property(self, values, num_edges):
+        values = np.asarray(values)
+        if values.shape[0] != num_edges:
+            raise ValueError(
+                f'Expected {num_edges} values, got {values.shape[0]}')
+        return values
+
+    def _flush(self):
+        """Concatenate the buffered edges into the edge list"""
+        if len(self._pending_edges) == 0:
+            return
+
+        for name, values in self._edge_properties.items():
+            self._edge_properties[name] = np.concatenate(
+                [values] + self._pending_edge_properties[name]).astype(
+                    values.dtype, copy=False)
+
+        self._edges = np.concatenate([self._edges] + self._pending_edges)
+        self._pending_edges = []
+        self._pending_edge_properties = {}
+        self._csr = None
+
+    def _build_csr(self):
+        self._flush()
+        if self._csr is not None:
+            return self._csr
+
+        sources = self._edges[:, 0]
+        targets = self._edges[:, 1]
+        edge_ids = np.arange(self._edges.shape[0], dtype=np.int64)
+        if not self._directed:
+            sources = np.concatenate([sources, targets])
+            targets = np.concatenate([targets, self._edges[:, 0]])
+            edge_ids = np.concatenate([edge_ids, edge_ids])
+
+        order = np.argsort(sources, kind='stable')
+        indices = targets[order]
+        counts = np.bincount(sources, minlength=self._num_vertices)
+        indptr = np.zeros(self._num_vertices + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        self._csr = (indptr, indices, edge_ids[order])
+        return self._csr
+
+    def csr(self):
+        """Return the CSR arrays.
+
+        Returns
+        -------
+        indptr : ndarray
+            array with shape (num_vertices+1, )
+        indices : ndarray
+            the neighbors of the vertex i are
+            indices[indptr[i]:indptr[i+1]]
+        edge_ids : ndarray
+            the edge index associated with each entry of indices
+
+        """
+        return self._build_csr()
+
+    def vertex_count(self):
+        return self._num_vertices
+
+    def edge_count(self):
+        pending = sum(chunk.shape[0] for chunk in self._pending_edges)
+        return self._edges.shape[0] + pending
+
+    def edges(self):
+        """Return the edge list as a (n_edges, 2) int64 array.
+
+        The returned array is not a copy and should not be modified.
+
+        """
+        self._flush()
+        return self._edges
+
+    def vertices(self):
+        return np.arange(self._num_vertices, dtype=np.int64)
+
+    def weights(self):
+        """Return the edge weights or None if the network is unweighted"""
+        self._flush()
+        return self._edge_properties.get('weight')
+
+    def degrees(self):
+        """Return the degree (out-degree if directed) of each vertex"""
+        indptr, _, _ = self._build_csr()
+        return np.diff(indptr)
+
+    def in_degrees(self):
+        """Return the in-degree of each vertex"""
+        if not self._directed:
+            return self.degrees()
+        self._flush()
+        return np.bincount(self._edges[:, 1], minlength=self._num_vertices)
+
+    def neighbors_of_vertex(self, vertex):
+        """Return the neighbors (successors if directed) of a vertex
+
+        Parameters
+        ----------
+        vertex : int
+
+        Returns
+        -------
+        neighbors : ndarray
+            a read-only view of the CSR indices
+
+        """
+        indptr, indices, _ = self._build_csr()
+        neighbors = indices[indptr[vertex]:indptr[vertex+1]]
+        neighbors.flags.writeable = False
+        return neighbors
+
+    def neighbors_of_vertices(self, vertices):
+        """Vectorized version of neighbors_of_vertex.
+
+        Parameters
+        ----------
+        vertices : array
+            a one-dimensional array of vertex indices
+
+        Returns
+        -------
+        neighbors : ndarray
+            the concatenated neighbors of all the vertices
+        offsets : ndarray
+            the neighbors of vertices[i] are
+            neighbors[offsets[i]:offsets[i+1]]
+
+        """
+        indptr, indices, _ = self._build_csr()
+        vertices = np.asarray(vertices, dtype=np.int64)
+        starts = indptr[vertices]
+        counts = indptr[vertices + 1] - starts
+        offsets = np.zeros(vertices.shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        positions = np.arange(offsets[-1], dtype=np.int64)
+        positions += np.repeat(starts - offsets[:-1], counts)
+        return indices[positions], offsets
+
+    def edge_properties(self):
+        self._flush()
+        return self._edge_properties
+
+    def vertex_properties(self):
+        return self._vertex_properties
+
+    def add_edges(self, edges, **properties):
+        """Add a batch of edges.
+
+        The edges are buffered and merged into the edge list only when
+        the network is queried again.
+
+        Parameters
+        ----------
+        edges : ndarray
+            a bi-dimensional array with shape (n_new_edges, 2)
+        **properties : arrays, optional
+            edge properties of the new edges. For example, weight=array
+
+        """
+        edges = np.ascontiguousarray(edges, dtype=np.int64).reshape(-1, 2)
+        if edges.shape[0] == 0:
+            return
+        max_vertex = int(edges.max()) + 1
+        if max_vertex > self._num_vertices:
+            self.add_vertices(max_vertex - self._num_vertices)
+
+        for name, values in properties.items():
+            if name not in self._edge_properties:
+                self._flush()
+                values = np.asarray(values)
+                self._edge_properties[name] = np.ones(
+                    (self._edges.shape[0], ) + values.shape[1:],
+                    dtype=values.dtype)
+
+        for name, values in self._edge_properties.items():
+            if name in properties:
+                new_values = self._check_edge_property(
+                    properties[name], edges.shape[0])
+            else:
+                # edges added without this property are filled with ones
+                new_values = np.ones(
+                    (edges.shape[0], ) + values.shape[1:],
+                    dtype=values.dtype)
+            self._pending_edge_properties.setdefault(name, []).append(
+                new_values)
+        self._pending_edges.append(edges)
+        self._csr = None
+
+    def add_vertices(self, count):
+        """Add new isolated vertices.
+
+        Parameters
+        ----------
+        count : int
+
+        Returns
+        -------
+        vertices : ndarray
+            the indices of the new vertices
+
+        """
+        first = self._num_vertices
+        self._num_vertices += int(count)
+        for name, values in self._vertex_properties.items():
+            fill = np.zeros((count, ) + values.shape[1:], dtype=values.dtype)
+            self._vertex_properties[name] = np.concatenate([values, fill])
+        self._csr = None
+        return np.arange(first, self._num_vertices, dtype=np.int64)
+
+    def delete_edges(self, edge_ids):
+        """Delete a batch of edges
+
+        Parameters
+        ----------
+        edge_ids : array
+            indices (rows of the edge list) of the edges to be removed
+
+        """
+        self._flush()
+        keep = np.ones(self._edges.shape[0], dtype=bool)
+        keep[np.asarray(edge_ids, dtype=np.int64)] = False
+        self._edges = self._edges[keep]
+        for name, values in self._edge_properties.items():
+            self._edge_properties[name] = values[keep]
+        self._csr = None
+
+    def delete_vertices(self, vertices):
+        """Delete a batch of vertices and all the edges incident to them.
+
+        The remaining vertices are relabeled to keep the indices
+        contiguous.
+
+        Parameters
+        ----------
+        vertices : array
+
+        Returns
+        -------
+        vertex_map : ndarray
+            array with shape (old_num_vertices, ) which maps the old
+            vertex indices to the new ones. Deleted vertices map to -1.
+
+        """
+        self._flush()
+        keep = np.ones(self._num_vertices, dtype=bool)
+        keep[np.asarray(vertices, dtype=np.int64)] = False
+        vertex_map = np.full(self._num_vertices, -1, dtype=np.int64)
+        vertex_map[keep] = np.arange(np.count_nonzero(keep))
+
+        keep_edges = keep[self._edges[:, 0]] & keep[self._edges[:, 1]]
+        self._edges = np.ascontiguousarray(
+            vertex_map[self._edges[keep_edges]])
+        for name, values in self._edge_properties.items():
+            self._edge_properties[name] = values[keep_edges]
+        for name, values in self._vertex_properties.items():
+            self._vertex_properties[name] = values[keep]
+
+        self._num_vertices = int(np.count_nonzero(keep))
+        self._csr = None
+        return vertex_map
+
+    def __repr__(self):
+        return (
+            f'CSRNetwork(num_vertices={self.vertex_count()}, '
+            f'num_edges={self.edge_count()}, directed={self._directed})')
+
+
+def edges_and_weights(edges, weights=None):
+    """Return the edge list and weights of a Network or an ndarray
+
+    Layouts and draws accept either a raw (n_edges, 2) array or a Network
+    instance. This normalizes both cases without copying the edge list
+    when it is already stored as an array.
+
+    Parameters
+    ----------
+    edges : ndarray or Network
+    weights : array, optional
+        If None and edges is a Network, the 'weight' edge property
+        will be used when it exists.
+
+    Returns
+    -------
+    edges : ndarray
+    weights : ndarray or None
+
+    """
+    if isinstance(edges, Network):
+        if weights is None:
+            weights = edges.edge_properties().get('weight')
+        edges = edges.edges()
+    return edges, weights
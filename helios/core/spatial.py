@@ -0,0 +1,287 @@
+"""Spatial Index
+
+A uniform grid over the node positions which answers picking, box,
+lasso and k-nearest queries without scanning all the nodes.
+
+The nodes are sorted by cell and stored in the compressed sparse row
+(CSR) format, so the nodes of a cell are a contiguous slice. When the
+positions change, only the nodes which have moved to another cell are
+taken out of the CSR arrays and kept in a small list checked by every
+query; the grid is rebuilt when this list grows.
+
+Examples
+--------
+
+    >>> index = SpatialIndex(positions)
+    >>> index.nearest([0, 0], k=5)
+    >>> index.query_box([-1, -1], [1, 1])
+    >>> index.update(new_positions)
+
+"""
+
+import numpy as np
+
+from helios.core import instrumentation
+
+
+def points_in_polygon(points, polygon):
+    """Test which points are inside of a polygon (even-odd rule)
+
+    Parameters
+    ----------
+    points : ndarray
+        array with shape (num_points, 2)
+    polygon : ndarray
+        array with shape (num_vertices, 2)
+
+    Returns
+    -------
+    inside : ndarray
+        boolean array with shape (num_points, )
+
+    """
+    points = np.asarray(points, dtype=np.float64)
+    polygon = np.asarray(polygon, dtype=np.float64)
+    x, y = points[:, 0], points[:, 1]
+    inside = np.zeros(len(points), dtype=bool)
+    starts = polygon
+    ends = np.roll(polygon, -1, axis=0)
+    for (x0, y0), (x1, y1) in zip(starts, ends):
+        crosses = (y0 > y) != (y1 > y)
+        if y1 == y0:
+            continue
+        x_cross = x0 + (y - y0)*(x1 - x0)/(y1 - y0)
+        inside ^= crosses & (x < x_cross)
+    return inside
+
+
+class SpatialIndex:
+    """A uniform grid index over 2D or 3D positions"""
+    def __init__(self, positions, cell_size=None, nodes_by_cell=4,
+                 max_moved=None):
+        """
+
+        Parameters
+        ----------
+        positions : ndarray
+            array with shape (num_nodes, dimension)
+        cell_size : float, optional
+            If None, it's chosen to have about nodes_by_cell nodes in
+            each cell when the nodes are uniformly distributed.
+        nodes_by_cell : float, optional, default 4
+        max_moved : int, optional
+            number of nodes out of their cell after which the grid is
+            rebuilt. If None, 1% of the nodes (at least 1024).
+
+        """
+        self._fixed_cell_size = cell_size
+        self.nodes_by_cell = nodes_by_cell
+        self._max_moved = max_moved
+        self.build(positions)
+
+    @property
+    def num_nodes(self):
+        return len(self._positions)
+
+    @property
+    def dimension(self):
+        return self._positions.shape[1]
+
+    def build(self, positions):
+        """Rebuild the whole grid
+
+        Parameters
+        ----------
+        positions : ndarray
+            array with shape (num_nodes, dimension)
+
+        """
+        positions = np.array(positions, dtype=np.float64)
+        num_nodes, dimension = positions.shape
+        lower = positions.min(axis=0) if num_nodes else np.zeros(dimension)
+        upper = positions.max(axis=0) if num_nodes else np.ones(dimension)
+        extent = np.maximum(upper - lower, 1e-9)
+        cell_size = self._fixed_cell_size
+        if cell_size is None:
+            volume = np.prod(extent)
+            cell_size = (volume*self.nodes_by_cell/max(num_nodes, 1))**(
+                1/dimension)
+            # degenerated layouts (e.g. all the nodes in a line)
+            cell_size = max(cell_size, extent.max()/max(num_nodes, 1))
+        self.cell_size = float(cell_size)
+        self.lower = lower
+        self.shape = np.floor(extent/self.cell_size).astype(np.int64) + 1
+        self._positions = positions
+        self._cells = self._cell_ids(positions)
+        self._order = np.argsort(self._cells, kind='stable')
+        counts = np.bincount(self._cells, minlength=int(np.prod(self.shape)))
+        self._offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self._offsets[1:])
+        # nodes which are not in the cell where the CSR arrays put them
+        self._stale = np.zeros(num_nodes, dtype=bool)
+        self._moved = np.zeros(0, dtype=np.int64)
+        instrumentation.count('spatial.builds')
+
+    def _cell_coords(self, positions):
+        coords = np.floor((positions - self.lower)/self.cell_size)
+        return np.clip(coords, 0, self.shape - 1).astype(np.int64)
+
+    def _cell_ids(self, positions):
+        return np.ravel_multi_index(
+            self._cell_coords(positions).T, self.shape)
+
+    def _inside(self, positions):
+        upper = self.lower + self.shape*self.cell_size
+        return np.all(positions >= self.lower) and np.all(positions < upper)
+
+    def update(self, positions):
+        """Update the index with new positions
+
+        Parameters
+        ----------
+        positions : ndarray
+            array with shape (num_nodes, dimension)
+
+        Returns
+        -------
+        rebuilt : bool
+            True if the whole grid has been rebuilt
+
+        """
+        positions = np.asarray(positions)
+        if positions.shape != self._positions.shape or \
+                not self._inside(positions):
+            self.build(positions)
+            return True
+        self._positions[:] = positions
+        with instrumentation.timer('spatial.update'):
+            cells = self._cell_ids(self._positions)
+            stale = cells != self._cells
+        max_moved = self._max_moved
+        if max_moved is None:
+            max_moved = max(1024, self.num_nodes//100)
+        if stale.sum() > max_moved:
+            self.build(self._positions)
+            return True
+        self._stale = stale
+        self._moved = np.flatnonzero(stale)
+        return False
+
+    def _candidates(self, lower, upper):
+        """Nodes in the cells overlapping a box (may contain extra
+        nodes)"""
+        lower = self._cell_coords(np.asarray(lower, dtype=np.float64))
+        upper = self._cell_coords(np.asarray(upper, dtype=np.float64))
+        ranges = [np.arange(lo, up + 1) for lo, up in zip(lower, upper)]
+        cells = np.ravel_multi_index(
+            np.meshgrid(*ranges, indexing='ij'), self.shape).ravel()
+        starts = self._offsets[cells]
+        counts = self._offsets[cells + 1] - starts
+        slots = np.arange(counts.sum(), dtype=np.int64)
+        slots += np.repeat(starts - np.cumsum(counts) + counts, counts)
+        nodes = self._order[slots]
+        if len(self._moved) > 0:
+            nodes = np.concatenate([nodes[~self._stale[nodes]], self._moved])
+        return nodes
+
+    def query_box(self, lower, upper):
+        """Return the nodes inside of a box
+
+        Parameters
+        ----------
+        lower : array
+            the minimum corner
+        upper : array
+            the maximum corner
+
+        Returns
+        -------
+        nodes : ndarray
+
+        """
+        lower, upper = np.minimum(lower, upper), np.maximum(lower, upper)
+        nodes = self._candidates(lower, upper)
+        positions = self._positions[nodes]
+        inside = np.all((positions >= lower) & (positions <= upper), axis=1)
+        return np.sort(nodes[inside])
+
+    def query_radius(self, point, radius):
+        """Return the nodes within a distance of a point
+
+        Parameters
+        ----------
+        point : array
+        radius : float
+
+        Returns
+        -------
+        nodes : ndarray
+        distances : ndarray
+
+        """
+        point = np.asarray(point, dtype=np.float64)
+        nodes = self._candidates(point - radius, point + radius)
+        distances = np.linalg.norm(self._positions[nodes] - point, axis=1)
+        inside = distances <= radius
+        nodes, distances = nodes[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return nodes[order], distances[order]
+
+    def query_polygon(self, polygon):
+        """Return the nodes inside of a polygon (lasso selection)
+
+        Only the first two components of the positions are used.
+
+        Parameters
+        ----------
+        polygon : ndarray
+            array with shape (num_vertices, 2)
+
+        Returns
+        -------
+        nodes : ndarray
+
+        """
+        polygon = np.asarray(polygon, dtype=np.float64)
+        lower = np.full(self.dimension, -np.inf)
+        upper = np.full(self.dimension, np.inf)
+        lower[0:2] = polygon.min(axis=0)
+        upper[0:2] = polygon.max(axis=0)
+        nodes = self.query_box(lower, upper)
+        inside = points_in_polygon(self._positions[nodes, 0:2], polygon)
+        return nodes[inside]
+
+    def nearest(self, point, k=1, max_distance=np.inf):
+        """Return the k nearest nodes of a point
+
+        Parameters
+        ----------
+        point : array
+        k : int, optional, default 1
+        max_distance : float, optional
+
+        Returns
+        -------
+        nodes : ndarray
+            at most k nodes sorted by distance
+        distances : ndarray
+
+        """
+        point = np.asarray(point, dtype=np.float64)
+        k = min(k, self.num_nodes)
+        radius = min(self.cell_size, max_distance)
+        diagonal = np.linalg.norm(self.shape*self.cell_size) + \
+            np.linalg.norm(point - self.lower)
+        while True:
+            nodes, distances = self.query_radius(point, radius)
+            if len(nodes) >= k or radius >= min(max_distance, diagonal):
+                return nodes[0:k], distances[0:k]
+            radius = min(2*radius, max_distance, diagonal)
+
+    def pick(self, point, radius):
+        """Return the node closest to a point or -1 if there is no node
+        within the radius
+
+        """
+        nodes, _ = self.nearest(point, 1, radius)
+        return int(nodes[0]) if len(nodes) > 0 else -1
@@ -1,7 +1,14 @@
 """Network Layouts Module"""
 from helios.layouts.force_directed import HeliosFr
+from helios.layouts.multilevel import MultilevelHeliosFr
 from helios.layouts.mde import MDE
 from helios.layouts.forceatlas2gpu import ForceAtlas2
+from helios.layouts.workers import LayoutWorkerPool
+from helios.layouts.recording import TrajectoryFile
+from helios.layouts.replay import TrajectoryPlayer
 
-__all__ = ['HeliosFr', 'MDE', 'ForceAtlas2']
+__all__ = [
+    'HeliosFr', 'MultilevelHeliosFr', 'MDE', 'ForceAtlas2',
+    'LayoutWorkerPool', 'TrajectoryFile', 'TrajectoryPlayer',
+]
 
@@ -0,0 +1,214 @@
+"""Asyncio Layout API
+
+The layouts can be driven by an asyncio event loop instead of timer
+threads. The frames are drawn by callbacks scheduled on the loop, so
+many layouts can run concurrently inside of a single thread, for
+example in a web server, and the VTK Render calls are made from the
+thread running the loop.
+
+Examples
+--------
+
+    >>> async def main():
+    ...     await layout.start_async(ms=30, steps=200)
+    ...     async for positions in layout.frames():
+    ...         await websocket.send(positions.tobytes())
+
+"""
+
+import asyncio
+import math
+
+import numpy as np
+
+
+class AsyncLayoutMixin:
+    """Add an asyncio API to a layout
+
+    The layout classes should implement _aio_begin, which starts the
+    computation without timers and watches the new frames using
+    _aio_add_reader and _aio_add_task, and _aio_end, which stops the
+    computation. Their stop method must call _aio_detach, so a layout
+    started by start_async and stopped synchronously can be started
+    again.
+
+    """
+    _aio_loop = None
+
+    def _aio_begin(self, ms, **kwargs):
+        """Start the layout without timers
+
+        The frames must be signalled by calling _aio_frame_ready from the
+        loop thread.
+
+        Parameters
+        ----------
+        ms : float
+        **kwargs : optional
+            the arguments of start_async
+
+        """
+        raise NotImplementedError(
+            f'{type(self).__name__} does not support asyncio')
+
+    def _aio_end(self):
+        """Stop the layout"""
+        raise NotImplementedError(
+            f'{type(self).__name__} does not support asyncio')
+
+    def _aio_draw(self):
+        """Draw the last frame
+
+        Returns
+        -------
+        drawn : bool
+            False if there was no new frame
+
+        """
+        self.update()
+        return True
+
+    def _aio_positions(self):
+        """Return a copy of the drawn positions"""
+        return np.array(self._network_draw.positions)
+
+    def _aio_add_reader(self, fd, callback):
+        """Call callback when the file descriptor fd is readable"""
+        self._aio_loop.add_reader(fd, callback)
+        self._aio_readers.append(fd)
+
+    def _aio_add_task(self, coroutine):
+        """Run a coroutine until the layout is stopped"""
+        self._aio_tasks.append(self._aio_loop.create_task(coroutine))
+
+    @property
+    def running_async(self):
+        """True between start_async and the end of the layout"""
+        return self._aio_loop is not None
+
+    async def start_async(self, ms=30, **kwargs):
+        """Start the layout and draw its frames from the running loop
+
+        Parameters
+        ----------
+        ms : float, optional, default 30
+            minimum interval in milliseconds between two draws. The
+            frames published during this interval are coalesced.
+        **kwargs : optional
+            passed to start
+
+        """
+        if self._aio_loop is not None:
+            return
+        self._aio_loop = asyncio.get_running_loop()
+        self._aio_interval = ms/1000
+        self._aio_readers = []
+        self._aio_tasks = []
+        self._aio_waiters = []
+        self._aio_handle = None
+        self._aio_last_draw = -math.inf
+        self._aio_finished = False
+        self._aio_begin(ms, **kwargs)
+
+    def _aio_frame_ready(self, finished=False):
+        """Schedule a draw on the loop
+
+        Parameters
+        ----------
+        finished : bool, optional
+            If True, the last frame is drawn right away and the layout
+            is stopped.
+
+        """
+        if self._aio_loop is None:
+            return
+        if finished:
+            self._aio_finished = True
+            if self._aio_handle is not None:
+                self._aio_handle.cancel()
+            self._aio_draw_frame()
+            return
+        if self._aio_handle is not None:
+            return
+        delay = self._aio_last_draw + self._aio_interval - \
+            self._aio_loop.time()
+        if delay <= 0:
+            self._aio_draw_frame()
+        else:
+            self._aio_handle = self._aio_loop.call_later(
+                delay, self._aio_draw_frame)
+
+    def _aio_draw_frame(self):
+        self._aio_handle = None
+        self._aio_last_draw = self._aio_loop.time()
+        if self._aio_draw() and self._aio_waiters:
+            positions = self._aio_positions()
+            waiters, self._aio_waiters = self._aio_waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(positions)
+        if self._aio_finished:
+            self._aio_detach()
+            self._aio_end()
+
+    def _aio_detach(self):
+        """Remove the callbacks from the loop and release the waiters
+
+        This does nothing if the layout is not running asynchronously.
+
+        """
+        loop = self._aio_loop
+        if loop is None:
+            return
+        for fd in self._aio_readers:
+            loop.remove_reader(fd)
+        for task in self._aio_tasks:
+            task.cancel()
+        if self._aio_handle is not None:
+            self._aio_handle.cancel()
+        self._aio_loop = None
+        for waiter in self._aio_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._aio_waiters = []
+
+    async def next_frame(self):
+        """Wait for the next frame drawn
+
+        Returns
+        -------
+        positions : ndarray or None
+            a copy of the drawn positions or None if the layout has
+            finished without a new frame
+
+        """
+        if self._aio_loop is None:
+            return None
+        waiter = self._aio_loop.create_future()
+        self._aio_waiters.append(waiter)
+        return await waiter
+
+    async def frames(self):
+        """Iterate over the drawn frames until the layout finishes
+
+        A consumer slower than the layout receives only the most recent
+        frames.
+
+        Yields
+        ------
+        positions : ndarray
+
+        """
+        while True:
+            positions = await self.next_frame()
+            if positions is None:
+                return
+            yield positions
+
+    async def stop_async(self):
+        """Stop the layout without blocking the loop"""
+        loop = self._aio_loop
+        if loop is None:
+            return
+        self._aio_detach()
+        await loop.run_in_executor(None, self._aio_end)
@@ -7,17 +7,35 @@ strategies.
 """
 
 from abc import ABC, ABCMeta, abstractmethod
+import asyncio
 import time
 import sys
+import threading
 import subprocess
+import warnings
 import numpy as np
 
 from fury.stream.tools import IntervalTimer
 
+from helios.core import instrumentation
+from helios.core.network import edges_and_weights
 from helios.layouts.ipc_tools import ShmManagerMultiArrays
-
-
-class NetworkLayout(ABC):
+from helios.layouts.ipc_tools import SharedMemJob, buffer_descriptor
+from helios.layouts.ipc_tools import JOB_PROTOCOL_VERSION
+from helios.layouts.ipc_tools import FrameNotifier, NOTIFY_SUPPORTED
+from helios.layouts.ipc_tools import FRAME_EVENT, END_EVENT
+from helios.layouts.recording import TrajectoryFile
+from helios.layouts.codecs import get_codec
+from helios.layouts.replay import TrajectoryPlayer
+from helios.layouts.streaming import StreamingLayoutMixin
+from helios.layouts.aio import AsyncLayoutMixin
+
+# seconds between two checks of the server process while waiting for
+# frame events
+_LIVENESS_INTERVAL = 1.
+
+
+class NetworkLayout(StreamingLayoutMixin, ABC):
     @abstractmethod
     def steps(self, iterations=1):
         ...
@@ -31,11 +49,13 @@ class NetworkLayout(ABC):
         self._positions = new_positions
 
     def update(self):
-        self._network_draw.positions = self._positions
+        with instrumentation.timer('layout.update'):
+            self._network_draw.positions = self._positions
         self._network_draw.refresh()
 
 
-class NetworkLayoutAsync(NetworkLayout, metaclass=ABCMeta):
+class NetworkLayoutAsync(NetworkLayout, AsyncLayoutMixin,
+                         metaclass=ABCMeta):
     @abstractmethod
     def start(self, max_iterations=None):
         ...
@@ -87,6 +107,7 @@ class NetworkLayoutIPCServerCalc(ABC):
         info_buffer_name,
         weights_buffer_name=None,
         snaphosts_buffer_name=None,
+        commands_buffer_name=None,
     ):
         """
 
@@ -97,6 +118,9 @@ class NetworkLayoutIPCServerCalc(ABC):
         info_buffer_name : str
         weights_buffer_name : str, optional
         snaphosts_buffer_name : str, optional
+        commands_buffer_name : str, optional
+            the SharedMemCommandRing used by the render process to
+            control the layout while it is running
 
         """
 
@@ -104,7 +128,7 @@ class NetworkLayoutIPCServerCalc(ABC):
         self._shm_manager.load_array(
             'info', buffer_name=info_buffer_name,
             dtype='float32')
-        self._shm_manager.load_array(
+        self._shm_manager.load_multi_buffer(
             'positions', buffer_name=positions_buffer_name,
             dtype='float32')
         self._dimension = self._shm_manager.positions._dimension
@@ -121,10 +145,75 @@ class NetworkLayoutIPCServerCalc(ABC):
         self._record_positions = snaphosts_buffer_name is not None
         if self._record_positions:
             self._shm_manager.load_array(
-                'snapshots_positions', buffer_name=snaphosts_buffer_name,
-                dtype='float32')
+                'snapshots_positions', buffer_name=snaphosts_buffer_name)
+            # number of frames stored in the snapshots resource
             self._num_snapshots = self._shm_manager.snapshots_positions.\
-                _num_rows
+                _num_rows//self._shm_manager.positions._num_rows
+        self._snapshot_codec = None
+
+        if commands_buffer_name is not None:
+            self._shm_manager.load_command_ring(
+                'commands', buffer_name=commands_buffer_name)
+        self._has_commands = commands_buffer_name is not None
+        self._stop = False
+        self._paused = False
+        self._iters_by_step = None
+        self._pinned_nodes = None
+        self._pinned_positions = None
+        self._recording = None
+        self._notifier = None
+
+    def open_recording(self, path):
+        """Stream the positions of each step into a trajectory file
+
+        The file must have been created by the render process. The
+        snapshots resource, if any, then works as a ring buffer with the
+        most recent frames.
+
+        Parameters
+        ----------
+        path : str
+            path of a TrajectoryFile
+
+        """
+        self._recording = TrajectoryFile(path, mode='r+')
+
+    def open_notifier(self, path):
+        """Signal each published frame in the FrameNotifier of the
+        render process
+
+        Parameters
+        ----------
+        path : str
+            path of the named pipe
+
+        """
+        try:
+            self._notifier = FrameNotifier(path)
+        except OSError as e:
+            # the render process falls back to polling
+            warnings.warn(f'Unable to open the frame notifier: {e}')
+
+    def close_notifier(self):
+        """Tell the render process that this server has finished"""
+        if self._notifier is None:
+            return
+        self._notifier.notify(END_EVENT)
+        self._notifier.cleanup()
+        self._notifier = None
+
+    def set_snapshot_codec(self, name, **parameters):
+        """Encode the snapshots with a codec (see helios.layouts.codecs)
+
+        Parameters
+        ----------
+        name : str
+        **parameters : optional
+            codec parameters
+
+        """
+        self._snapshot_codec = get_codec(
+            name, self._shm_manager.positions.data.shape, **parameters)
 
     @abstractmethod
     def start(self, steps=100, iters_by_step=3):
@@ -151,54 +240,270 @@ class NetworkLayoutIPCServerCalc(ABC):
             a numpy array with shape (num_nodes, self._dimension)
 
         """
-        # self._shm_manager.update_array(if self._record_positions:
-        if self._record_positions:
-            self._shm_manager.snapshots_positions.update_snapshot(
-                positions, step % self._num_snapshots)
-        self._shm_manager.positions.data = positions
-        self._shm_manager.info._repr[0] = time.time()
-        self._shm_manager.info._repr[2] = step
+        with instrumentation.timer('server.update'):
+            if self._recording is not None:
+                self._recording.write_frame(step, positions)
+            if self._snapshot_codec is not None:
+                self._shm_manager.snapshots_positions.update_snapshot(
+                    positions, step, self._snapshot_codec)
+            elif self._record_positions:
+                self._shm_manager.snapshots_positions.update_snapshot(
+                    positions, step % self._num_snapshots)
+            # publish a new frame without waiting for the render process
+            self._shm_manager.positions.write(positions)
+            self._shm_manager.info._repr[0] = time.time()
+            self._shm_manager.info._repr[2] = step
+            if self._notifier is not None:
+                self._notifier.notify(FRAME_EVENT)
+        instrumentation.count('server.steps')
+
+    # parameters that can be changed with the set_parameter command
+    _live_parameters = ()
+
+    def _process_commands(self):
+        """Consume the commands sent by the render process.
+
+        While the layout is paused this blocks until a resume or a
+        stop command arrives.
+
+        """
+        if not self._has_commands:
+            return
+        commands = self._shm_manager.commands
+        while True:
+            for command in commands.pop_all():
+                self._handle_command(command)
+            if not self._paused or self._stop:
+                break
+            time.sleep(1/100)
+
+    def _handle_command(self, command):
+        name = command.get('command')
+        if name == 'stop':
+            self._stop = True
+        elif name == 'pause':
+            self._paused = True
+            self._shm_manager.info._repr[3] = 1
+        elif name == 'resume':
+            self._paused = False
+            self._shm_manager.info._repr[3] = 0
+        elif name == 'set_parameter':
+            self._set_parameter(command['name'], command['value'])
+        elif name == 'pin_nodes':
+            self._pin_nodes(command['nodes'], command.get('positions'))
+        elif name == 'unpin_nodes':
+            self._unpin_nodes(command.get('nodes'))
+        elif name == 'network':
+            self._reload_network(command)
+        else:
+            warnings.warn(f'Unknown layout command {name}')
+
+    def _reload_network(self, command):
+        """Follow the network modified by the render process
+
+        The edges, weights and vertex_map resources are grown by the
+        render process (see SharedMemArrayManager.sync), while the
+        positions are published in a new SharedMemMultiBuffer whose
+        name is sent in the command. The nodes kept by the vertex_map
+        continue from the positions computed by this server; the new
+        nodes start from the positions chosen by the render process.
+
+        Parameters
+        ----------
+        command : dict
+            with the keys version, positions, vertex_map and weights
+
+        """
+        manager = self._shm_manager
+        manager.edges.sync()
+        if 'weights' in manager._shm_attr_names:
+            manager.weights.sync()
+        elif command.get('weights') is not None:
+            manager.load_array('weights', command['weights'], 'float32')
+        if 'vertex_map' in manager._shm_attr_names:
+            manager.vertex_map.sync()
+        else:
+            manager.load_array(
+                'vertex_map', command['vertex_map'], 'int64')
+        vertex_map = np.array(manager.vertex_map.data)
+        # the last frame published by this server
+        current = np.array(manager.positions.data)
+        manager.cleanup_mem('positions')
+        manager.load_multi_buffer(
+            'positions', command['positions'], 'float32')
+        positions = np.array(manager.positions.data)
+        kept = vertex_map >= 0
+        positions[vertex_map[kept]] = current[kept]
+
+        if self._pinned_nodes is not None:
+            nodes = vertex_map[self._pinned_nodes]
+            self._pinned_nodes = nodes[nodes >= 0]
+            self._pinned_positions = self._pinned_positions[nodes >= 0]
+        self._network_changed(positions, vertex_map)
+        manager.positions.write(positions)
+        manager.info._repr[4] = command['version']
+        instrumentation.count('server.network_reloads')
+
+    def _network_changed(self, positions, vertex_map):
+        """Rebuild the state of the layout after the network has been
+        modified by the render process.
+
+        The edges and weights resources already store the new network.
+        Layouts which implement this should set _live_network to True in
+        their NetworkLayoutIPCRender class.
+
+        Parameters
+        ----------
+        positions : ndarray
+            array with shape (num_nodes, self._dimension) with the
+            positions the layout should continue from
+        vertex_map : ndarray
+            maps the previous node indices to the new ones (-1 if
+            removed)
+
+        """
+        raise NotImplementedError(
+            f'{type(self).__name__} does not support network updates')
+
+    def _set_parameter(self, name, value):
+        """Change a parameter of the running layout
+
+        Parameters
+        ----------
+        name : str
+        value : JSON serializable value
+
+        """
+        if name == 'iters_by_step':
+            self._iters_by_step = int(value)
+        elif name in self._live_parameters:
+            setattr(self, name, value)
+        else:
+            warnings.warn(
+                f'{name} can not be changed while the layout is running. '
+                f'The live parameters are: '
+                f'{["iters_by_step"] + list(self._live_parameters)}')
+
+    def _pin_nodes(self, nodes, positions=None):
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if positions is None:
+            positions = self._shm_manager.positions.data[nodes]
+        positions = np.asarray(
+            positions, dtype='float32').reshape(-1, self._dimension)
+        if self._pinned_nodes is not None:
+            keep = ~np.isin(self._pinned_nodes, nodes)
+            nodes = np.concatenate([self._pinned_nodes[keep], nodes])
+            positions = np.concatenate(
+                [self._pinned_positions[keep], positions])
+        self._pinned_nodes = nodes
+        self._pinned_positions = positions
+
+    def _unpin_nodes(self, nodes=None):
+        if nodes is None or self._pinned_nodes is None:
+            self._pinned_nodes = None
+            self._pinned_positions = None
+            return
+        keep = ~np.isin(self._pinned_nodes, nodes)
+        self._pinned_nodes = self._pinned_nodes[keep]
+        self._pinned_positions = self._pinned_positions[keep]
+
+    def _apply_pins(self, positions):
+        """Move the pinned nodes back to their positions
+
+        Parameters
+        ----------
+        positions : ndarray
+            a numpy array with shape (num_nodes, self._dimension)
+            which will be modified in place
+
+        Returns
+        -------
+        pinned : bool
+            True if there are pinned nodes
+
+        """
+        if self._pinned_nodes is None or len(self._pinned_nodes) == 0:
+            return False
+        positions[self._pinned_nodes] = self._pinned_positions
+        return True
+
+    def _stop_requested(self):
+        """Process the pending commands and return True if the render
+        process asked this server to stop.
+
+        The start method implementations should check this between
+        steps to finish gracefully. The number of iterations between
+        two steps should be read from self._iters_by_step afterwards.
+
+        """
+        self._process_commands()
+        return self._stop
 
     def __del__(self):
+        if getattr(self, '_recording', None) is not None:
+            self._recording.close()
+        if getattr(self, '_notifier', None) is not None:
+            self._notifier.cleanup()
         self._shm_manager.cleanup()
 
 
-class NetworkLayoutIPCRender(ABC):
+class NetworkLayoutIPCRender(StreamingLayoutMixin, AsyncLayoutMixin, ABC):
     """An abstract class which reads the network information
         and creates the shared memory resources.
 
     """
-    def __init__(self, network_draw, edges, weights=None):
+    def __init__(self, network_draw, edges, weights=None, worker_pool=None):
         """
 
         Parameters
         ----------
         network_draw : NetworkDraw
             A NetworkDraw object which will be used to draw the network
-        edges : ndarray
-            a bi-dimensional array with the edges list
+        edges : ndarray or Network
+            a bi-dimensional array with the edges list or a Network
+            instance
         weights : array, optional
-            a one-dimensional array with the edge weights
+            a one-dimensional array with the edge weights. If None and
+            edges is a Network, its 'weight' edge property will be used.
+        worker_pool : LayoutWorkerPool, optional
+            If given, the layout will run inside of one of the
+            persistent workers of the pool instead of a new subprocess.
 
         """
+        edges, weights = edges_and_weights(edges, weights)
         self._started = False
         self._interval_timer = None
         self._id_observer = None
         self._id_timer = None
+        self._notifier = None
+        self._wait_thread = None
+        self._waiting = False
         self._pserver = None
+        self._start_kwargs = None
+        self._worker_pool = worker_pool
+        self._job = None
+        self._job_shm = None
         self._network_draw = network_draw
         self._record_positions = False
+        self._recording = None
+        self._record_window = None
+        self._snapshot_codec = None
         self._dimension = 2 if network_draw._is_2d else 3
         self._shm_manager = ShmManagerMultiArrays()
-        self._shm_manager.add_array(
+        self._shm_manager.add_multi_buffer(
             'positions',
             network_draw.positions[:, 0:self._dimension],
             'float32'
         )
+        self._last_generation = self._shm_manager.positions.generation
+        self._positions_frame = np.array(
+            self._shm_manager.positions.data)
+        # [last update time, status, step, paused, network version]
         self._shm_manager.add_array(
             'info',
-            np.array([0, 0, 0]).astype('float32'),
+            np.array([0, 0, 0, 0, 0]).astype('float32'),
         )
+        self._shm_manager.add_command_ring('commands')
         self._shm_manager.add_array(
             'edges',
             edges,
@@ -212,11 +517,52 @@ class NetworkLayoutIPCRender(ABC):
             )
         self._num_nodes = network_draw.positions.shape[0]
         self._num_edges = edges.shape[0]
+        # network modifications waiting for the server to follow the
+        # last published version, see _publish_network
+        self._network_version = 0
+        self._pending_network = None
 
+    # True if the server follows the network modifications while
+    # running, see NetworkLayoutIPCServerCalc._network_changed
+    _live_network = False
+
+    @property
     @abstractmethod
-    def _command_string(self, steps, iters_by_step):
-        """Return the python code which will compute
-        the layout positions.
+    def _layout_name(self):
+        """The name (or 'module:Class' path) of the server class
+        registered in helios.layouts.server
+
+        """
+        ...
+
+    @abstractmethod
+    def _job_parameters(self):
+        """Return the keyword arguments of the server class.
+
+        Returns
+        --------
+        parameters : dict
+            a JSON serializable dict
+
+        """
+        ...
+
+    def _job_buffers(self):
+        """Return the extra shared memory resources used by the server.
+
+        Returns
+        --------
+        buffers : dict
+            maps the server argument prefix (the argument name without
+            the _buffer_name suffix) to the attribute name inside of
+            the shared memory manager.
+
+        """
+        return {}
+
+    def _job_descriptor(self, steps, iters_by_step):
+        """Return the job descriptor which will be consumed by the
+        layout server.
 
         Parameters
         ----------
@@ -228,11 +574,54 @@ class NetworkLayoutIPCRender(ABC):
 
         Returns
         --------
-        command_string : str
-            a string with a code that starts the layout algorithm.
+        descriptor : dict
+            a JSON serializable dict with the protocol version, the
+            layout name, the shared memory buffers (name, dtype and
+            shape) and the layout parameters.
 
         """
-        ...
+        attr_names = {
+            'edges': 'edges', 'positions': 'positions', 'info': 'info',
+            'commands': 'commands'}
+        if 'weights' in self._shm_manager._shm_attr_names:
+            attr_names['weights'] = 'weights'
+        if self._record_positions:
+            attr_names['snapshots'] = 'snapshots_positions'
+        attr_names.update(self._job_buffers())
+        buffers = {
+            key: buffer_descriptor(getattr(self._shm_manager, attr_name))
+            for key, attr_name in attr_names.items()
+        }
+        return {
+            'version': JOB_PROTOCOL_VERSION,
+            'layout': self._layout_name,
+            'steps': int(steps),
+            'iters_by_step': int(iters_by_step),
+            'buffers': buffers,
+            'parameters': self._job_parameters(),
+            'instrumentation': instrumentation.is_enabled(),
+            'recording': None if self._recording is None else
+            self._recording.path,
+            'snapshot_codec': None if self._snapshot_codec is None else
+            self._snapshot_codec.parameters(),
+            'notify': None if self._notifier is None else
+            self._notifier.path,
+        }
+
+    def _write_job(self, steps, iters_by_step):
+        """Write the job descriptor in the control shared memory block
+
+        Returns
+        -------
+        job_buffer_name : str
+
+        """
+        descriptor = self._job_descriptor(steps, iters_by_step)
+        if self._job_shm is None or not self._job_shm.write(descriptor):
+            if self._job_shm is not None:
+                self._job_shm.cleanup()
+            self._job_shm = SharedMemJob(descriptor)
+        return self._job_shm._buffer_name
 
     def update(self):
         """This method updates the position of the network actor
@@ -240,23 +629,121 @@ class NetworkLayoutIPCRender(ABC):
 
         """
         if self._record_positions:
-            self._network_draw.positions = self._shm_manager.\
-                snapshots_positions.get_snapshot(
-                    self._current_step, self._num_nodes)
+            self._network_draw.positions = self._snapshot(
+                self._current_step)
             self._current_step += 1
             self._current_step = self._current_step % self._steps
+            self._network_draw.refresh()
         else:
-            self._network_draw.positions = self._shm_manager.positions.data
+            self._draw_last_frame()
+
+    def _draw_last_frame(self):
+        """Draw the last frame published by the server
+
+        Returns
+        -------
+        drawn : bool
+            False if the frame was already drawn
+
+        """
+        # the positions resource still stores an older network
+        if self._pending_network is not None and \
+                not self._publish_network():
+            return False
+        with instrumentation.timer('ipc.read_positions'):
+            generation = self._shm_manager.positions.read(
+                self._positions_frame, self._last_generation)
+        if generation is None:
+            return False
+        instrumentation.count('ipc.frames')
+        self._last_generation = generation
+        with instrumentation.timer('layout.update'):
+            self._network_draw.positions = self._positions_frame
         self._network_draw.refresh()
+        return True
+
+    def _snapshot(self, step):
+        """Return the recorded positions of a step
+
+        When recording into a file, the most recent frames are read
+        from the shared memory window and the older ones lazily from
+        the memory-mapped file.
+
+        """
+        snapshots = self._shm_manager.snapshots_positions
+        codec = self._snapshot_codec
+        if self._recording is None:
+            return snapshots.get_snapshot(step, self._num_nodes, codec)
+        last_step = int(self._shm_manager.info._repr[2])
+        max_chain = 0 if codec is None else codec.max_chain
+        if 0 <= last_step - step and \
+                last_step - step + max_chain < self._record_window - 1:
+            if codec is None:
+                step = step % self._record_window
+            return snapshots.get_snapshot(step, self._num_nodes, codec)
+        return self._recording.frame(step)
+
+    @property
+    def recording(self):
+        """The TrajectoryFile of the last start using record_path"""
+        return self._recording
+
+    @property
+    def recorded_frames(self):
+        """Number of frames recorded since the last start"""
+        if not self._record_positions:
+            return 0
+        return min(
+            self._steps,
+            self._shm_manager.positions.generation - self._start_generation)
+
+    def recorded_frame(self, step):
+        """Return the positions recorded in a step
+
+        Parameters
+        ----------
+        step : int
+
+        Returns
+        -------
+        positions : ndarray
+
+        """
+        if not 0 <= step < self.recorded_frames:
+            raise IndexError(
+                f'Frame {step} out of range, {self.recorded_frames} '
+                'frames were recorded')
+        return self._snapshot(step)
+
+    def replay(self, frame_rate=30, loop=True, interpolate=True):
+        """Create a TrajectoryPlayer over the recorded frames
+
+        Parameters
+        ----------
+        frame_rate : float, optional, default 30
+            number of recorded frames played by second
+        loop : bool, optional, default True
+        interpolate : bool, optional, default True
+
+        Returns
+        -------
+        player : TrajectoryPlayer
+
+        """
+        return TrajectoryPlayer(
+            self._network_draw, self, frame_rate=frame_rate, loop=loop,
+            interpolate=interpolate)
 
     def start(
             self, ms=30, steps=100, iters_by_step=2,
-            record_positions=False, without_iren_start=True):
+            record_positions=False, without_iren_start=True,
+            record_path=None, record_dtype='float32', record_window=16,
+            snapshot_codec=None, notify=True):
         """This method starts the network layout algorithm
-        creating a new subprocess.
+        creating a new subprocess or submitting a job to the worker pool.
 
         Right after the network layout algorithm
-        finish the computation (ending of the related subprocess),
+        finish the computation (ending of the related subprocess or job),
         the stop method will be called automatically.
 
         Parameters
@@ -274,7 +761,33 @@ class NetworkLayoutIPCRender(ABC):
             Record the positions of the network
         without_iren_start : bool, optional, default True
             Set this to False if you will start the ShowManager.
-            That is, if you will invoke the following commands
+            That is, if you will invoke the following commands (see the
+            examples). It's ignored when the NetworkDraw is offscreen,
+            since there is no interactor to run the timer.
+        record_path : str, optional
+            If given, the positions are recorded into a memory-mapped
+            TrajectoryFile instead of a shared memory block with all the
+            steps. Only the last record_window frames are kept in the
+            shared memory. This implies record_positions.
+        record_dtype : str, optional, default 'float32'
+            type used to store the frames in the file, float16 halves
+            the file size
+        record_window : int, optional, default 16
+            number of frames kept in the shared memory when using
+            record_path. The delta codecs keep keyframe_interval - 1
+            extra frames, so the frames of the window can be decoded.
+        snapshot_codec : str or SnapshotCodec, optional
+            encoding of the frames kept in the shared memory: float32
+            (default), float16, uint16, uint8, delta16 or delta8. See
+            helios.layouts.codecs.
+        notify : bool, optional, default True
+            If True and named pipes are supported, the layout server
+            wakes this process when a new frame is published instead of
+            being polled every ms milliseconds; ms is then the minimum
+            interval between two draws. Without the ShowManager loop
+            (without_iren_start=True) a thread waits for the frames,
+            otherwise the timer only consumes the pending events. The
+            recorded positions are always played by the timer.
 
         Examples
         --------
@@ -286,51 +799,187 @@ class NetworkLayoutIPCRender(ABC):
         if self._started:
             return
 
-        self._record_positions = record_positions
+        self._start_kwargs = dict(
+            ms=ms, steps=steps, iters_by_step=iters_by_step,
+            record_positions=record_positions,
+            without_iren_start=without_iren_start,
+            record_path=record_path, record_dtype=record_dtype,
+            record_window=record_window, snapshot_codec=snapshot_codec,
+            notify=notify)
+        self._record_positions = record_positions or record_path is not None
+        if self._recording is not None:
+            self._recording.close()
+            self._recording = None
+        self._snapshot_codec = None
         if self._record_positions:
-            self._shm_manager.add_array(
-                'snapshots_positions',
-                np.zeros(
-                    (
-                        self._shm_manager.positions._num_rows*steps,
-                        self._shm_manager.positions._dimension
-                    )
-                ).astype('float32'),
-            )
+            frame_shape = (self._num_nodes, self._dimension)
+            if isinstance(snapshot_codec, str):
+                snapshot_codec = get_codec(snapshot_codec, frame_shape)
+            if snapshot_codec is not None and \
+                    snapshot_codec.name == 'float32':
+                snapshot_codec = None
+            self._snapshot_codec = snapshot_codec
+            num_frames = steps
+            if record_path is not None:
+                self._recording = TrajectoryFile(
+                    record_path, mode='w+', num_nodes=self._num_nodes,
+                    dimension=self._dimension, max_frames=steps,
+                    dtype=record_dtype)
+                # the frames of the window must be decoded without the
+                # frames they depend on being overwritten
+                max_chain = 0 if snapshot_codec is None else \
+                    snapshot_codec.max_chain
+                num_frames = self._record_window = min(
+                    record_window + max_chain, steps)
+            if snapshot_codec is None:
+                snapshots = np.zeros(
+                    (self._num_nodes*num_frames, self._dimension),
+                    dtype='float32')
+            else:
+                snapshots = np.zeros(
+                    num_frames*snapshot_codec.frame_nbytes, dtype='uint8')
+            # reuse the snapshots resource of a previous run, it grows
+            # only when more snapshots are required
+            if 'snapshots_positions' in self._shm_manager._shm_attr_names:
+                if self._shm_manager.snapshots_positions.data.shape[1:] == \
+                        snapshots.shape[1:]:
+                    self._shm_manager.replace_array(
+                        'snapshots_positions', snapshots)
+                else:
+                    self._shm_manager.cleanup_mem('snapshots_positions')
+            if 'snapshots_positions' not in self._shm_manager._shm_attr_names:
+                self._shm_manager.add_array(
+                    'snapshots_positions', snapshots)
             self._steps = steps
             self._current_step = 0
 
+        self._shm_manager.info._repr[1:] = 0
+        self._network_version = 0
+        self._start_generation = self._shm_manager.positions.generation
         self._last_update = time.time()
-        args = [
-            sys.executable, '-c',
-            self._command_string(steps, iters_by_step)
-        ]
-        self._pserver = subprocess.Popen(
-            args,
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False)
+        if notify and NOTIFY_SUPPORTED:
+            if self._notifier is None:
+                self._notifier = FrameNotifier()
+            # drop the events of a previous run
+            self._notifier.poll()
+        elif self._notifier is not None:
+            self._notifier.cleanup()
+            self._notifier = None
+        self._last_liveness = time.perf_counter()
+        job_buffer_name = self._write_job(steps, iters_by_step)
+        if self._worker_pool is not None:
+            self._job = self._worker_pool.submit(job_buffer_name)
+        else:
+            args = [
+                sys.executable, '-m', 'helios.layouts.server',
+                job_buffer_name]
+            self._pserver = subprocess.Popen(
+                args,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False)
+        # the callbacks below may stop the layout as soon as they run
+        self._started = True
         if ms > 0:
             def callback_update_pos(caller, event):
                 should_update = self._check_and_sync()
                 if should_update:
                     self.update()
 
-            if not without_iren_start:
+            if not without_iren_start and not self._network_draw.offscreen:
                 self._id_observer = \
                     self._network_draw.iren.AddObserver(
                         "TimerEvent", callback_update_pos)
                 self._id_timer = \
                     self._network_draw.iren.CreateRepeatingTimer(ms)
+            elif self._notifier is not None and not self._record_positions:
+                self._waiting = True
+                self._wait_thread = threading.Thread(
+                    target=self._wait_frames, args=(ms/1000, ), daemon=True)
+                self._wait_thread.start()
             else:
                 self._interval_timer = IntervalTimer(
                         ms/1000, callback_update_pos, *[None, None])
-        self._started = True
+
+    def _wait_frames(self, interval):
+        """Draw the frames signalled by the server until it finishes
+
+        This runs in the thread created by start. The events which
+        arrive during the interval after a draw are coalesced, so at
+        most one frame is drawn by interval.
+
+        """
+        notifier = self._notifier
+        while self._waiting:
+            drawn_at = time.perf_counter()
+            events = notifier.wait(_LIVENESS_INTERVAL)
+            if not self._waiting:
+                break
+            # a server killed before sending END_EVENT is detected by
+            # the periodic liveness check
+            finished = END_EVENT in events or (
+                not events and not self._server_running())
+            if FRAME_EVENT in events or finished:
+                self.update()
+            if finished:
+                self._waiting = False
+                self.stop(timeout=0)
+                break
+            remaining = interval - (time.perf_counter() - drawn_at)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def _aio_begin(self, ms, **kwargs):
+        """Start the server and watch its frames from the loop
+
+        The last published frame is drawn, even when recording the
+        positions; use replay to play the recorded frames.
+
+        """
+        kwargs['without_iren_start'] = True
+        self.start(ms=0, **kwargs)
+        if self._notifier is not None:
+            self._aio_add_reader(
+                self._notifier.fileno(), self._aio_on_events)
+            interval = _LIVENESS_INTERVAL
+        else:
+            interval = max(ms/1000, 1/1000)
+        self._aio_add_task(self._aio_watch(interval))
+
+    def _aio_on_events(self):
+        events = self._notifier.poll()
+        if END_EVENT in events:
+            self._aio_frame_ready(finished=True)
+        elif FRAME_EVENT in events:
+            self._aio_frame_ready()
+
+    async def _aio_watch(self, interval):
+        """Check the server process (and the frames if there is no
+        notifier) every interval seconds
+
+        """
+        while True:
+            await asyncio.sleep(interval)
+            if self._shm_manager.positions.generation != \
+                    self._last_generation:
+                self._aio_frame_ready()
+            if not self._server_running():
+                self._aio_frame_ready(finished=True)
+                return
+
+    def _aio_draw(self):
+        return self._draw_last_frame()
+
+    def _aio_positions(self):
+        return np.array(self._positions_frame)
+
+    def _aio_end(self):
+        self.stop()
 
     def _check_and_sync(self):
         """
 
         This will check  two conditions:
-        1 - If the positions in the shared memory resources have
-        changed.
+        1 - If a new positions frame has been published in the shared
+        memory resources.
         2 - If the process responsible to compute the layout positions
         finished the computations
 
@@ -339,30 +988,292 @@ class NetworkLayoutIPCRender(ABC):
         should_update : bool
 
         """
+        # if stop has been called inside the treading timer
+        # maybe another callback can be executed
+        if self._pserver is None and self._job is None:
+            return False
+
+        if self._notifier is not None and not self._record_positions:
+            events = self._notifier.poll()
+            if END_EVENT in events:
+                self.update()
+                self.stop(timeout=0)
+                return False
+            if FRAME_EVENT in events:
+                return True
+            # without events, check the server only from time to time
+            now = time.perf_counter()
+            if now - self._last_liveness < _LIVENESS_INTERVAL:
+                return False
+            self._last_liveness = now
+
         last_update = self._shm_manager.info._repr[0]
         self._last_update = last_update
 
-        # if stop has been called inside the treading timer
-        # maybe another callback can be executed
         ok = True
-        if self._pserver is None:
-            ok = False
-
-        elif self._record_positions:
+        if self._record_positions:
             ok = self._current_step < self._shm_manager.info._repr[2]
-        # if the process finished then stop the callback
-        elif not is_running(self._pserver, 0):
-            self.stop()
-            ok = False
         else:
-            ok = True
+            ok = self._shm_manager.positions.generation != \
+                self._last_generation
+            # if the process finished then show the last frame
+            # and stop the callback
+            if not self._server_running():
+                if ok:
+                    self.update()
+                self.stop(timeout=0)
+                ok = False
 
         return ok
 
-    def stop(self):
+    def _server_running(self):
+        if self._job is not None:
+            return not self._job.done()
+        if self._pserver is None:
+            return False
+        return is_running(self._pserver, 0)
+
+    def send_command(self, command, **arguments):
+        """Send a command to the running layout server.
+
+        The commands are consumed by the server between two steps.
+
+        Parameters
+        ----------
+        command : str
+            stop, pause, resume, set_parameter, pin_nodes, unpin_nodes
+            or network
+        **arguments : JSON serializable values, optional
+
+        Returns
+        -------
+        sent : bool
+            False if the command ring is full
+
+        """
+        return self._shm_manager.commands.push(command, **arguments)
+
+    def pause(self):
+        """Pause the layout server keeping its current state"""
+        return self.send_command('pause')
+
+    def resume(self):
+        """Resume a paused layout server"""
+        return self.send_command('resume')
+
+    @property
+    def paused(self):
+        return bool(self._shm_manager.info._repr[3] == 1)
+
+    def set_parameter(self, name, value):
+        """Change a parameter of the running layout without restarting it
+
+        The new value is also used by the next calls of start.
+
+        Parameters
+        ----------
+        name : str
+            iters_by_step or one of the live parameters of the layout
+        value : JSON serializable value
+
+        """
+        if not name.startswith('_') and hasattr(self, name):
+            setattr(self, name, value)
+        return self.send_command('set_parameter', name=name, value=value)
+
+    def pin_nodes(self, nodes, positions=None):
+        """Keep a set of nodes fixed while the layout is running
+
+        Parameters
+        ----------
+        nodes : array
+            indices of the nodes
+        positions : ndarray, optional
+            array with shape (len(nodes), dimension). If None, the nodes
+            will be pinned at their current positions.
+
+        """
+        nodes = np.asarray(nodes, dtype=np.int64).tolist()
+        if positions is not None:
+            positions = np.asarray(positions, dtype='float32').reshape(
+                -1, self._dimension).tolist()
+        return self.send_command('pin_nodes', nodes=nodes, positions=positions)
+
+    def unpin_nodes(self, nodes=None):
+        """Release pinned nodes
+
+        Parameters
+        ----------
+        nodes : array, optional
+            If None, all the nodes will be released.
+
+        """
+        if nodes is not None:
+            nodes = np.asarray(nodes, dtype=np.int64).tolist()
+        return self.send_command('unpin_nodes', nodes=nodes)
+
+    def _streaming_state(self):
+        weights = None
+        if 'weights' in self._shm_manager._shm_attr_names:
+            weights = self._shm_manager.weights.data
+        positions = np.array(
+            self._network_draw.positions[:, 0:self._dimension])
+        return self._shm_manager.edges.data, weights, positions
+
+    def _rebuild(self, positions, edges, weights, vertex_map):
+        """Replace the network while keeping the current positions.
+
+        The shared memory resources are resized (growing by doubling
+        their capacity). A running server of a layout with _live_network
+        follows the new network through a network command, see
+        _publish_network. Otherwise, the server is stopped and, if the
+        layout was running, a new server starts from the current
+        positions.
+
+        """
+        self._network_draw.set_network(
+            positions, edges, vertex_map=vertex_map)
+        self._num_nodes = positions.shape[0]
+        self._num_edges = edges.shape[0]
+        if self._pending_network is not None:
+            # compose with the modifications not published yet
+            previous = self._pending_network[3]
+            vertex_map = np.where(
+                previous >= 0, vertex_map[np.maximum(previous, 0)], -1)
+            self._pending_network = None
+        # the server can't drop the weights it has loaded
+        weights_kept = weights is not None or \
+            'weights' not in self._shm_manager._shm_attr_names
+        if self._live_network and self._started and weights_kept and \
+                not self._record_positions and self._server_running():
+            self._pending_network = (positions, edges, weights, vertex_map)
+            self._publish_network()
+            return
+
+        restart = self._started
+        self.stop()
+        self._replace_network(positions, edges, weights, vertex_map)
+        if restart:
+            self.start(**self._start_kwargs)
+
+    def _replace_network(self, positions, edges, weights, vertex_map):
+        """Store a new network in the shared memory resources
+
+        While a server is running, its positions resource is replaced
+        by a new one instead of being resized under the server.
+
+        """
+        if self._server_running():
+            self._shm_manager.cleanup_mem('positions')
+            self._shm_manager.add_multi_buffer(
+                'positions', positions, 'float32')
+        else:
+            self._shm_manager.replace_array('positions', positions)
+        self._last_generation = self._shm_manager.positions.generation
+        self._positions_frame = np.array(self._shm_manager.positions.data)
+        self._shm_manager.replace_array('edges', edges)
+        if weights is not None:
+            if 'weights' in self._shm_manager._shm_attr_names:
+                self._shm_manager.replace_array('weights', weights)
+            else:
+                self._shm_manager.add_array('weights', weights, 'float32')
+        self._rebuild_buffers(vertex_map)
+
+    def _publish_network(self):
+        """Send the pending network to the running server
+
+        Only one network version is sent at a time: the resources are
+        not modified while the server may be reading them, that is,
+        until it has started and written the last version sent in the
+        info resource. The modifications made meanwhile stay pending.
+
+        Returns
+        -------
+        published : bool
+            False if the server has not followed the last version yet
+
+        """
+        info = self._shm_manager.info._repr
+        # the server has not loaded the resources or not followed the
+        # last version yet
+        if info[1] == 0 or int(info[4]) != self._network_version:
+            if self._server_running():
+                return False
+            self.stop(timeout=0)
+            return True
+
+        positions, edges, weights, vertex_map = self._pending_network
+        self._pending_network = None
+        self._replace_network(positions, edges, weights, vertex_map)
+        if 'vertex_map' in self._shm_manager._shm_attr_names:
+            self._shm_manager.replace_array('vertex_map', vertex_map)
+        else:
+            self._shm_manager.add_array('vertex_map', vertex_map, 'int64')
+        self._network_version += 1
+        weights = None
+        if 'weights' in self._shm_manager._shm_attr_names:
+            weights = self._shm_manager.weights._buffer_name
+        sent = self.send_command(
+            'network', version=self._network_version,
+            positions=self._shm_manager.positions._buffer_name,
+            vertex_map=self._shm_manager.vertex_map._buffer_name,
+            weights=weights)
+        if not sent:
+            # the command ring is full, restart from the new network
+            self.stop()
+            self.start(**self._start_kwargs)
+        return True
+
+    def _rebuild_buffers(self, vertex_map):
+        """Update the extra shared memory resources indexed by node after
+        the network has been modified.
+
+        Parameters
+        ----------
+        vertex_map : ndarray
+            maps the previous node indices to the new ones (-1 if
+            removed)
+
+        """
+        ...
+
+    def server_summary(self):
+        """Return the instrumentation summary of the last layout server
+
+        The summary is only available if the instrumentation was enabled
+        when start was called and after the server has finished.
+
+        Returns
+        -------
+        summary : dict or None
+            see helios.core.instrumentation.summary
+
+        """
+        if self._job_shm is None or self._server_running():
+            return None
+        try:
+            return self._job_shm.descriptor.get('summary')
+        except ValueError:
+            return None
+
+    @property
+    def job(self):
+        """The LayoutJob of the last start when using a worker pool"""
+        return self._job
+
+    def stop(self, timeout=.5):
         """Stop the layout algorithm
 
+        Parameters
+        ----------
+        timeout : float, optional, default 0.5
+            time in seconds to wait the layout server to stop gracefully
+            before killing its subprocess or replacing its worker. If 0,
+            the server is killed right after the stop command is sent;
+            this is what the timers and the garbage collector use.
+
         """
+        self._aio_detach()
         if not self._started:
             return
 
@@ -370,6 +1281,13 @@ class NetworkLayoutIPCRender(ABC):
             self._interval_timer.stop()
             self._interval_timer = None
 
+        if self._wait_thread is not None:
+            self._waiting = False
+            if threading.current_thread() is not self._wait_thread:
+                self._notifier.wake()
+                self._wait_thread.join()
+            self._wait_thread = None
+
         if self._id_timer is not None:
             self._network_draw.iren.DestroyTimer(self._id_timer)
             self._id_timer = None
@@ -378,21 +1296,41 @@ class NetworkLayoutIPCRender(ABC):
             self._network_draw.iren.RemoveObserver(self._id_observer)
             self._id_observer = None
 
+        self.send_command('stop')
+        if self._job is not None:
+            if timeout <= 0 or not self._job.wait(timeout):
+                self._job.cancel()
         if self._pserver is not None:
-            self._pserver.kill()
-            self._pserver.wait()
+            if timeout > 0:
+                try:
+                    self._pserver.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    pass
+            if self._pserver.poll() is None:
+                self._pserver.kill()
+                self._pserver.wait()
             self._pserver = None
-        if self._record_positions:
-            self._shm_manager.cleanup_mem('snapshots_positions')
+        # drop the commands which the server didn't consume
+        self._shm_manager.commands.pop_all()
 
         self._started = False
+        if self._pending_network is not None:
+            positions, edges, weights, vertex_map = self._pending_network
+            self._pending_network = None
+            self._replace_network(positions, edges, weights, vertex_map)
 
     def cleanup(self):
         """Release the shared memory resources
 
         """
         self._shm_manager.cleanup()
+        if self._job_shm is not None:
+            self._job_shm.cleanup()
+            self._job_shm = None
+        if self._notifier is not None:
+            self._notifier.cleanup()
+            self._notifier = None
 
     def __del__(self):
-        self.stop()
+        self.stop(timeout=0)
         self.cleanup()
@@ -0,0 +1,176 @@
+"""Content-Addressed Array Cache
+
+Expensive layout preprocessing results (for example the shortest path
+distances used by MDE) are stored on disk as .npy files inside of a
+directory named after a blake2b digest of the inputs. The arrays are
+memory-mapped back, so a cached graph is loaded without reading the
+whole files.
+
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+_COMPLETE = 'complete'
+
+
+def default_cache_dir():
+    """Return the HELIOS_CACHE_DIR environment variable or
+    ~/.cache/helios
+
+    """
+    return os.environ.get(
+        'HELIOS_CACHE_DIR',
+        os.path.join(os.path.expanduser('~'), '.cache', 'helios'))
+
+
+def array_digest(*arrays, **params):
+    """Return a hex digest of a set of arrays and parameters
+
+    The dtype and the shape of the arrays are part of the digest.
+
+    Parameters
+    ----------
+    *arrays : ndarray or None
+    **params : values with a stable repr, optional
+
+    Returns
+    -------
+    digest : str
+
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for array in arrays:
+        if array is None:
+            h.update(b'none')
+            continue
+        array = np.ascontiguousarray(array)
+        h.update(f'{array.dtype.str}{array.shape}'.encode())
+        h.update(memoryview(array).cast('B'))
+    for key in sorted(params):
+        h.update(f'{key}={params[key]!r};'.encode())
+    return h.hexdigest()
+
+
+class ArrayCache:
+    """A directory of cached arrays indexed by content digests
+
+    Examples
+    --------
+
+        >>> cache = ArrayCache('/tmp/helios')
+        >>> key = array_digest(edges, weights, method='shortest_paths')
+        >>> arrays = cache.load(key)
+        >>> if arrays is None:
+        ...     arrays = cache.save(key, {'distances': distances})
+
+    """
+    def __init__(self, cache_dir=None, mmap_mode='c'):
+        """
+
+        Parameters
+        ----------
+        cache_dir : str, optional
+            If None, default_cache_dir() is used.
+        mmap_mode : str, optional, default 'c'
+            used by np.load. The default, copy-on-write, gives writable
+            arrays which never modify the cache files.
+
+        """
+        self.cache_dir = default_cache_dir() if cache_dir is None \
+            else cache_dir
+        self._mmap_mode = mmap_mode
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def __contains__(self, key):
+        return os.path.exists(
+            os.path.join(self._entry_dir(key), _COMPLETE))
+
+    def load(self, key):
+        """Load the arrays of an entry
+
+        Parameters
+        ----------
+        key : str
+
+        Returns
+        -------
+        arrays : dict or None
+            the memory-mapped arrays or None if the entry doesn't exist
+
+        """
+        if key not in self:
+            return None
+        entry_dir = self._entry_dir(key)
+        arrays = {}
+        for file_name in os.listdir(entry_dir):
+            if file_name.endswith('.npy'):
+                arrays[file_name[:-4]] = np.load(
+                    os.path.join(entry_dir, file_name),
+                    mmap_mode=self._mmap_mode)
+        return arrays
+
+    def save(self, key, arrays):
+        """Store the arrays of an entry
+
+        The files are written in a temporary directory which is renamed
+        at the end, so concurrent processes never see partial entries.
+
+        Parameters
+        ----------
+        key : str
+        arrays : dict
+            maps names to ndarrays
+
+        Returns
+        -------
+        arrays : dict
+            the memory-mapped arrays
+
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{key}-', dir=self.cache_dir)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+            open(os.path.join(tmp_dir, _COMPLETE), 'w').close()
+            try:
+                os.rename(tmp_dir, self._entry_dir(key))
+            except OSError:
+                # another process has stored the same entry
+                if key not in self:
+                    raise
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+        return self.load(key)
+
+    def get_or_compute(self, key, compute):
+        """Load an entry or compute and store it
+
+        Parameters
+        ----------
+        key : str
+        compute : callable
+            returns the dict of arrays
+
+        Returns
+        -------
+        arrays : dict
+
+        """
+        arrays = self.load(key)
+        if arrays is None:
+            arrays = self.save(key, compute())
+        return arrays
+
+    def clear(self):
+        """Remove all the entries"""
+        if os.path.exists(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
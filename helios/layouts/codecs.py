@@ -0,0 +1,261 @@
+"""Snapshot Codecs
+
+Codecs used to store the recorded layout frames (snapshots) in a
+compact form. Each encoded frame has a fixed size, so any frame can be
+located directly in the snapshots resource, and all the decoders are
+vectorized over the nodes.
+
+- float16 halves the memory with a relative error of about 1e-3
+- uint16 and uint8 quantize each frame inside of its own bounding box
+- delta16 and delta8 quantize the difference to the previous decoded
+  frame inside of its own bounding box. The encoder is closed-loop, so
+  the errors don't accumulate. A key frame (quantized as uint16/uint8)
+  is stored every keyframe_interval frames and decoding a frame reads
+  the frames since the last key frame.
+
+Examples
+--------
+
+    >>> codec = get_codec('delta16', (num_nodes, 3))
+    >>> frames = np.zeros((steps, codec.frame_nbytes), dtype='uint8')
+    >>> frames[0] = codec.encode(positions, 0)
+    >>> codec.decode(frames, 0)
+
+"""
+
+import numpy as np
+
+
+class SnapshotCodec:
+    """Store the frames without compression (float32)"""
+    name = 'float32'
+    # number of previous frames needed to decode a frame
+    max_chain = 0
+
+    def __init__(self, frame_shape):
+        """
+
+        Parameters
+        ----------
+        frame_shape : tuple
+            (num_nodes, dimension)
+
+        """
+        self.frame_shape = tuple(frame_shape)
+        self._frame_size = int(np.prod(self.frame_shape))
+
+    @property
+    def frame_nbytes(self):
+        """Size of an encoded frame in bytes"""
+        return self._frame_size*4
+
+    def parameters(self):
+        """Return the JSON serializable parameters of the codec"""
+        return {'name': self.name}
+
+    def encode(self, frame, step):
+        """Encode a frame
+
+        Parameters
+        ----------
+        frame : ndarray
+            array with shape frame_shape
+        step : int
+            the index of the frame
+
+        Returns
+        -------
+        encoded : ndarray
+            uint8 array with frame_nbytes elements
+
+        """
+        return np.ascontiguousarray(
+            frame, dtype=np.float32).reshape(-1).view(np.uint8)
+
+    def decode(self, frames, step):
+        """Decode a frame
+
+        Parameters
+        ----------
+        frames : ndarray
+            uint8 array with shape (num_frames, frame_nbytes). The frames
+            are stored as a ring: the frame step is frames[step %
+            num_frames].
+        step : int
+
+        Returns
+        -------
+        frame : ndarray
+            float32 array with shape frame_shape
+
+        """
+        row = frames[step % len(frames)]
+        return row.view(np.float32).reshape(self.frame_shape)
+
+
+class Float16Codec(SnapshotCodec):
+    name = 'float16'
+
+    @property
+    def frame_nbytes(self):
+        return self._frame_size*2
+
+    def encode(self, frame, step):
+        return np.ascontiguousarray(
+            frame, dtype=np.float16).reshape(-1).view(np.uint8)
+
+    def decode(self, frames, step):
+        row = frames[step % len(frames)]
+        return row.view(np.float16).reshape(
+            self.frame_shape).astype(np.float32)
+
+
+class QuantizedCodec(SnapshotCodec):
+    """Quantize each frame inside of its bounding box
+
+    Each encoded frame stores a float32 header
+    [key, lower bounds, scales] padded to 8 bytes and the quantized
+    coordinates.
+
+    """
+    def __init__(self, frame_shape, bits=16):
+        super().__init__(frame_shape)
+        if bits not in (8, 16):
+            raise ValueError('Only 8 and 16 bits are supported')
+        self.bits = bits
+        self.name = f'uint{bits}'
+        self._qtype = np.uint8 if bits == 8 else np.uint16
+        self._levels = 2**bits - 1
+        dimension = self.frame_shape[1]
+        self._header_items = 1 + 2*dimension
+        self._header_nbytes = -(-self._header_items*4//8)*8
+
+    @property
+    def frame_nbytes(self):
+        payload = self._frame_size*np.dtype(self._qtype).itemsize
+        return self._header_nbytes + -(-payload//8)*8
+
+    def _quantize(self, values, key):
+        lower = values.min(axis=0)
+        scale = (values.max(axis=0) - lower)/self._levels
+        scale[scale == 0] = 1
+        quantized = np.rint((values - lower)/scale).astype(self._qtype)
+        encoded = np.zeros(self.frame_nbytes, dtype=np.uint8)
+        header = encoded[0:self._header_items*4].view(np.float32)
+        header[0] = key
+        header[1:1 + len(lower)] = lower
+        header[1 + len(lower):] = scale
+        payload = quantized.reshape(-1).view(np.uint8)
+        encoded[self._header_nbytes:self._header_nbytes + len(payload)] = \
+            payload
+        return encoded, lower + quantized*scale
+
+    def _dequantize(self, row, out=None):
+        header = row[0:self._header_items*4].view(np.float32)
+        dimension = self.frame_shape[1]
+        lower = header[1:1 + dimension]
+        scale = header[1 + dimension:]
+        payload_nbytes = self._frame_size*np.dtype(self._qtype).itemsize
+        quantized = row[
+            self._header_nbytes:self._header_nbytes + payload_nbytes].view(
+                self._qtype).reshape(self.frame_shape)
+        if out is None:
+            return lower + quantized*scale
+        out += lower
+        out += quantized*scale
+        return out
+
+    def parameters(self):
+        return {'name': self.name}
+
+    def encode(self, frame, step):
+        encoded, _ = self._quantize(
+            np.asarray(frame, dtype=np.float32), key=1)
+        return encoded
+
+    def decode(self, frames, step):
+        return self._dequantize(
+            frames[step % len(frames)]).astype(np.float32)
+
+
+class DeltaCodec(QuantizedCodec):
+    """Quantize the difference to the previous decoded frame
+
+    The encoder is stateful: the frames must be encoded in order. A
+    key frame is stored every keyframe_interval frames or when a step
+    is skipped.
+
+    """
+    def __init__(self, frame_shape, bits=16, keyframe_interval=16):
+        super().__init__(frame_shape, bits)
+        self.name = f'delta{bits}'
+        self.keyframe_interval = int(keyframe_interval)
+        self.max_chain = self.keyframe_interval - 1
+        self._previous = None
+        self._previous_step = None
+
+    def parameters(self):
+        return {'name': self.name,
+                'keyframe_interval': self.keyframe_interval}
+
+    def encode(self, frame, step):
+        frame = np.asarray(frame, dtype=np.float32)
+        key = step % self.keyframe_interval == 0 or \
+            self._previous_step != step - 1
+        if key:
+            encoded, decoded = self._quantize(frame, key=1)
+        else:
+            encoded, delta = self._quantize(frame - self._previous, key=0)
+            decoded = self._previous + delta
+        self._previous = decoded
+        self._previous_step = step
+        return encoded
+
+    def decode(self, frames, step):
+        num_frames = len(frames)
+        first = max(0, step - self.max_chain)
+        candidates = np.arange(first, step + 1)
+        keys = frames[candidates % num_frames, 0:4].copy().view(
+            np.float32)[:, 0]
+        key_steps = candidates[keys == 1]
+        if len(key_steps) == 0:
+            raise ValueError(
+                f'The key frame of the step {step} is not available')
+        out = np.zeros(self.frame_shape, dtype=np.float64)
+        for index in range(key_steps[-1], step + 1):
+            self._dequantize(frames[index % num_frames], out)
+        return out.astype(np.float32)
+
+
+_CODECS = {
+    'float32': lambda shape: SnapshotCodec(shape),
+    'float16': lambda shape: Float16Codec(shape),
+    'uint16': lambda shape: QuantizedCodec(shape, 16),
+    'uint8': lambda shape: QuantizedCodec(shape, 8),
+    'delta16': lambda shape, **kw: DeltaCodec(shape, 16, **kw),
+    'delta8': lambda shape, **kw: DeltaCodec(shape, 8, **kw),
+}
+
+
+def get_codec(name, frame_shape, **parameters):
+    """Create a snapshot codec
+
+    Parameters
+    ----------
+    name : str
+        float32, float16, uint16, uint8, delta16 or delta8
+    frame_shape : tuple
+        (num_nodes, dimension)
+    **parameters : optional
+        keyframe_interval for the delta codecs
+
+    Returns
+    -------
+    codec : SnapshotCodec
+
+    """
+    if name not in _CODECS:
+        raise ValueError(
+            f'Unknown codec {name}. The codecs available are: '
+            f'{list(_CODECS.keys())}')
+    return _CODECS[name](tuple(frame_shape), **parameters)
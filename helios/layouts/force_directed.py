@@ -9,13 +9,31 @@ References
 
 """
 
+import asyncio
+
 import numpy as np
 import heliosFR
 
 from fury.stream.tools import IntervalTimer
+from helios.core import instrumentation
+from helios.core.network import edges_and_weights
 from helios.layouts.base import NetworkLayoutAsync
 
 
+def _uint64_edges(edges):
+    """Return the edges as the contiguous uint64 array used by heliosFR
+
+    A contiguous int64 edge list, such as the one stored by CSRNetwork,
+    is viewed as uint64 without copying since the vertex indices are
+    non negative.
+
+    """
+    edges = np.asarray(edges)
+    if edges.dtype == np.int64 and edges.flags.c_contiguous:
+        return edges.view(np.uint64)
+    return np.ascontiguousarray(edges, dtype=np.uint64)
+
+
 class HeliosFr(NetworkLayoutAsync):
     """A 2D/3D Force-directed layout method
 
@@ -42,7 +60,7 @@ class HeliosFr(NetworkLayoutAsync):
 
         Parameters
         ----------
-        edges : ndarray
+        edges : ndarray or Network
         network_draw : NetworkDraw
         viscosity : float, optional
         a : float, optional
@@ -66,19 +84,52 @@ class HeliosFr(NetworkLayoutAsync):
         self._interval_timer = None
         self._nodes_count = network_draw.positions.shape[0]
         self._update_interval_workers = update_interval_workers
+        self._viscosity = viscosity
+        self._a = a
+        self._b = b
+        self._max_workers = max_workers
 
         self._positions = np.ascontiguousarray(
             network_draw.positions, dtype=np.float32)
-        self._edges = np.ascontiguousarray(edges, dtype=np.uint64)
+        edges, _ = edges_and_weights(edges)
+        self._edges = _uint64_edges(edges)
 
         if velocities is None:
             velocities = np.zeros((self._nodes_count, 3), dtype=np.float32)
+        self._velocities = np.ascontiguousarray(velocities, dtype=np.float32)
+        self._create_layout()
 
+    def _create_layout(self):
         self._layout = heliosFR.FRLayout(
-            self._edges, self._positions, velocities, a, b, viscosity,
-            maxWorkers=max_workers,
+            self._edges, self._positions, self._velocities, self._a,
+            self._b, self._viscosity, maxWorkers=self._max_workers,
             updateInterval=self._update_interval_workers)
 
+    def _streaming_state(self):
+        return self._edges.view(np.int64), None, self._positions
+
+    def _rebuild(self, positions, edges, weights, vertex_map):
+        """Replace the network keeping the positions and the velocities
+        of the remaining nodes
+
+        """
+        started = self._started
+        self.stop()
+        self._network_draw.set_network(
+            positions, edges, vertex_map=vertex_map)
+        kept = vertex_map >= 0
+        velocities = np.zeros(
+            (positions.shape[0], 3), dtype=np.float32)
+        velocities[vertex_map[kept]] = self._velocities[kept]
+        self._velocities = velocities
+        self._nodes_count = positions.shape[0]
+        self._positions = np.ascontiguousarray(
+            self._network_draw.positions, dtype=np.float32)
+        self._edges = _uint64_edges(edges)
+        self._create_layout()
+        if started:
+            self.start(self._ms)
+
     def start(self, ms=15):
         """Starts the helios force-directed layout using others threads (async).
 
@@ -94,6 +145,7 @@ class HeliosFr(NetworkLayoutAsync):
 
         self._layout.start()
         self._started = True
+        self._ms = ms
 
         if ms > 0:
             if ms < self._update_interval_workers:
@@ -107,6 +159,7 @@ class HeliosFr(NetworkLayoutAsync):
         helios force-directed algorithm
 
         """
+        self._aio_detach()
         if not self._started:
             return
 
@@ -117,6 +170,24 @@ class HeliosFr(NetworkLayoutAsync):
         self._layout.stop()
         self._started = False
 
+    def _aio_begin(self, ms):
+        self.start(ms=0)
+        interval = max(ms, self._update_interval_workers, 1)/1000
+        self._aio_add_task(self._aio_tick(interval))
+
+    async def _aio_tick(self, interval):
+        # the worker threads move the nodes continuously, so each tick
+        # draws a new frame
+        while True:
+            await asyncio.sleep(interval)
+            self._aio_frame_ready()
+
+    def _aio_positions(self):
+        return np.array(self._positions)
+
+    def _aio_end(self):
+        self.stop()
+
     def steps(self, iterations):
         """A Sync version of the helios force-directed algorithm.
 
@@ -125,5 +196,7 @@ class HeliosFr(NetworkLayoutAsync):
         iterations : int
 
         """
-        self._layout.iterate(iterations=iterations)
+        with instrumentation.timer('heliosfr.steps'):
+            self._layout.iterate(iterations=iterations)
+        instrumentation.count('heliosfr.iterations', iterations)
         self.update()
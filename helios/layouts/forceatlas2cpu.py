@@ -0,0 +1,575 @@
+"""IPC-ForceAtlas2: Network Layout on the CPU
+
+ForceAtlas2 layout algorithm through IPC using NumPy (and Numba, when
+available). The repulsion is approximated with a Barnes-Hut quadtree
+built with Morton codes; the force accumulation is split in chunks of
+nodes processed by a pool of threads, or by a parallel Numba kernel.
+
+References
+----------
+    [1] M. Jacomy, T. Venturini, S. Heymann, and M. Bastian,
+    “ForceAtlas2, a Continuous Graph Layout Algorithm for Handy Network
+    Visualization Designed for the Gephi Software,” PLoS ONE, vol. 9,
+    no. 6, p. e98679, 2014.
+    [2] J. Barnes and P. Hut, “A hierarchical O(N log N) force-calculation
+    algorithm,” Nature, vol. 324, no. 6096, pp. 446–449, 1986.
+
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+from helios.layouts.base import NetworkLayoutIPCServerCalc
+
+_MAX_DEPTH = 20
+
+
+def _spread_bits(values):
+    """Insert a zero bit between each bit of the (21 bits) values"""
+    values = values.astype(np.uint64) & np.uint64(0x1fffff)
+    for shift, mask in [
+            (16, 0x0000ffff0000ffff), (8, 0x00ff00ff00ff00ff),
+            (4, 0x0f0f0f0f0f0f0f0f), (2, 0x3333333333333333),
+            (1, 0x5555555555555555)]:
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+class QuadTree:
+    """A Barnes-Hut quadtree stored as flat arrays
+
+    The cells of all the levels are stored contiguously. The children of
+    the cell c are the cells child_start[c]:child_start[c]+child_count[c].
+    Cells with a single node, or in the deepest level, have no children.
+
+    Attributes
+    ----------
+    centers_of_mass : ndarray
+        array with shape (n_cells, 2)
+    masses : ndarray
+    sizes : ndarray
+        the side length of each cell
+    child_start : ndarray
+    child_count : ndarray
+
+    """
+    def __init__(self, positions, masses, max_depth=_MAX_DEPTH):
+        """
+
+        Parameters
+        ----------
+        positions : ndarray
+            array with shape (num_nodes, 2)
+        masses : ndarray
+        max_depth : int, optional, default 20
+
+        """
+        num_nodes = positions.shape[0]
+        mins = positions.min(axis=0)
+        size = float((positions.max(axis=0) - mins).max())
+        size = 1. if size == 0 else size*(1 + 1e-6)
+        resolution = 1 << max_depth
+        cells = ((positions - mins)/size*resolution).astype(np.int64)
+        np.clip(cells, 0, resolution - 1, out=cells)
+        codes = _spread_bits(cells[:, 0]) | (
+            _spread_bits(cells[:, 1]) << np.uint64(1))
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        sorted_masses = masses[order]
+        weighted = positions[order]*sorted_masses[:, np.newaxis]
+
+        level_keys = []
+        level_counts = []
+        level_masses = []
+        level_com = []
+        level_sizes = []
+        # nodes inside of the cells which will be subdivided
+        active = np.ones(num_nodes, dtype=bool)
+        for level in range(max_depth + 1):
+            keys = codes[active] >> np.uint64(2*(max_depth - level))
+            starts = np.flatnonzero(
+                np.r_[True, keys[1:] != keys[:-1]])
+            counts = np.diff(np.r_[starts, len(keys)])
+            cell_masses = np.add.reduceat(sorted_masses[active], starts)
+            com = np.add.reduceat(weighted[active], starts, axis=0)
+            com /= cell_masses[:, np.newaxis]
+
+            level_keys.append(keys[starts])
+            level_counts.append(counts)
+            level_masses.append(cell_masses)
+            level_com.append(com)
+            level_sizes.append(np.full(len(starts), size/(1 << level)))
+            subdivide = counts > 1
+            if not np.any(subdivide):
+                break
+            active_positions = np.flatnonzero(active)
+            active = np.zeros(num_nodes, dtype=bool)
+            active[active_positions[np.repeat(subdivide, counts)]] = True
+
+        offsets = np.cumsum([0] + [len(keys) for keys in level_keys])
+        child_start = np.zeros(offsets[-1], dtype=np.int64)
+        child_count = np.zeros(offsets[-1], dtype=np.int64)
+        for level in range(len(level_keys) - 1):
+            keys = level_keys[level]
+            child_keys = level_keys[level + 1]
+            first = np.searchsorted(child_keys, keys << np.uint64(2))
+            last = np.searchsorted(
+                child_keys, (keys << np.uint64(2)) + np.uint64(4))
+            child_start[offsets[level]:offsets[level + 1]] = \
+                first + offsets[level + 1]
+            child_count[offsets[level]:offsets[level + 1]] = last - first
+
+        self.centers_of_mass = np.concatenate(level_com)
+        self.masses = np.concatenate(level_masses)
+        self.sizes = np.concatenate(level_sizes)
+        self.child_start = child_start
+        self.child_count = child_count
+
+    def __len__(self):
+        return len(self.masses)
+
+
+def _repulsion_chunk(tree, positions, masses, theta, nodes):
+    """Barnes-Hut repulsion of a chunk of nodes.
+
+    The tree is traversed breadth-first for all the nodes of the chunk
+    at the same time. Returns the forces without the scaling ratio.
+
+    """
+    num = len(nodes)
+    forces = np.zeros((num, 2))
+    pair_nodes = np.arange(num)
+    pair_cells = np.zeros(num, dtype=np.int64)
+    node_positions = positions[nodes]
+    node_masses = masses[nodes]
+    while len(pair_nodes) > 0:
+        delta = node_positions[pair_nodes] - tree.centers_of_mass[pair_cells]
+        dist2 = np.einsum('ij,ij->i', delta, delta)
+        children = tree.child_count[pair_cells]
+        accept = (children == 0) | (
+            tree.sizes[pair_cells]**2 < theta**2*dist2)
+        valid = accept & (dist2 > 1e-18)
+        factor = node_masses[pair_nodes[valid]]*tree.masses[
+            pair_cells[valid]]/dist2[valid]
+        for axis in range(2):
+            forces[:, axis] += np.bincount(
+                pair_nodes[valid], weights=factor*delta[valid, axis],
+                minlength=num)
+
+        expand = ~accept
+        counts = children[expand]
+        first = tree.child_start[pair_cells[expand]]
+        pair_nodes = np.repeat(pair_nodes[expand], counts)
+        offsets = np.cumsum(counts) - counts
+        pair_cells = np.repeat(first - offsets, counts) + np.arange(
+            counts.sum())
+    return forces
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(parallel=True, cache=True)
+    def _repulsion_numba(
+            com, cell_masses, sizes, child_start, child_count,
+            positions, masses, theta, forces):
+        num_nodes = positions.shape[0]
+        theta2 = theta*theta
+        for i in numba.prange(num_nodes):
+            stack = np.empty(4*(_MAX_DEPTH + 2), dtype=np.int64)
+            stack[0] = 0
+            top = 1
+            fx = 0.
+            fy = 0.
+            while top > 0:
+                top -= 1
+                cell = stack[top]
+                dx = positions[i, 0] - com[cell, 0]
+                dy = positions[i, 1] - com[cell, 1]
+                dist2 = dx*dx + dy*dy
+                if child_count[cell] == 0 or \
+                        sizes[cell]*sizes[cell] < theta2*dist2:
+                    if dist2 > 1e-18:
+                        factor = masses[i]*cell_masses[cell]/dist2
+                        fx += factor*dx
+                        fy += factor*dy
+                else:
+                    for child in range(child_count[cell]):
+                        stack[top] = child_start[cell] + child
+                        top += 1
+            forces[i, 0] = fx
+            forces[i, 1] = fy
+
+
+def repulsion_forces(
+        positions, masses, theta=1.0, max_workers=None, chunk_size=4096,
+        use_numba=NUMBA_AVAILABLE):
+    """Compute the ForceAtlas2 repulsion using a Barnes-Hut quadtree
+
+    Parameters
+    ----------
+    positions : ndarray
+        array with shape (num_nodes, 2)
+    masses : ndarray
+        the mass of each node (degree + 1 in ForceAtlas2)
+    theta : float, optional, default 1.0
+        Barnes-Hut opening criterion. Zero computes the exact forces
+        (except for coincident nodes).
+    max_workers : int, optional
+        number of threads used by the NumPy implementation
+    chunk_size : int, optional, default 4096
+        number of nodes processed together by the NumPy implementation
+    use_numba : bool, optional
+
+    Returns
+    -------
+    forces : ndarray
+        array with shape (num_nodes, 2) without the scaling ratio
+
+    """
+    tree = QuadTree(positions, masses)
+    num_nodes = positions.shape[0]
+    forces = np.zeros((num_nodes, 2))
+    if use_numba:
+        _repulsion_numba(
+            tree.centers_of_mass, tree.masses, tree.sizes,
+            tree.child_start, tree.child_count,
+            positions, masses, float(theta), forces)
+        return forces
+
+    chunks = [
+        np.arange(start, min(start + chunk_size, num_nodes))
+        for start in range(0, num_nodes, chunk_size)]
+
+    def compute(nodes):
+        forces[nodes] = _repulsion_chunk(
+            tree, positions, masses, theta, nodes)
+
+    if len(chunks) == 1 or max_workers == 1:
+        for nodes in chunks:
+            compute(nodes)
+    else:
+        # NumPy releases the GIL inside of the heavy operations
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(compute, chunks))
+    return forces
+
+
+class ForceAtlas2Engine:
+    """ForceAtlas2 iterations over a NumPy array of positions
+
+    Attributes
+    ----------
+    lin_log_mode, edge_weight_influence, jitter_tolerance,
+    barnes_hut_optimize, barnes_hut_theta, scaling_ratio,
+    strong_gravity_mode, gravity : parameters of the algorithm
+        they can be changed between two calls of iterate.
+
+    """
+    def __init__(
+        self,
+        edges,
+        num_nodes,
+        weights=None,
+        outbound_attraction_distribution=True,
+        lin_log_mode=False,
+        edge_weight_influence=1.0,
+        jitter_tolerance=1.0,
+        barnes_hut_optimize=True,
+        barnes_hut_theta=1.0,
+        scaling_ratio=2.0,
+        strong_gravity_mode=False,
+        gravity=1.0,
+        max_workers=None,
+    ):
+        """
+
+        Parameters
+        ----------
+        edges : ndarray
+            array with shape (n_edges, 2)
+        num_nodes : int
+        weights : array, optional
+        outbound_attraction_distribution : bool, default True
+        lin_log_mode : bool, default False
+        edge_weight_influence : float, default 1.0
+        jitter_tolerance : float, default 1.0
+        barnes_hut_optimize : bool, default True
+        barnes_hut_theta : float, default 1.0
+        scaling_ratio : float, default 2.0
+        strong_gravity_mode : bool, default False
+        gravity : float, default 1.0
+        max_workers : int, optional
+            number of threads. If None, the number of CPUs is used.
+
+        """
+        self._outbound_attraction_distribution = \
+            outbound_attraction_distribution
+        self.set_network(edges, num_nodes, weights)
+
+        self.lin_log_mode = lin_log_mode
+        self.edge_weight_influence = edge_weight_influence
+        self.jitter_tolerance = jitter_tolerance
+        self.barnes_hut_optimize = barnes_hut_optimize
+        self.barnes_hut_theta = barnes_hut_theta
+        self.scaling_ratio = scaling_ratio
+        self.strong_gravity_mode = strong_gravity_mode
+        self.gravity = gravity
+        self.max_workers = os.cpu_count() if max_workers is None \
+            else max_workers
+
+        self._speed = 1.
+        self._speed_efficiency = 1.
+
+    def set_network(self, edges, num_nodes, weights=None, vertex_map=None):
+        """Replace the network keeping the state of the iterations
+
+        Parameters
+        ----------
+        edges : ndarray
+            array with shape (n_edges, 2)
+        num_nodes : int
+        weights : array, optional
+        vertex_map : ndarray, optional
+            maps the previous node indices to the new ones (-1 if
+            removed). If None, the previous forces are discarded.
+
+        """
+        edges = np.asarray(edges, dtype=np.int64)
+        # drop the self loops, they do not contribute to the forces
+        keep = edges[:, 0] != edges[:, 1]
+        self._sources = edges[keep, 0]
+        self._targets = edges[keep, 1]
+        self._weights = None if weights is None else np.asarray(
+            weights, dtype=np.float64)[keep]
+        self._num_nodes = num_nodes
+        self.masses = np.bincount(
+            edges.ravel(), minlength=num_nodes).astype(np.float64) + 1
+        self._outbound_compensation = self.masses.mean() if \
+            self._outbound_attraction_distribution else None
+
+        previous_forces = np.zeros((num_nodes, 2))
+        if vertex_map is not None:
+            kept = vertex_map >= 0
+            previous_forces[vertex_map[kept]] = \
+                self._previous_forces[kept]
+        self._previous_forces = previous_forces
+
+    def _attraction(self, positions, forces):
+        delta = positions[self._sources] - positions[self._targets]
+        factor = np.ones(len(self._sources))
+        if self._weights is not None and self.edge_weight_influence != 0:
+            factor *= self._weights**self.edge_weight_influence
+        if self.lin_log_mode:
+            dist = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+            nonzero = dist > 0
+            factor[nonzero] *= np.log1p(dist[nonzero])/dist[nonzero]
+        if self._outbound_compensation is not None:
+            factor *= self._outbound_compensation/self.masses[self._sources]
+        for axis in range(2):
+            edge_forces = factor*delta[:, axis]
+            forces[:, axis] -= np.bincount(
+                self._sources, weights=edge_forces,
+                minlength=self._num_nodes)
+            forces[:, axis] += np.bincount(
+                self._targets, weights=edge_forces,
+                minlength=self._num_nodes)
+
+    def _gravity(self, positions, forces):
+        if self.strong_gravity_mode:
+            factor = self.gravity*self.scaling_ratio*self.masses
+        else:
+            dist = np.sqrt(np.einsum('ij,ij->i', positions, positions))
+            factor = np.zeros(self._num_nodes)
+            nonzero = dist > 0
+            factor[nonzero] = self.gravity*self.masses[nonzero]/dist[
+                nonzero]
+        forces -= factor[:, np.newaxis]*positions
+
+    def forces(self, positions):
+        """Return the ForceAtlas2 forces
+
+        Parameters
+        ----------
+        positions : ndarray
+            array with shape (num_nodes, 2)
+
+        Returns
+        -------
+        forces : ndarray
+
+        """
+        theta = self.barnes_hut_theta if self.barnes_hut_optimize else 0.
+        forces = self.scaling_ratio*repulsion_forces(
+            positions, self.masses, theta, self.max_workers)
+        self._gravity(positions, forces)
+        self._attraction(positions, forces)
+        return forces
+
+    def _adjust_speed(self, forces):
+        """Adaptive speed from the ForceAtlas2 paper (swinging and
+        traction of the nodes)
+
+        """
+        swinging = self.masses*np.linalg.norm(
+            forces - self._previous_forces, axis=1)
+        traction = self.masses*np.linalg.norm(
+            forces + self._previous_forces, axis=1)/2
+        total_swinging = swinging.sum()
+        total_traction = traction.sum()
+
+        num_nodes = self._num_nodes
+        estimated_jitter = .05*np.sqrt(num_nodes)
+        jitter = self.jitter_tolerance*max(
+            np.sqrt(estimated_jitter),
+            min(10, estimated_jitter*total_traction/num_nodes**2))
+        if total_traction > 0 and total_swinging/total_traction > 2.:
+            if self._speed_efficiency > .05:
+                self._speed_efficiency *= .5
+            jitter = max(jitter, self.jitter_tolerance)
+
+        if total_swinging == 0:
+            target_speed = float('inf')
+        else:
+            target_speed = (
+                jitter*self._speed_efficiency*total_traction /
+                total_swinging)
+        if total_swinging > jitter*total_traction:
+            if self._speed_efficiency > .05:
+                self._speed_efficiency *= .7
+        elif self._speed < 1000:
+            self._speed_efficiency *= 1.3
+
+        max_rise = .5
+        self._speed = self._speed + min(
+            target_speed - self._speed, max_rise*self._speed)
+        return self._speed/(1 + np.sqrt(self._speed*swinging))
+
+    def iterate(self, positions, iterations=1):
+        """Perform ForceAtlas2 iterations updating positions in place
+
+        Parameters
+        ----------
+        positions : ndarray
+            float64 array with shape (num_nodes, 2)
+        iterations : int, optional, default 1
+
+        """
+        for _ in range(iterations):
+            forces = self.forces(positions)
+            factors = self._adjust_speed(forces)
+            positions += forces*factors[:, np.newaxis]
+            self._previous_forces = forces
+
+
+class ForceAtlas2CPUServerCalc(NetworkLayoutIPCServerCalc):
+    """This Obj. reads the network information stored in a shared memory
+        resource and execute the ForceAtlas2 layout algorithm on the CPU
+
+    """
+    _live_parameters = (
+        'lin_log_mode', 'edge_weight_influence', 'jitter_tolerance',
+        'barnes_hut_optimize', 'barnes_hut_theta', 'scaling_ratio',
+        'strong_gravity_mode', 'gravity',
+    )
+
+    def __init__(
+        self,
+        edges_buffer_name,
+        positions_buffer_name,
+        info_buffer_name,
+        weights_buffer_name=None,
+        snapshots_buffer_name=None,
+        lin_log_mode=False,
+        edge_weight_influence=1.0,
+        jitter_tolerance=1.0,
+        barnes_hut_optimize=True,
+        barnes_hut_theta=1.0,
+        scaling_ratio=2.0,
+        strong_gravity_mode=False,
+        gravity=1.0,
+        max_workers=None,
+        commands_buffer_name=None,
+    ):
+        """
+
+        Parameters
+        -----------
+        edges_buffer_name : str
+        positions_buffer_name : str
+        info_buffer_name : str
+        weights_buffer_name : str, optional
+        snapshots_buffer_name : str, optional
+        lin_log_mode : bool, default False
+        edge_weight_influence : float, default 1.0
+        jitter_tolerance : float, default 1.0
+        barnes_hut_optimize : bool, default True
+        barnes_hut_theta : float, default 1.0
+        scaling_ratio : float, default 2.0
+        strong_gravity_mode : bool, default False
+        gravity : float, default 1.0
+        max_workers : int, optional
+        commands_buffer_name : str, optional
+
+        """
+        super().__init__(
+            edges_buffer_name,
+            positions_buffer_name,
+            info_buffer_name,
+            weights_buffer_name,
+            snapshots_buffer_name,
+            commands_buffer_name,
+        )
+        weights = None
+        if weights_buffer_name is not None:
+            weights = self._shm_manager.weights.data
+        self._positions = np.array(
+            self._shm_manager.positions.data[:, 0:2], dtype=np.float64)
+        self._engine = ForceAtlas2Engine(
+            self._shm_manager.edges.data,
+            self._shm_manager.positions._num_rows,
+            weights,
+            lin_log_mode=lin_log_mode,
+            edge_weight_influence=edge_weight_influence,
+            jitter_tolerance=jitter_tolerance,
+            barnes_hut_optimize=barnes_hut_optimize,
+            barnes_hut_theta=barnes_hut_theta,
+            scaling_ratio=scaling_ratio,
+            strong_gravity_mode=strong_gravity_mode,
+            gravity=gravity,
+            max_workers=max_workers,
+        )
+
+    def _set_parameter(self, name, value):
+        if name in self._live_parameters:
+            setattr(self._engine, name, value)
+        else:
+            super()._set_parameter(name, value)
+
+    def _network_changed(self, positions, vertex_map):
+        weights = None
+        if 'weights' in self._shm_manager._shm_attr_names:
+            weights = self._shm_manager.weights.data
+        self._positions = np.array(positions[:, 0:2], dtype=np.float64)
+        self._engine.set_network(
+            self._shm_manager.edges.data, len(positions), weights,
+            vertex_map)
+
+    def start(self, steps=100, iters_by_step=3):
+        # -1 means the computation has been intialized
+        self._shm_manager.info._repr[1] = -1
+        self._iters_by_step = iters_by_step
+        for step in range(steps):
+            if self._stop_requested():
+                break
+            self._engine.iterate(self._positions, self._iters_by_step)
+            self._apply_pins(self._positions)
+            self._update(self._positions, step)
+        # to inform that everthing worked
+        self._shm_manager.info._repr[1] = 1
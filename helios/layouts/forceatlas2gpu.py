@@ -37,6 +37,7 @@ class ForceAtlas2ServerCalc(NetworkLayoutIPCServerCalc):
         scaling_ratio=2.0,
         strong_gravity_mode=False,
         gravity=1.0,
+        commands_buffer_name=None,
     ):
         """
 
@@ -58,6 +59,7 @@ class ForceAtlas2ServerCalc(NetworkLayoutIPCServerCalc):
         scaling_ratio : float, default 2.0
         strong_gravity_mode : bool, default False
         gravity : float, default 1.0
+        commands_buffer_name : str, optional
 
         """
         super().__init__(
@@ -66,46 +68,62 @@ class ForceAtlas2ServerCalc(NetworkLayoutIPCServerCalc):
             info_buffer_name,
             weights_buffer_name,
             snapshots_buffer_name,
+            commands_buffer_name,
         )
-        self._vertex = np.arange(0, self._shm_manager.positions._repr.shape[0])
+        self._build_graph(self._shm_manager.positions.data)
+
+        self.lin_log_mode = lin_log_mode
+        self.edge_weight_influence = edge_weight_influence
+        self.jitter_tolerance = jitter_tolerance
+        self.barnes_hut_optimize = barnes_hut_optimize
+        self.barnes_hut_theta = barnes_hut_theta
+        self.scaling_ratio = scaling_ratio
+        self.strong_gravity_mode = strong_gravity_mode
+        self.gravity = gravity
+
+    _live_parameters = (
+        'lin_log_mode', 'edge_weight_influence', 'jitter_tolerance',
+        'barnes_hut_optimize', 'barnes_hut_theta', 'scaling_ratio',
+        'strong_gravity_mode', 'gravity',
+    )
+
+    def _build_graph(self, positions):
+        self._vertex = np.arange(0, positions.shape[0])
 
         self._pos_cudf = cudf.DataFrame(
-            np.c_[self._shm_manager.positions._repr, self._vertex],
+            np.c_[positions, self._vertex],
             columns=['x', 'y', 'vertex']
         )
-        if weights_buffer_name is not None:
+        if 'weights' in self._shm_manager._shm_attr_names:
             df = cudf.DataFrame(
                 np.c_[
-                    self._shm_manager.edges._repr,
-                    self._shm_manager.weights._repr
+                    self._shm_manager.edges.data,
+                    self._shm_manager.weights.data
                 ],
                 columns=['source', 'destination', 'weight'])
             self._G = cg.Graph()
             self._G.from_cudf_edgelist(df, edge_attr='weight')
         else:
             df = cudf.DataFrame(
-                self._shm_manager.edges._repr,
+                self._shm_manager.edges.data,
                 columns=['source', 'destination'])
             self._G = cg.Graph()
 
             self._G.from_cudf_edgelist(df)
 
-        self.lin_log_mode = lin_log_mode
-        self.edge_weight_influence = edge_weight_influence
-        self.jitter_tolerance = jitter_tolerance
-        self.barnes_hut_optimize = barnes_hut_optimize
-        self.barnes_hut_theta = barnes_hut_theta
-        self.scaling_ratio = scaling_ratio
-        self.strong_gravity_mode = strong_gravity_mode
-        self.gravity = gravity
+    def _network_changed(self, positions, vertex_map):
+        self._build_graph(positions)
 
     def start(self, steps=100, iters_by_step=3):
         # -1 means the computation has been intialized
         self._shm_manager.info._repr[1] = -1
+        self._iters_by_step = iters_by_step
         for step in range(steps):
+            if self._stop_requested():
+                break
             self._pos_cudf = cg.layout.force_atlas2(
                 self._G,
-                max_iter=iters_by_step,
+                max_iter=self._iters_by_step,
                 pos_list=self._pos_cudf,
                 outbound_attraction_distribution=True,
                 lin_log_mode=self.lin_log_mode,
@@ -113,20 +131,27 @@ class ForceAtlas2ServerCalc(NetworkLayoutIPCServerCalc):
                 jitter_tolerance=self.jitter_tolerance,
                 barnes_hut_optimize=self.barnes_hut_optimize,
                 barnes_hut_theta=self.barnes_hut_theta,
-                scaling_ratio=self.scaling_raio,
+                scaling_ratio=self.scaling_ratio,
                 strong_gravity_mode=self.strong_gravity_mode,
                 gravity=self.gravity,
                 verbose=False,
                 callback=None)
 
-            self._update(
-                self._pos_cudf.to_pandas().to_numpy()[:, 0:2], step)
+            positions = self._pos_cudf.to_pandas().to_numpy()[:, 0:2]
+            if self._apply_pins(positions):
+                self._pos_cudf = cudf.DataFrame(
+                    np.c_[positions, self._vertex],
+                    columns=['x', 'y', 'vertex']
+                )
+            self._update(positions, step)
         # to inform that everthing worked
         self._shm_manager.info._repr[1] = 1
 
 
 class ForceAtlas2(NetworkLayoutIPCRender):
-    """Performs the ForceAtlas2 algorithm using the cugraph lib.
+    """Performs the ForceAtlas2 algorithm using the cugraph lib or,
+    when cugraph is not available, the NumPy/Numba CPU implementation
+    (see helios.layouts.forceatlas2cpu).
 
     The ForceAtlas will be called inside of a different process which
     comunicates with this object through the SharedMemory
@@ -149,12 +174,15 @@ class ForceAtlas2(NetworkLayoutIPCRender):
         scaling_ratio=2.0,
         strong_gravity_mode=False,
         gravity=1.0,
+        worker_pool=None,
+        backend='auto',
+        max_workers=None,
     ):
         """
 
         Parameters
         -----------
-        edges : ndarray
+        edges : ndarray or Network
         network_draw : NetworkDraw
         weights: array, optional
             edge weights
@@ -166,6 +194,14 @@ class ForceAtlas2(NetworkLayoutIPCRender):
         scaling_ratio : float, default 2.0
         strong_gravity_mode : bool, default False
         gravity : float, default 1.0
+        worker_pool : LayoutWorkerPool, optional
+            If given, the ForceAtlas2 will run inside of a persistent
+            worker.
+        backend : str, optional, default 'auto'
+            'gpu' (cugraph), 'cpu' or 'auto'. The auto mode uses the
+            gpu if cudf and cugraph are available.
+        max_workers : int, optional
+            number of threads used by the cpu backend
 
         """
 
@@ -173,12 +209,19 @@ class ForceAtlas2(NetworkLayoutIPCRender):
             network_draw,
             edges,
             weights,
+            worker_pool,
         )
         if not network_draw._is_2d:
             raise ValueError('ForceAtlas2 only works for 2d layouts')
 
-        if not CUDF_AVAILABLE:
+        if backend == 'auto':
+            backend = 'gpu' if CUDF_AVAILABLE else 'cpu'
+        if backend not in ['gpu', 'cpu']:
+            raise ValueError('The backend valid names are: gpu, cpu, auto')
+        if backend == 'gpu' and not CUDF_AVAILABLE:
             raise ImportError(' You need to install cugraph and cudf first')
+        self._backend = backend
+        self.max_workers = max_workers
 
         self.lin_log_mode = lin_log_mode
         self.edge_weight_influence = edge_weight_influence
@@ -191,47 +234,37 @@ class ForceAtlas2(NetworkLayoutIPCRender):
 
         self.update()
 
-    def _command_string(
-            self, steps=100, iters_by_step=3,):
-        """This will return the python code which starts the ForceAtlas2ServerCalc
+    _live_network = True
 
-        Parameters
-        ----------
-        steps : int, optional, default 100
-        iters_by_step : int, optional, default 3
+    @property
+    def backend(self):
+        return self._backend
+
+    @property
+    def _layout_name(self):
+        if self._backend == 'cpu':
+            return 'forceatlas2cpu'
+        return 'forceatlas2'
+
+    def _job_parameters(self):
+        """Return the keyword arguments of the ForceAtlas2ServerCalc
+        or the ForceAtlas2CPUServerCalc
 
         Returns
         -------
-        s : str
+        parameters : dict
 
         """
-        s = 'from helios.layouts.forceatlas2gpu import ForceAtlas2ServerCalc;'
-        s += 'from fury.stream.tools import remove_shm_from_resource_tracker;'
-        s += 'remove_shm_from_resource_tracker();'
-        s += 'force_atlas = ForceAtlas2ServerCalc('
-        s += f'edges_buffer_name="{self._shm_manager.edges._buffer_name}",'
-        s += 'positions_buffer_name='
-        s += f'"{self._shm_manager.positions._buffer_name}",'
-        s += f'info_buffer_name="{self._shm_manager.info._buffer_name}",'
-        if self._record_positions:
-            s += 'snapshots_buffer_name='
-            s += f'"{self._shm_manager.snapshots_positions._buffer_name}",'
-        s += 'lin_log_mode ='
-        s += f'{self.lin_log_mode},'
-        s += 'edge_weight_influence ='
-        s += f'{self.edge_weight_influence},'
-        s += 'jitter_tolerance ='
-        s += f'{self.jitter_tolerance},'
-        s += 'barnes_hut_optimize ='
-        s += f'{self.barnes_hut_optimize},'
-        s += 'barnes_hut_theta ='
-        s += f'{self.barnes_hut_theta},'
-        s += 'scaling_ratio ='
-        s += f'{self.scaling_ratio},'
-        s += 'strong_gravity_mode ='
-        s += f'{self.strong_gravity_mode},'
-        s += 'gravity ='
-        s += f'{self.gravity},'
-        s += ');'
-        s += f'force_atlas.start({steps},{iters_by_step});'
-        return s
+        parameters = {
+            'lin_log_mode': bool(self.lin_log_mode),
+            'edge_weight_influence': float(self.edge_weight_influence),
+            'jitter_tolerance': float(self.jitter_tolerance),
+            'barnes_hut_optimize': bool(self.barnes_hut_optimize),
+            'barnes_hut_theta': float(self.barnes_hut_theta),
+            'scaling_ratio': float(self.scaling_ratio),
+            'strong_gravity_mode': bool(self.strong_gravity_mode),
+            'gravity': float(self.gravity),
+        }
+        if self._backend == 'cpu':
+            parameters['max_workers'] = self.max_workers
+        return parameters
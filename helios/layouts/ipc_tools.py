@@ -13,6 +13,11 @@ References
 
 """
 
+import json
+import os
+import select
+import shutil
+import tempfile
 import numpy as np
 from abc import ABC, abstractmethod
 
@@ -25,6 +30,82 @@ else:
     PY_VERSION_8 = False
 
 
+SHM_HEADER_VERSION = 1
+_ARRAY_MAGIC = b'HLSA'
+_MULTI_BUFFER_MAGIC = b'HLSM'
+# the headers and the payloads start at multiples of 64 bytes
+_ALIGNMENT = 64
+_DTYPES = (
+    'bool', 'int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32',
+    'int64', 'uint64', 'float16', 'float32', 'float64')
+# int64 fields after the magic and the version
+_DTYPE_CODE, _NDIM, _NUM_ROWS, _DIMENSION, _CAPACITY, _GENERATION = \
+    range(6)
+_NUM_FIELDS = 7
+
+
+def _aligned(nbytes):
+    return -(-nbytes//_ALIGNMENT)*_ALIGNMENT
+
+
+def _dtype_code(dtype):
+    name = np.dtype(dtype).name
+    if name not in _DTYPES:
+        raise ValueError(
+            f'The dtype {name} is not supported. The supported dtypes '
+            f'are: {list(_DTYPES)}')
+    return _DTYPES.index(name)
+
+
+def _write_type_header(buf, magic, dtype, shape, capacity):
+    """Write the 64 bytes header shared by the array resources
+
+    The header stores the magic (4 bytes), the version (uint32) and the
+    int64 fields [dtype code, ndim, num_rows, dimension, capacity,
+    generation, reserved].
+
+    Returns
+    -------
+    fields : ndarray
+        a view of the int64 fields
+
+    """
+    buf[0:4] = magic
+    np.ndarray(1, dtype=np.uint32, buffer=buf[4:8])[0] = SHM_HEADER_VERSION
+    fields = np.ndarray(_NUM_FIELDS, dtype=np.int64, buffer=buf[8:64])
+    fields[:] = [
+        _dtype_code(dtype), len(shape), shape[0],
+        shape[1] if len(shape) == 2 else 1, capacity, 0, 0]
+    return fields
+
+
+def _read_type_header(buf, magic, buffer_name, dtype=None):
+    """Validate the header of an array resource
+
+    Returns
+    -------
+    fields : ndarray
+        a view of the int64 fields
+    dtype : dtype
+
+    """
+    if bytes(buf[0:4]) != magic:
+        raise ValueError(
+            f'{buffer_name} is not a helios shared memory array')
+    version = int(np.ndarray(1, dtype=np.uint32, buffer=buf[4:8])[0])
+    if version != SHM_HEADER_VERSION:
+        raise ValueError(
+            f'Shared memory header version {version} is not supported. '
+            f'Expected version {SHM_HEADER_VERSION}')
+    fields = np.ndarray(_NUM_FIELDS, dtype=np.int64, buffer=buf[8:64])
+    stored_dtype = np.dtype(_DTYPES[int(fields[_DTYPE_CODE])])
+    if dtype is not None and np.dtype(dtype) != stored_dtype:
+        raise ValueError(
+            f'{buffer_name} stores {stored_dtype.name} values, '
+            f'not {np.dtype(dtype).name}')
+    return fields, stored_dtype
+
+
 class GenericArrayBufferManager(ABC):
     """This implements a abstract (generic) ArrayBufferManager.
 
@@ -39,7 +120,8 @@ class GenericArrayBufferManager(ABC):
         Parameters
         ----------
         dtype : dtype, optional
-            The data type of the array.
+            The data type of the array. When loading a memory resource,
+            the dtype is read from the resource.
         data : ndarray, optional
             The data of the array.
 
@@ -48,8 +130,6 @@ class GenericArrayBufferManager(ABC):
             self._dtype = data.dtype if dtype is None else dtype
             self._data = data.astype(self._dtype)
         else:
-            if dtype is None:
-                raise ValueError('A dtype or data must be provided')
             self._dtype = dtype
 
     @abstractmethod
@@ -68,87 +148,233 @@ class GenericArrayBufferManager(ABC):
 class SharedMemArrayManager(GenericArrayBufferManager):
     """An implementation of a GenericArrayBufferManager using SharedMemory
 
+    The memory resource starts with a 64 bytes typed header (magic,
+    version, dtype code, ndim, shape, capacity and generation, see
+    _write_type_header) and a 64 bytes forwarding block
+    [forwarded, forward_name_length, forward name]. The payload starts
+    at the byte 128.
+
+    num_rows is the logical length of the array; the rows between
+    num_rows and capacity are reserved, so the array can grow without
+    a new resource.
+
+    When the array must grow beyond its capacity, the process which
+    created the resource allocates a new one (growing the capacity by
+    growth_factor), copies the rows, writes the name of the new resource
+    in the forwarding block of the old one and sets the forwarded flag.
+    The other processes follow the forward name on their next sync
+    (remap protocol). The generation is increased by every resize, so
+    the readers can detect in place resizes as well.
+
     """
+    _header_bytes = 128
+    _max_name_bytes = _header_bytes - _ALIGNMENT - 16
+
     def __init__(
-            self, dtype=None, data=None, buffer_name=None):
+            self, dtype=None, data=None, buffer_name=None, capacity=None,
+            growth_factor=2):
         """
 
         Parameters
         ----------
         dtype : str, optional
-            type of the ndarray
+            type of the ndarray. Not required to load a resource.
         data : ndarray, optional
             bi-dimensional array
         buffer_name : str
             buffer_name, if you pass that, then
             this Obj. will try to load the memory resource
+        capacity : int, optional
+            number of rows allocated. If greater than the number of rows
+            of data, the array can grow with resize without creating a
+            new memory resource.
+        growth_factor : float, optional, default 2
+            the capacity is multiplied by this factor when the array
+            grows beyond it
 
         """
         super().__init__(dtype, data)
+        if growth_factor <= 1:
+            raise ValueError('growth_factor must be greater than 1')
+        self._growth_factor = growth_factor
         self._released = False
         if buffer_name is None:
-            self.create_mem_resource(data)
+            self.create_mem_resource(data, capacity)
         else:
             self.load_mem_resource(buffer_name)
 
-    def create_mem_resource(self, data):
-        self._num_rows = data.shape[0]
-        self._dimension = data.shape[1] if data.ndim == 2 else 1
-        self._num_elements = self._num_rows*self._dimension
-        buffer_arr = np.zeros(
-            self._num_elements+2, dtype=data.dtype)
-        self._buffer = shared_memory.SharedMemory(
-                        create=True, size=buffer_arr.nbytes)
-
-        s_bytes = np.array([1], dtype=self._dtype).nbytes
-        sizes = np.ndarray(
-            2, dtype=self._dtype,
-            buffer=self._buffer.buf[0:s_bytes*2])
-        sizes[0] = self._num_rows
-        sizes[1] = self._dimension
+    def _map_forward(self):
+        self._forward = np.ndarray(
+            2, dtype=np.int64, buffer=self._buffer.buf[64:80])
 
-        if self._dimension == 1:
+    def _map_repr(self):
+        self._num_elements = self._num_rows*self._dimension
+        if self._ndim == 1:
             shape = self._num_rows
         else:
             shape = (self._num_rows, self._dimension)
-
-        start = int(s_bytes*2)
-        end = int((self._num_elements+2)*s_bytes)
+        start = self._header_bytes
+        end = start + self._num_elements*np.dtype(self._dtype).itemsize
         self._repr = np.ndarray(
             shape,
             dtype=self._dtype,
             buffer=self._buffer.buf[start:end])
 
+    def create_mem_resource(self, data, capacity=None):
+        num_rows = data.shape[0]
+        self._allocate(
+            data.shape, max(num_rows, capacity or 0))
+        self._repr[:] = data
+
+    def _allocate(self, shape, capacity):
+        num_rows = shape[0]
+        dimension = shape[1] if len(shape) == 2 else 1
+        item_size = np.dtype(self._dtype).itemsize
+        self._buffer = shared_memory.SharedMemory(
+            create=True,
+            size=self._header_bytes + max(capacity*dimension, 1)*item_size)
+        self._fields = _write_type_header(
+            self._buffer.buf, _ARRAY_MAGIC, self._dtype, shape, capacity)
+        self._map_forward()
+        self._forward[:] = 0
+        self._ndim = len(shape)
+        self._num_rows = num_rows
+        self._dimension = dimension
+        self._capacity = capacity
+        self._generation = 0
+        self._map_repr()
         self._buffer_name = self._buffer.name
         self._created = True
-        self._repr[:] = data
 
     def load_mem_resource(self, buffer_name):
         self._buffer = shared_memory.SharedMemory(buffer_name)
-        s_bytes = np.array([1], dtype=self._dtype).nbytes
-        sizes = np.ndarray(
-            2, dtype=self._dtype,
-            buffer=self._buffer.buf[0:s_bytes*2])
-        self._num_rows = int(sizes[0])
-        self._dimension = int(sizes[1])
-        self._num_elements = self._num_rows*self._dimension
-        if self._dimension == 1:
-            shape = self._num_rows
-        else:
-            shape = (self._num_rows, self._dimension)
-        start = s_bytes*2
-        end = (self._num_elements+2)*s_bytes
-        self._repr = np.ndarray(
-            shape,
-            dtype=self._dtype,
-            buffer=self._buffer.buf[start:end])
+        self._buffer_name = buffer_name
         self._created = False
+        self._fields, self._dtype = _read_type_header(
+            self._buffer.buf, _ARRAY_MAGIC, buffer_name, self._dtype)
+        self._map_forward()
+        self._read_header()
+
+    def _read_header(self):
+        self._ndim = int(self._fields[_NDIM])
+        self._num_rows = int(self._fields[_NUM_ROWS])
+        self._dimension = int(self._fields[_DIMENSION])
+        self._capacity = int(self._fields[_CAPACITY])
+        self._generation = int(self._fields[_GENERATION])
+        self._map_repr()
+
+    @property
+    def shape(self):
+        return self._repr.shape
+
+    def _forward_name(self):
+        length = int(self._forward[1])
+        return bytes(self._buffer.buf[80:80 + length]).decode()
+
+    def _close_buffer(self):
+        self._fields = None
+        self._forward = None
+        self._repr = None
+        try:
+            self._buffer.close()
+        except BufferError:
+            # views of the old resource are still alive, the memory
+            # will be released when they are garbage collected
+            pass
+
+    def sync(self):
+        """Reattach to the resource after a resize made by another process
+
+        Returns
+        -------
+        changed : bool
+            True if the shape or the memory resource has changed
+
+        """
+        if self._created:
+            return False
+        changed = False
+        while self._forward[0] == 1:
+            name = self._forward_name()
+            self._close_buffer()
+            self.load_mem_resource(name)
+            changed = True
+        if self._fields[_GENERATION] != self._generation:
+            self._read_header()
+            changed = True
+        return changed
+
+    def resize(self, num_rows):
+        """Change the logical number of rows.
+
+        The memory resource is reallocated only if num_rows is greater
+        than the capacity. The rows kept are preserved and the new rows
+        are filled with zeros. The other processes see the new shape
+        after calling sync.
+
+        Parameters
+        ----------
+        num_rows : int
+
+        Returns
+        -------
+        reallocated : bool
+            True if a new memory resource (with a new buffer name) was
+            created
+
+        """
+        num_rows = int(num_rows)
+        if num_rows <= self._capacity:
+            previous = self._num_rows
+            self._num_rows = num_rows
+            self._map_repr()
+            if num_rows > previous:
+                self._repr[previous:] = 0
+            self._fields[_NUM_ROWS] = num_rows
+            self._fields[_GENERATION] += 1
+            self._generation = int(self._fields[_GENERATION])
+            return False
+
+        if not self._created:
+            raise ValueError(
+                f'{num_rows} rows exceed the capacity ({self._capacity}) '
+                'and only the process which created the resource can '
+                'reallocate it')
+        kept = np.array(self._repr[0:min(num_rows, self._num_rows)])
+        capacity = max(
+            num_rows, int(np.ceil(self._capacity*self._growth_factor)))
+        old_buffer = self._buffer
+        old_forward = self._forward
+        self._repr = None
+        self._fields = None
+        shape = (num_rows, ) + kept.shape[1:]
+        self._allocate(shape, capacity)
+        self._repr[0:len(kept)] = kept
+        self._repr[len(kept):] = 0
+
+        name = self._buffer_name.encode()
+        if len(name) > self._max_name_bytes:
+            raise ValueError(
+                f'The buffer name {self._buffer_name} is too long')
+        old_buffer.buf[80:80 + len(name)] = name
+        old_forward[1] = len(name)
+        old_forward[0] = 1
+        del old_forward
+        try:
+            old_buffer.close()
+        except BufferError:
+            pass
+        try:
+            old_buffer.unlink()
+        except FileNotFoundError:
+            pass
+        return True
 
     def cleanup(self):
         if self._released:
             return
 
-        self._buffer.close()
+        self._close_buffer()
         # this it's due the python core issues
         # https://bugs.python.org/issue38119
         # https://bugs.python.org/issue39959
@@ -163,28 +389,716 @@ class SharedMemArrayManager(GenericArrayBufferManager):
 
     @property
     def data(self):
+        if not self._created and (
+                self._forward[0] == 1 or
+                self._fields[_GENERATION] != self._generation):
+            self.sync()
         return self._repr
 
     @data.setter
     def data(self, data):
-        equal_dim = self._repr.shape[1] == data.shape[1]
-        if self._repr.shape[0] > data.shape[0] and equal_dim:
-            self._repr[0:data.shape[0]] = data.astype(self._dtype)
-        elif self._repr.shape[0] == data.shape[0] and equal_dim:
-            self._repr[:] = data.astype(self._dtype)
+        """Write the rows of data at the beginning of the array.
+
+        The array grows if data has more rows than the array.
+
+        """
+        if data.ndim == 2 and self._ndim == 2 and \
+                self._dimension != data.shape[1]:
+            raise ValueError(
+                f'Expected {self._dimension} columns, got {data.shape[1]}')
+        if data.shape[0] > self._num_rows:
+            self.resize(data.shape[0])
+        self._repr[0:data.shape[0]] = data.astype(self._dtype)
+
+    def _codec_frames(self, codec):
+        return self._repr.reshape(-1, codec.frame_nbytes)
+
+    def update_snapshot(self, data, step, codec=None):
+        """Store a frame
+
+        Parameters
+        ----------
+        data : ndarray
+        step : int
+            the slot of the frame. When using a codec, the frames are
+            stored as a ring and step is the index of the frame.
+        codec : SnapshotCodec, optional
+            If given, this must be a uint8 array with a multiple of
+            codec.frame_nbytes elements.
 
-    def update_snapshot(self, data, step):
+        """
+        if codec is not None:
+            frames = self._codec_frames(codec)
+            frames[step % len(frames)] = codec.encode(data, step)
+            return
         size = data.shape[0]
         start = step*size
         end = step*size + size
         self._repr[start:end] = data.astype(self._dtype)
 
-    def get_snapshot(self, step, size):
+    def get_snapshot(self, step, size, codec=None):
+        """Return a frame
+
+        Parameters
+        ----------
+        step : int
+        size : int
+            number of rows of a frame
+        codec : SnapshotCodec, optional
+
+        Returns
+        -------
+        frame : ndarray
+            a view of the resource or, when using a codec, the decoded
+            float32 frame
+
+        """
+        if codec is not None:
+            return codec.decode(self._codec_frames(codec), step)
         start = step*size
         end = (step*size + size)
         return self._repr[start:end]
 
 
+class SharedMemMultiBuffer(GenericArrayBufferManager):
+    """A multi-buffered array shared between a writer and a reader process.
+
+    The writer never blocks: each new frame is written into the buffer
+    slot after the last published one and then published by increasing a
+    generation counter. Each slot has a seqlock-style sequence counter
+    which is odd while the slot is being written, so the reader can
+    detect (and discard) a frame torn by a writer that lapped it.
+
+    The shared memory segment starts with the 64 bytes typed header
+    (see _write_type_header), whose generation field counts the
+    published frames, followed by the int64 array
+    [num_buffers, seq_0, ..., seq_n] and the num_buffers slots. Each
+    slot starts at a multiple of 64 bytes.
+
+    Notes
+    -----
+    The stores are not fenced. This relies on the total store order of
+    x86 processors, as the rest of the shared memory tools do.
+
+    """
+    def __init__(
+            self, dtype=None, data=None, buffer_name=None, num_buffers=3,
+            capacity=None):
+        """
+
+        Parameters
+        ----------
+        dtype : str, optional
+            type of the ndarray. Not required to load a resource.
+        data : ndarray, optional
+            bi-dimensional array used to fill all the buffers
+        buffer_name : str, optional
+            buffer_name, if you pass that, then
+            this Obj. will try to load the memory resource
+        num_buffers : int, optional, default 3
+            number of slots. Ignored when loading a memory resource.
+        capacity : int, optional
+            number of rows allocated by slot. If greater than the number
+            of rows of data, the slots can grow with resize without
+            creating a new memory resource.
+
+        """
+        super().__init__(dtype, data)
+        self._released = False
+        if buffer_name is None:
+            if num_buffers < 2:
+                raise ValueError('At least two buffers are required')
+            self._num_buffers = num_buffers
+            self.create_mem_resource(data, capacity)
+        else:
+            self.load_mem_resource(buffer_name)
+
+    def _slot_stride(self):
+        item_size = np.dtype(self._dtype).itemsize
+        return _aligned(self._capacity*self._dimension*item_size)
+
+    def _slots_offset(self):
+        return _ALIGNMENT + _aligned((1 + self._num_buffers)*8)
+
+    def _map_buffer(self):
+        self._seqs = np.ndarray(
+            self._num_buffers, dtype=np.int64,
+            buffer=self._buffer.buf[
+                _ALIGNMENT + 8:_ALIGNMENT + 8 + self._num_buffers*8])
+        self._num_elements = self._num_rows*self._dimension
+        item_size = np.dtype(self._dtype).itemsize
+        stride = self._slot_stride()
+        if self._ndim == 1:
+            shape = (self._num_buffers, self._num_rows)
+            strides = (stride, item_size)
+        else:
+            shape = (self._num_buffers, self._num_rows, self._dimension)
+            strides = (stride, self._dimension*item_size, item_size)
+        self._slots = np.ndarray(
+            shape, dtype=self._dtype, buffer=self._buffer.buf,
+            offset=self._slots_offset(), strides=strides)
+        self._read_buffer = None
+
+    def create_mem_resource(self, data, capacity=None):
+        self._ndim = data.ndim
+        self._num_rows = data.shape[0]
+        self._dimension = data.shape[1] if data.ndim == 2 else 1
+        self._capacity = max(self._num_rows, capacity or 0)
+        size = self._slots_offset() + self._num_buffers*self._slot_stride()
+        self._buffer = shared_memory.SharedMemory(create=True, size=size)
+        self._fields = _write_type_header(
+            self._buffer.buf, _MULTI_BUFFER_MAGIC, self._dtype, data.shape,
+            self._capacity)
+        np.ndarray(
+            1, dtype=np.int64,
+            buffer=self._buffer.buf[_ALIGNMENT:_ALIGNMENT + 8])[0] = \
+            self._num_buffers
+        self._map_buffer()
+        self._seqs[:] = 0
+        self._slots[:] = data.astype(self._dtype)
+
+        self._buffer_name = self._buffer.name
+        self._created = True
+
+    def load_mem_resource(self, buffer_name):
+        self._buffer = shared_memory.SharedMemory(buffer_name)
+        self._fields, self._dtype = _read_type_header(
+            self._buffer.buf, _MULTI_BUFFER_MAGIC, buffer_name, self._dtype)
+        self._ndim = int(self._fields[_NDIM])
+        self._num_rows = int(self._fields[_NUM_ROWS])
+        self._dimension = int(self._fields[_DIMENSION])
+        self._capacity = int(self._fields[_CAPACITY])
+        self._num_buffers = int(np.ndarray(
+            1, dtype=np.int64,
+            buffer=self._buffer.buf[_ALIGNMENT:_ALIGNMENT + 8])[0])
+        self._map_buffer()
+        self._buffer_name = buffer_name
+        self._created = False
+
+    def resize(self, num_rows):
+        """Change the number of rows of the slots without creating a new
+        resource.
+
+        This should be called only while no other process is reading or
+        writing the resource. These processes must load it again to see
+        the new shape.
+
+        Parameters
+        ----------
+        num_rows : int
+
+        Returns
+        -------
+        resized : bool
+            False if num_rows is greater than the capacity
+
+        """
+        if num_rows > self._capacity:
+            return False
+        self._num_rows = int(num_rows)
+        self._fields[_NUM_ROWS] = self._num_rows
+        self._map_buffer()
+        return True
+
+    def cleanup(self):
+        if self._released:
+            return
+
+        self._fields = None
+        self._seqs = None
+        self._slots = None
+        self._read_buffer = None
+        self._buffer.close()
+        if self._created:
+            try:
+                self._buffer.unlink()
+            except FileNotFoundError:
+                print(f'Shared Memory {self._buffer_name}\
+                        File not found')
+        self._released = True
+
+    @property
+    def generation(self):
+        """The number of frames published so far"""
+        return int(self._fields[_GENERATION])
+
+    def write(self, data):
+        """Publish a new frame without blocking
+
+        Parameters
+        ----------
+        data : ndarray
+            array with the same shape of a buffer slot
+
+        Returns
+        -------
+        generation : int
+            the generation of the published frame
+
+        """
+        generation = int(self._fields[_GENERATION]) + 1
+        slot = generation % self._num_buffers
+        self._seqs[slot] += 1
+        self._slots[slot] = data
+        self._seqs[slot] += 1
+        self._fields[_GENERATION] = generation
+        return generation
+
+    def read(self, out=None, last_generation=None, retries=2):
+        """Copy the most recent complete frame
+
+        Parameters
+        ----------
+        out : ndarray, optional
+            array where the frame will be copied into. If None, an
+            internal buffer will be reused between calls.
+        last_generation : int, optional
+            If the most recent frame has this generation, nothing will be
+            copied.
+        retries : int, optional
+            number of attempts when the frame is torn by the writer
+
+        Returns
+        -------
+        generation : int or None
+            the generation of the copied frame or None if there is
+            no new complete frame
+
+        """
+        if out is None:
+            if self._read_buffer is None:
+                self._read_buffer = np.empty_like(self._slots[0])
+            out = self._read_buffer
+
+        for _ in range(retries + 1):
+            generation = int(self._fields[_GENERATION])
+            if generation == last_generation:
+                return None
+            slot = generation % self._num_buffers
+            seq_before = int(self._seqs[slot])
+            if seq_before % 2 == 1:
+                continue
+            out[:] = self._slots[slot]
+            if int(self._seqs[slot]) == seq_before:
+                return generation
+        return None
+
+    @property
+    def data(self):
+        """A view of the last published slot.
+
+        The view can be overwritten by the writer at any time, use read to
+        obtain a consistent copy.
+
+        """
+        return self._slots[
+            int(self._fields[_GENERATION]) % self._num_buffers]
+
+    @data.setter
+    def data(self, data):
+        self.write(data)
+
+
+JOB_PROTOCOL_VERSION = 1
+_JOB_MAGIC = b'HLSJ'
+# magic (4 bytes), version (uint32) and payload length (uint64)
+_JOB_HEADER_SIZE = 16
+
+
+class SharedMemJob:
+    """A layout job descriptor stored in a small shared memory block.
+
+    The block starts with a 16 bytes header (magic, protocol version and
+    payload length) followed by the descriptor encoded as JSON.
+
+    """
+    def __init__(self, descriptor=None, buffer_name=None, capacity=4096):
+        """
+
+        Parameters
+        ----------
+        descriptor : dict, optional
+            a JSON serializable dict. Used to create a new resource.
+        buffer_name : str, optional
+            if given, this Obj. will load the memory resource
+        capacity : int, optional
+            minimum size of the payload in bytes
+
+        """
+        self._released = False
+        if buffer_name is None:
+            payload = self._encode(descriptor)
+            self._capacity = max(capacity, len(payload))
+            self._buffer = shared_memory.SharedMemory(
+                create=True, size=_JOB_HEADER_SIZE + self._capacity)
+            self._buffer_name = self._buffer.name
+            self._created = True
+            self._write_payload(payload)
+        else:
+            self._buffer = shared_memory.SharedMemory(buffer_name)
+            self._buffer_name = buffer_name
+            self._capacity = self._buffer.size - _JOB_HEADER_SIZE
+            self._created = False
+
+    @staticmethod
+    def _encode(descriptor):
+        return json.dumps(descriptor, separators=(',', ':')).encode('utf-8')
+
+    def _write_payload(self, payload):
+        length = np.ndarray(
+            1, dtype=np.uint64, buffer=self._buffer.buf[8:_JOB_HEADER_SIZE])
+        self._buffer.buf[0:4] = _JOB_MAGIC
+        np.ndarray(1, dtype=np.uint32, buffer=self._buffer.buf[4:8])[0] = \
+            JOB_PROTOCOL_VERSION
+        self._buffer.buf[
+            _JOB_HEADER_SIZE:_JOB_HEADER_SIZE + len(payload)] = payload
+        length[0] = len(payload)
+
+    def write(self, descriptor):
+        """Replace the descriptor stored in the resource
+
+        Parameters
+        ----------
+        descriptor : dict
+
+        Returns
+        -------
+        fits : bool
+            False if the descriptor is greater than the capacity. In
+            that case, nothing is written.
+
+        """
+        payload = self._encode(descriptor)
+        if len(payload) > self._capacity:
+            return False
+        self._write_payload(payload)
+        return True
+
+    @property
+    def descriptor(self):
+        if bytes(self._buffer.buf[0:4]) != _JOB_MAGIC:
+            raise ValueError(
+                f'{self._buffer_name} is not a layout job descriptor')
+        version = int(np.ndarray(
+            1, dtype=np.uint32, buffer=self._buffer.buf[4:8])[0])
+        if version != JOB_PROTOCOL_VERSION:
+            raise ValueError(
+                f'Job protocol version {version} is not supported. '
+                f'Expected version {JOB_PROTOCOL_VERSION}')
+        length = int(np.ndarray(
+            1, dtype=np.uint64, buffer=self._buffer.buf[8:16])[0])
+        payload = bytes(
+            self._buffer.buf[_JOB_HEADER_SIZE:_JOB_HEADER_SIZE + length])
+        return json.loads(payload.decode('utf-8'))
+
+    def cleanup(self):
+        if self._released:
+            return
+
+        self._buffer.close()
+        if self._created:
+            try:
+                self._buffer.unlink()
+            except FileNotFoundError:
+                print(f'Shared Memory {self._buffer_name}\
+                        File not found')
+        self._released = True
+
+
+class SharedMemCommandRing:
+    """A single producer single consumer ring of JSON commands stored in
+    a shared memory resource.
+
+    The render process pushes commands and the layout server pops them
+    between two steps. The resource starts with an int64 header
+    [num_slots, slot_size, head, tail]. head is only written by the
+    producer and tail only by the consumer; each slot stores the length
+    of the payload (int64) followed by the JSON payload.
+
+    """
+    _header_size = 4
+
+    def __init__(self, buffer_name=None, num_slots=32, slot_size=8192):
+        """
+
+        Parameters
+        ----------
+        buffer_name : str, optional
+            if given, this Obj. will load the memory resource
+        num_slots : int, optional, default 32
+        slot_size : int, optional, default 8192
+            size in bytes of each slot, including the 8 bytes used to
+            store the payload length.
+
+        """
+        self._dtype = np.dtype('uint8')
+        self._released = False
+        header_bytes = self._header_size*8
+        if buffer_name is None:
+            self._buffer = shared_memory.SharedMemory(
+                create=True, size=header_bytes + num_slots*slot_size)
+            self._buffer_name = self._buffer.name
+            self._created = True
+            self._header = np.ndarray(
+                self._header_size, dtype=np.int64,
+                buffer=self._buffer.buf[0:header_bytes])
+            self._header[:] = [num_slots, slot_size, 0, 0]
+        else:
+            self._buffer = shared_memory.SharedMemory(buffer_name)
+            self._buffer_name = buffer_name
+            self._created = False
+            self._header = np.ndarray(
+                self._header_size, dtype=np.int64,
+                buffer=self._buffer.buf[0:header_bytes])
+            num_slots, slot_size = int(self._header[0]), int(self._header[1])
+
+        self._num_rows = num_slots
+        self._dimension = slot_size
+        self._slots = np.ndarray(
+            (num_slots, slot_size), dtype=np.uint8,
+            buffer=self._buffer.buf[
+                header_bytes:header_bytes + num_slots*slot_size])
+
+    def __len__(self):
+        """Number of commands waiting to be consumed"""
+        return int(self._header[2] - self._header[3])
+
+    def push(self, command, **arguments):
+        """Push a new command into the ring.
+
+        Parameters
+        ----------
+        command : str
+        **arguments : JSON serializable values, optional
+
+        Returns
+        -------
+        pushed : bool
+            False if the ring is full
+
+        """
+        payload = json.dumps(
+            dict(command=command, **arguments),
+            separators=(',', ':')).encode('utf-8')
+        if len(payload) > self._dimension - 8:
+            raise ValueError(
+                f'The command has {len(payload)} bytes but the slots can '
+                f'store only {self._dimension - 8} bytes')
+        head = int(self._header[2])
+        if head - int(self._header[3]) >= self._num_rows:
+            return False
+        slot = self._slots[head % self._num_rows]
+        slot[0:8].view(np.int64)[0] = len(payload)
+        slot[8:8 + len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+        # publish the command only after the payload has been written
+        self._header[2] = head + 1
+        return True
+
+    def pop(self):
+        """Pop the oldest command
+
+        Returns
+        -------
+        command : dict or None
+            None if there is no command waiting
+
+        """
+        tail = int(self._header[3])
+        if tail >= int(self._header[2]):
+            return None
+        slot = self._slots[tail % self._num_rows]
+        length = int(slot[0:8].view(np.int64)[0])
+        command = json.loads(slot[8:8 + length].tobytes().decode('utf-8'))
+        self._header[3] = tail + 1
+        return command
+
+    def pop_all(self):
+        """Pop all the commands waiting in the ring
+
+        Returns
+        -------
+        commands : list
+
+        """
+        commands = []
+        command = self.pop()
+        while command is not None:
+            commands.append(command)
+            command = self.pop()
+        return commands
+
+    def cleanup(self):
+        if self._released:
+            return
+
+        del self._header
+        del self._slots
+        self._buffer.close()
+        if self._created:
+            try:
+                self._buffer.unlink()
+            except FileNotFoundError:
+                print(f'Shared Memory {self._buffer_name}\
+                        File not found')
+        self._released = True
+
+
+# events written in a FrameNotifier
+FRAME_EVENT = b'f'
+END_EVENT = b'e'
+WAKE_EVENT = b'w'
+NOTIFY_SUPPORTED = hasattr(os, 'mkfifo')
+
+
+class FrameNotifier:
+    """A named pipe (FIFO) used by the layout server to wake the render
+    process when a new frame is published.
+
+    Each event is a single byte. The render process creates the pipe
+    and keeps both ends open, so the waits never see an end of file;
+    the server opens the write end by its path. Events written while
+    the pipe is full are dropped: the reader already has pending
+    events to consume.
+
+    """
+    def __init__(self, path=None):
+        """
+
+        Parameters
+        ----------
+        path : str, optional
+            if given, this Obj. will open the write end of an existing
+            pipe
+
+        """
+        if not NOTIFY_SUPPORTED:
+            raise NotImplementedError(
+                'Named pipes are not supported on this platform')
+        self._released = False
+        if path is None:
+            self._dir = tempfile.mkdtemp(prefix='helios-')
+            self._path = os.path.join(self._dir, 'frames')
+            os.mkfifo(self._path, 0o600)
+            self._read_fd = os.open(self._path, os.O_RDONLY | os.O_NONBLOCK)
+            self._created = True
+        else:
+            self._dir = None
+            self._path = path
+            self._read_fd = None
+            self._created = False
+        # raises ENXIO if the reader doesn't exist anymore
+        self._write_fd = os.open(self._path, os.O_WRONLY | os.O_NONBLOCK)
+
+    @property
+    def path(self):
+        return self._path
+
+    def fileno(self):
+        """The file descriptor of the read end, it can be registered in
+        a selector or an event loop
+
+        """
+        return self._read_fd
+
+    def notify(self, event=FRAME_EVENT):
+        """Write an event
+
+        Parameters
+        ----------
+        event : bytes, optional, default FRAME_EVENT
+
+        Returns
+        -------
+        written : bool
+            False if the pipe is full or its reader is gone
+
+        """
+        try:
+            os.write(self._write_fd, event)
+        except (BlockingIOError, BrokenPipeError):
+            return False
+        return True
+
+    def wake(self):
+        """Interrupt a wait of the render process"""
+        return self.notify(WAKE_EVENT)
+
+    def wait(self, timeout=None):
+        """Wait for events and consume all of them
+
+        Parameters
+        ----------
+        timeout : float, optional
+            time in seconds. If None, wait until an event arrives.
+
+        Returns
+        -------
+        events : bytes
+            empty if the timeout expired
+
+        """
+        if self._read_fd is None:
+            raise ValueError('Only the creator of the pipe can wait')
+        ready, _, _ = select.select([self._read_fd], [], [], timeout)
+        if not ready:
+            return b''
+        return self.poll()
+
+    def poll(self):
+        """Consume the pending events without blocking
+
+        Returns
+        -------
+        events : bytes
+
+        """
+        events = b''
+        while True:
+            try:
+                chunk = os.read(self._read_fd, 4096)
+            except BlockingIOError:
+                break
+            events += chunk
+            if len(chunk) < 4096:
+                break
+        return events
+
+    def cleanup(self):
+        if self._released:
+            return
+
+        os.close(self._write_fd)
+        if self._created:
+            os.close(self._read_fd)
+            shutil.rmtree(self._dir, ignore_errors=True)
+        self._released = True
+
+
+def buffer_descriptor(shm):
+    """Return the JSON serializable description of a shared memory array
+
+    Parameters
+    ----------
+    shm : SharedMemArrayManager, SharedMemMultiBuffer or
+        SharedMemCommandRing
+
+    Returns
+    -------
+    descriptor : dict
+        with the keys name, dtype and shape
+
+    """
+    if shm._dimension == 1:
+        shape = [shm._num_rows]
+    else:
+        shape = [shm._num_rows, shm._dimension]
+    return {
+        'name': shm._buffer_name,
+        'dtype': np.dtype(shm._dtype).name,
+        'shape': shape,
+    }
+
+
 class ShmManagerMultiArrays:
     """This Obj. allows to deal with multiple arrays
         stored using SharedMemory
@@ -192,7 +1106,7 @@ class ShmManagerMultiArrays:
     def __init__(self):
         self._shm_attr_names = []
 
-    def add_array(self, attr_name, data, dtype=None):
+    def add_array(self, attr_name, data, dtype=None, capacity=None):
         """This creates a shared memory resource
         to store the data.
 
@@ -209,18 +1123,20 @@ class ShmManagerMultiArrays:
         data : ndarray
         dtype : str, optional
             type of the ndarray
+        capacity : int, optional
+            number of rows allocated
 
         """
         if attr_name in self._shm_attr_names:
             raise ValueError(f'A Shared Memory array with the name {attr_name}\
                 is already in this ShmManager')
         _shm = SharedMemArrayManager(
-            data=data, dtype=dtype)
+            data=data, dtype=dtype, capacity=capacity)
         self._shm_attr_names.append(attr_name)
         setattr(self, attr_name, _shm)
 
     def load_array(
-            self, attr_name, buffer_name, dtype):
+            self, attr_name, buffer_name, dtype=None):
         """This will load the shared memory resource associate with buffer_name
         into the current ShmManagerMultiArrays
         The shared memory obj will be accessible
@@ -234,7 +1150,8 @@ class ShmManagerMultiArrays:
             this name will be used to associate a new attribute 'attr_name'
             with the current (self) ShmManagerMultiArrays.
         buffer_name : str
-        dtype : str
+        dtype : str, optional
+            If given, the dtype stored in the resource header must match.
 
         """
         if attr_name in self._shm_attr_names:
@@ -246,6 +1163,129 @@ class ShmManagerMultiArrays:
         self._shm_attr_names.append(attr_name)
         setattr(self, attr_name, _shm)
 
+    def add_multi_buffer(
+            self, attr_name, data, dtype=None, num_buffers=3,
+            capacity=None):
+        """This creates a multi-buffered shared memory resource
+        (SharedMemMultiBuffer) to exchange the data between processes.
+
+        Parameters
+        ----------
+        attr_name: str
+        data : ndarray
+        dtype : str, optional
+        num_buffers : int, optional, default 3
+        capacity : int, optional
+            number of rows allocated by slot
+
+        """
+        if attr_name in self._shm_attr_names:
+            raise ValueError(f'A Shared Memory array with the name {attr_name}\
+                is already in this ShmManager')
+        _shm = SharedMemMultiBuffer(
+            data=data, dtype=dtype, num_buffers=num_buffers,
+            capacity=capacity)
+        self._shm_attr_names.append(attr_name)
+        setattr(self, attr_name, _shm)
+
+    def load_multi_buffer(self, attr_name, buffer_name, dtype=None):
+        """This will load a SharedMemMultiBuffer resource associated with
+        buffer_name into the current ShmManagerMultiArrays
+
+        Parameters
+        ----------
+        attr_name : str
+        buffer_name : str
+        dtype : str, optional
+            If given, the dtype stored in the resource header must match.
+
+        """
+        if attr_name in self._shm_attr_names:
+            raise ValueError(f'A Shared Memory array with the name {attr_name}\
+                is already in this ShmManager')
+        _shm = SharedMemMultiBuffer(
+            buffer_name=buffer_name, dtype=dtype)
+        self._shm_attr_names.append(attr_name)
+        setattr(self, attr_name, _shm)
+
+    def add_command_ring(self, attr_name, num_slots=32, slot_size=8192):
+        """This creates a SharedMemCommandRing
+
+        Parameters
+        ----------
+        attr_name: str
+        num_slots : int, optional, default 32
+        slot_size : int, optional, default 8192
+
+        """
+        if attr_name in self._shm_attr_names:
+            raise ValueError(f'A Shared Memory array with the name {attr_name}\
+                is already in this ShmManager')
+        _shm = SharedMemCommandRing(
+            num_slots=num_slots, slot_size=slot_size)
+        self._shm_attr_names.append(attr_name)
+        setattr(self, attr_name, _shm)
+
+    def load_command_ring(self, attr_name, buffer_name):
+        """This will load a SharedMemCommandRing associated with
+        buffer_name into the current ShmManagerMultiArrays
+
+        Parameters
+        ----------
+        attr_name : str
+        buffer_name : str
+
+        """
+        if attr_name in self._shm_attr_names:
+            raise ValueError(f'A Shared Memory array with the name {attr_name}\
+                is already in this ShmManager')
+        _shm = SharedMemCommandRing(buffer_name=buffer_name)
+        self._shm_attr_names.append(attr_name)
+        setattr(self, attr_name, _shm)
+
+    def replace_array(self, attr_name, data, dtype=None):
+        """Store new data with a different number of rows in the
+        resource attr_name.
+
+        The resource is resized in place when its capacity allows it.
+        Otherwise, it is replaced by a new resource with at least twice
+        the previous capacity, so a sequence of insertions costs an
+        amortized constant number of allocations. A SharedMemArrayManager
+        forwards the processes which loaded it to the new resource, see
+        SharedMemArrayManager.sync.
+
+        Parameters
+        ----------
+        attr_name : str
+            the name of a SharedMemArrayManager or SharedMemMultiBuffer
+        data : ndarray
+        dtype : str, optional
+
+        Returns
+        -------
+        reallocated : bool
+            True if a new resource (with a new buffer name) was created
+
+        """
+        shm = getattr(self, attr_name)
+        if dtype is not None:
+            data = data.astype(dtype)
+        data = data.astype(shm._dtype, copy=False)
+        if isinstance(shm, SharedMemArrayManager):
+            reallocated = shm.resize(data.shape[0])
+            shm._repr[:] = data
+            return reallocated
+        if shm.resize(data.shape[0]):
+            shm._slots[:] = data
+            return False
+
+        capacity = max(2*shm._capacity, data.shape[0])
+        self.cleanup_mem(attr_name)
+        self.add_multi_buffer(
+            attr_name, data, num_buffers=shm._num_buffers,
+            capacity=capacity)
+        return True
+
     def cleanup_mem(self, resource_name):
         if resource_name in self._shm_attr_names:
             getattr(self, resource_name).cleanup()
@@ -27,6 +27,7 @@ import pymde
 
 from helios.layouts.base import NetworkLayoutIPCRender
 from helios.layouts.base import NetworkLayoutIPCServerCalc
+from helios.layouts.cache import ArrayCache, array_digest, default_cache_dir
 
 
 _CONSTRAINTS = {
@@ -65,6 +66,8 @@ class MDEServerCalc(NetworkLayoutIPCServerCalc):
         use_shortest_path=False,
         constraint_name=None,
         constraint_anchors_buffer_name=None,
+        commands_buffer_name=None,
+        cache_dir=None,
     ):
         """This Obj. reads the network information stored in a shared memory
         resource and execute the MDE layout algorithm
@@ -83,6 +86,10 @@ class MDEServerCalc(NetworkLayoutIPCServerCalc):
         use_shortest_path : str, optional
         constraint_name : str, optional
         constraint_anchors_buffer_name : str, optional
+        commands_buffer_name : str, optional
+        cache_dir : str, optional
+            If given, the shortest paths are stored in (and loaded from)
+            this directory. See helios.layouts.cache.ArrayCache
 
         """
         super().__init__(
@@ -91,24 +98,58 @@ class MDEServerCalc(NetworkLayoutIPCServerCalc):
             info_buffer_name,
             weights_buffer_name,
             snapshots_buffer_name,
+            commands_buffer_name,
         )
         self._positions_torch = torch.tensor(
             self._shm_manager.positions.data)
-        
+        self._penalty_name = penalty_name
+        self._attractive_penalty_name = attractive_penalty_name
+        self._repulsive_penalty_name = repulsive_penalty_name
+        self._use_shortest_path = use_shortest_path
+        self._constraint_name = constraint_name
+        self._cache_dir = cache_dir
+        self._penalty_parameters = None
+        if penalty_parameters_buffer_name is not None:
+            self._shm_manager.load_array(
+                'penalty_parameters',
+                penalty_parameters_buffer_name,
+                'float32',
+            )
+            self._penalty_parameters = list(
+                self._shm_manager.penalty_parameters.data)
+        if constraint_name == 'anchored':
+            if constraint_anchors_buffer_name is None:
+                raise ValueError(
+                    'Missing constraint anchors ' +
+                    'buffer name')
+            self._shm_manager.load_array(
+                'anchors',
+                constraint_anchors_buffer_name,
+                'float32',
+            )
+        self._build_problem()
+
+    def _build_problem(self):
+        """Build the MDE problem from the network stored in the shared
+        memory resources
+
+        """
+        penalty_name = self._penalty_name
+        attractive_penalty_name = self._attractive_penalty_name
+        repulsive_penalty_name = self._repulsive_penalty_name
+        constraint_name = self._constraint_name
+        weighted = 'weights' in self._shm_manager._shm_attr_names
         edges_torch = torch.tensor(
             self._shm_manager.edges.data)
-        if weights_buffer_name is not None:
+        if weighted:
             weights_torch = torch.tensor(
                 self._shm_manager.weights.data)
         else:
             weights_torch = torch.ones(edges_torch.shape[0])
-        if use_shortest_path and penalty_name is None:
-            g_torch = pymde.Graph.from_edges(edges_torch, weights_torch)
-            shortest_paths_graph = pymde.preprocess.graph.shortest_paths(
-                g_torch)
-            edges_torch = shortest_paths_graph.edges
-            distortion = pymde.losses.WeightedQuadratic(
-                shortest_paths_graph.distances)
+        if self._use_shortest_path and penalty_name is None:
+            edges_torch, distances_torch = self._shortest_paths(
+                edges_torch, weights_torch, weighted, self._cache_dir)
+            distortion = pymde.losses.WeightedQuadratic(distances_torch)
         elif penalty_name is None:
             distortion = pymde.losses.WeightedQuadratic(weights_torch)
         else:
@@ -124,15 +165,11 @@ class MDEServerCalc(NetworkLayoutIPCServerCalc):
                         weights_torch,
                         _PENALTIES[attractive_penalty_name],
                         _PENALTIES[repulsive_penalty_name])
-                if penalty_parameters_buffer_name is not None:
-                    self._shm_manager.load_array(
-                        'penalty_parameters',
-                        penalty_parameters_buffer_name,
-                        'float32',
-                    )
+                self._penalty_func = func
+                self._weights_torch = weights_torch
+                if self._penalty_parameters is not None:
                     distortion = func(
-                        weights_torch,
-                        *self._shm_manager.penalty_parameters.data)
+                        weights_torch, *self._penalty_parameters)
                 else:
                     distortion = func(weights_torch)
             else:
@@ -144,23 +181,12 @@ class MDEServerCalc(NetworkLayoutIPCServerCalc):
         else:
             if constraint_name in _CONSTRAINTS.keys():
                 if constraint_name == 'anchored':
-                    if constraint_anchors_buffer_name is None:
-                        raise ValueError(
-                            'Missing constraint anchors ' +
-                            'buffer name')
-                    self._shm_manager.load_array(
-                        'anchors',
-                        constraint_anchors_buffer_name,
-                        'float32',
-                    )
-                    num_anchors = self._shm_manager.anchors._num_rows
+                    anchors = self._shm_manager.anchors.data
                     torch_anchors = torch.tensor(
-                        self._shm_manager.anchors._repr[
-                            0:num_anchors, self._dimension].astype('int64')
+                        anchors[:, self._dimension].astype('int64')
                     )
                     torch_anchors_pos = torch.tensor(
-                        self._shm_manager.anchors._repr[
-                            0:num_anchors, 0:self._dimension]
+                        anchors[:, 0:self._dimension]
                     )
 
                     constraint = pymde.Anchored(
@@ -172,14 +198,76 @@ class MDEServerCalc(NetworkLayoutIPCServerCalc):
                 raise ValueError(
                     'The constraint valid names are: ' +
                     f'{list(_CONSTRAINTS.keys())}')
+        self._edges_torch = edges_torch
+        self._constraint = constraint
+        self._build_mde(distortion)
+
+    def _network_changed(self, positions, vertex_map):
+        self._build_problem()
+        self._positions_torch = torch.tensor(
+            positions, device=self._positions_torch.device)
+
+    def _shortest_paths(
+            self, edges_torch, weights_torch, weighted, cache_dir=None):
+        """Compute the shortest paths graph used by the distortion.
+
+        If cache_dir is given, the result is stored in a content-addressed
+        cache keyed by the edges and weights, and memory-mapped back in
+        the next layouts of the same graph.
+
+        Returns
+        -------
+        edges : torch.Tensor
+        distances : torch.Tensor
+
+        """
+        num_items = self._shm_manager.positions._num_rows
+
+        def compute():
+            graph = pymde.Graph.from_edges(
+                edges_torch, weights_torch, n_items=num_items)
+            shortest_paths_graph = pymde.preprocess.graph.shortest_paths(
+                graph)
+            return {
+                'edges': shortest_paths_graph.edges.cpu().numpy(),
+                'distances': shortest_paths_graph.distances.cpu().numpy(),
+            }
+
+        if cache_dir is None:
+            arrays = compute()
+        else:
+            key = array_digest(
+                self._shm_manager.edges.data,
+                self._shm_manager.weights.data if weighted else None,
+                n_items=num_items, method='shortest_paths',
+                pymde=pymde.__version__)
+            arrays = ArrayCache(cache_dir).get_or_compute(key, compute)
+        return (
+            torch.from_numpy(arrays['edges']),
+            torch.from_numpy(arrays['distances']))
+
+    def _build_mde(self, distortion):
         self.mde = pymde.MDE(
-           self._shm_manager.positions._repr.shape[0],
+           self._shm_manager.positions._num_rows,
            self._dimension,
-           edges_torch,
+           self._edges_torch,
            distortion_function=distortion,
-           constraint=constraint
+           constraint=self._constraint
         )
 
+    def _set_parameter(self, name, value):
+        """The penalty_parameters can be changed while the MDE is running
+        if a penalty different from pushandpull has been chosen.
+
+        """
+        if name == 'penalty_parameters' and self._penalty_name not in [
+                None, 'pushandpull']:
+            self._penalty_parameters = value
+            self._build_mde(
+                self._penalty_func(self._weights_torch, *value))
+        else:
+            super()._set_parameter(name, value)
+
     def start(self, steps=100, iters_by_step=3):
         """This method starts the network layout algorithm.
 
@@ -193,12 +281,19 @@ class MDEServerCalc(NetworkLayoutIPCServerCalc):
         """
         # -1 means the computation has been intialized
         self._shm_manager.info._repr[1] = -1
+        self._iters_by_step = iters_by_step
         for step in range(steps):
+            if self._stop_requested():
+                break
             self._positions_torch = self.mde.embed(
                     self._positions_torch,
-                    max_iter=iters_by_step)
+                    max_iter=self._iters_by_step)
 
-            self._update(self._positions_torch.cpu().numpy(), step)
+            positions = self._positions_torch.cpu().numpy()
+            if self._apply_pins(positions):
+                self._positions_torch = torch.tensor(
+                    positions, device=self._positions_torch.device)
+            self._update(positions, step)
         # to inform that everthing worked
         self._shm_manager.info._repr[1] = 1
 
@@ -233,13 +328,16 @@ class MDE(NetworkLayoutIPCRender):
         penalty_parameters=None,
         attractive_penalty_name='log1p',
         repulsive_penalty_name='log',
+        worker_pool=None,
+        cache_dir=None,
     ):
         """
 
         Parameters
         -----------
-        edges : ndarray
+        edges : ndarray or Network
             the edges of the graph. A numpy array of shape (n_edges, 2)
+            or a Network instance
         network_draw : NetworkDraw
             a NetworkDraw object
         weights: array, optional
@@ -263,12 +361,21 @@ class MDE(NetworkLayoutIPCRender):
         repulsive_penalty_name : str, optional
             cubic, huber, invpower, linear, log, log1p, logratio,
             logistic, power, pushandpull  or quadratic
+        worker_pool : LayoutWorkerPool, optional
+            If given, the MDE will run inside of a persistent worker.
+        cache_dir : str or bool, optional
+            Cache the shortest paths on disk. If True, the
+            HELIOS_CACHE_DIR environment variable or ~/.cache/helios
+            is used. The next layouts of the same graph (with other
+            penalties or constraints) will skip the shortest paths
+            computation.
 
         """
         super().__init__(
             network_draw,
             edges,
             weights,
+            worker_pool,
         )
 
         if constraint_name not in _CONSTRAINTS.keys() and\
@@ -301,6 +408,9 @@ class MDE(NetworkLayoutIPCRender):
         self._attractive_penalty_name = attractive_penalty_name
         self._repulsive_penalty_name = repulsive_penalty_name
         self._use_shortest_path = use_shortest_path
+        if cache_dir is True:
+            cache_dir = default_cache_dir()
+        self._cache_dir = cache_dir or None
 
         if isinstance(penalty_parameters, list):
             self._penalty_parameters = penalty_parameters
@@ -312,55 +422,63 @@ class MDE(NetworkLayoutIPCRender):
         else:
             self._penalty_parameters = None
 
-    def _command_string(
-            self, steps=100, iters_by_step=3,):
-        """This will return the python code which starts the MDEServer
+    _layout_name = 'mde'
+    _live_network = True
+
+    def set_parameter(self, name, value):
+        """Change a parameter of the running MDE without restarting it
 
         Parameters
         ----------
-        steps : int, optional, default 100
-            number of iterations
-        iters_by_step : int, optional, default 3
-            number of iterations per step
+        name : str
+            iters_by_step or penalty_parameters
+        value : int or list
+
+        """
+        if name == 'penalty_parameters':
+            value = [float(v) for v in value]
+            self._penalty_parameters = value
+            if 'penalty_parameters' in self._shm_manager._shm_attr_names:
+                self._shm_manager.cleanup_mem('penalty_parameters')
+            self._shm_manager.add_array(
+                'penalty_parameters', np.array(value), dtype='float32')
+        return super().set_parameter(name, value)
+
+    def _job_parameters(self):
+        """Return the keyword arguments of the MDEServerCalc
 
         Returns
         -------
-        s : str
-            the python code to start the MDEServer
+        parameters : dict
 
         """
-        s = 'from helios.layouts.mde import MDEServerCalc;'
-        s += 'from fury.stream.tools import remove_shm_from_resource_tracker;'
-        s += 'remove_shm_from_resource_tracker();'
-        s += 'mde_h = MDEServerCalc('
-        s += f'edges_buffer_name="{self._shm_manager.edges._buffer_name}",'
-        s += 'positions_buffer_name='
-        s += f'"{self._shm_manager.positions._buffer_name}",'
-        s += f'info_buffer_name="{self._shm_manager.info._buffer_name}",'
-        if 'weights' in self._shm_manager._shm_attr_names:
-            s += 'weights_buffer_name='
-            s += f'"{self._shm_manager.weights._buffer_name}",'
-
-        if self._record_positions:
-            s += 'snapshots_buffer_name='
-            s += f'"{self._shm_manager.snapshots_positions._buffer_name}",'
-        s += f'use_shortest_path={self._use_shortest_path},'
+        parameters = {'use_shortest_path': bool(self._use_shortest_path)}
+        if self._cache_dir is not None:
+            parameters['cache_dir'] = str(self._cache_dir)
         if self._constraint_name is not None:
-            s += f'constraint_name="{self._constraint_name}",'
-            if self._constraint_name == 'anchored':
-                s += 'constraint_anchors_buffer_name='
-                s += f'"{self._shm_manager.anchors._buffer_name}",'
-
+            parameters['constraint_name'] = self._constraint_name
         if self._penalty_name is not None:
-            s += f'penalty_name="{self._penalty_name}",'
-
+            parameters['penalty_name'] = self._penalty_name
         if self._penalty_name == 'pushandpull':
-            s += f'attractive_penalty_name="{self._attractive_penalty_name}",'
-            s += f'repulsive_penalty_name="{self._repulsive_penalty_name}",'
-
+            parameters['attractive_penalty_name'] = \
+                self._attractive_penalty_name
+            parameters['repulsive_penalty_name'] = \
+                self._repulsive_penalty_name
+        return parameters
+
+    def _rebuild_buffers(self, vertex_map):
+        if self._constraint_name != 'anchored':
+            return
+        anchors = np.array(self._shm_manager.anchors.data)
+        nodes = vertex_map[anchors[:, -1].astype('int64')]
+        anchors = anchors[nodes >= 0]
+        anchors[:, -1] = nodes[nodes >= 0]
+        self._shm_manager.replace_array('anchors', anchors)
+
+    def _job_buffers(self):
+        buffers = {}
+        if self._constraint_name == 'anchored':
+            buffers['constraint_anchors'] = 'anchors'
         if self._penalty_parameters is not None:
-            s += 'penalty_parameters_buffer_name='
-            s += f'"{self._shm_manager.penalty_parameters._buffer_name}",'
-        s += ');'
-        s += f'mde_h.start({steps},{iters_by_step});'
-        return s
+            buffers['penalty_parameters'] = 'penalty_parameters'
+        return buffers
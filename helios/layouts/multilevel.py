@@ -0,0 +1,428 @@
+"""Multilevel Force-Directed Layout
+
+The graph is coarsened by collapsing heavy-edge matchings until it has
+only a few nodes. The coarsest graph is laid out first, then each level
+is prolonged (the fine nodes start at the position of the coarse node
+that contains them) and refined by the heliosFR octree solver.
+
+References
+----------
+    [1] C. Walshaw, “A Multilevel Algorithm for Force-Directed
+    Graph-Drawing,” Journal of Graph Algorithms and Applications,
+    vol. 7, no. 3, pp. 253–285, 2003.
+    [2] Y. Hu, “Efficient, High-Quality Force-Directed Graph Drawing,” The
+    Mathematica Journal, p. 35, 2006.
+
+"""
+
+import asyncio
+
+import numpy as np
+import heliosFR
+
+from fury.stream.tools import IntervalTimer
+from helios.core.network import CSRNetwork
+from helios.layouts.force_directed import HeliosFr
+
+
+def heavy_edge_matching(network, weights=None, rounds=8, seed=None):
+    """Compute a matching of the vertices using the handshake heuristic
+
+    In each round every free vertex proposes to its free neighbor with
+    the heaviest edge and the mutual proposals (locally dominant edges)
+    are matched. Ties are broken by a random priority shared by both
+    directions of an edge, so every round matches at least the
+    heaviest free edge. All the operations are vectorized.
+
+    Parameters
+    ----------
+    network : CSRNetwork
+        an undirected network
+    weights : array, optional
+        edge weights. If None, the network weights (or ones) are used.
+    rounds : int, optional, default 8
+    seed : int or Generator, optional
+
+    Returns
+    -------
+    match : ndarray
+        array with shape (num_vertices, ), match[i] is the vertex
+        matched with i or -1 if i remains unmatched.
+
+    """
+    rng = np.random.default_rng(seed)
+    num_vertices = network.vertex_count()
+    indptr, indices, edge_ids = network.csr()
+    if weights is None:
+        weights = network.weights()
+    if weights is None:
+        weights = np.ones(network.edge_count())
+    sources = np.repeat(
+        np.arange(num_vertices, dtype=np.int64), np.diff(indptr))
+    priorities = np.asarray(weights, dtype=np.float64)*(
+        1 + 1e-6*rng.random(len(weights)))
+    entry_weights = priorities[edge_ids]
+
+    match = np.full(num_vertices, -1, dtype=np.int64)
+    proposal = np.empty(num_vertices, dtype=np.int64)
+    for _ in range(rounds):
+        free = match == -1
+        valid = free[sources] & free[indices] & (sources != indices)
+        if not np.any(valid):
+            break
+        s = sources[valid]
+        t = indices[valid]
+        order = np.lexsort((-entry_weights[valid], s))
+        s = s[order]
+        t = t[order]
+        first = np.ones(len(s), dtype=bool)
+        first[1:] = s[1:] != s[:-1]
+
+        proposal[:] = -1
+        proposal[s[first]] = t[first]
+        candidates = s[first]
+        mutual = candidates[proposal[proposal[candidates]] == candidates]
+        if len(mutual) == 0:
+            break
+        match[mutual] = proposal[mutual]
+    return match
+
+
+def contract_edges(edges, mapping, num_coarse, weights=None):
+    """Map the edges to the coarse vertices merging the parallel edges
+
+    Parameters
+    ----------
+    edges : ndarray
+        array with shape (n_edges, 2)
+    mapping : ndarray
+        the coarse vertex of each fine vertex
+    num_coarse : int
+    weights : array, optional
+
+    Returns
+    -------
+    coarse_edges : ndarray
+    coarse_weights : ndarray
+        the sum of the weights of the merged edges
+
+    """
+    if weights is None:
+        weights = np.ones(edges.shape[0])
+    coarse = mapping[edges]
+    keep = coarse[:, 0] != coarse[:, 1]
+    coarse = np.sort(coarse[keep], axis=1)
+    keys = coarse[:, 0]*num_coarse + coarse[:, 1]
+    keys, inverse = np.unique(keys, return_inverse=True)
+    coarse_weights = np.bincount(
+        inverse.ravel(), weights=np.asarray(weights)[keep],
+        minlength=len(keys))
+    coarse_edges = np.c_[keys // num_coarse, keys % num_coarse]
+    return coarse_edges.astype(np.int64), coarse_weights
+
+
+def coarsen(
+        edges, num_vertices, weights=None, min_nodes=100, max_levels=20,
+        min_reduction=0.05, seed=None):
+    """Build a multilevel hierarchy of a graph
+
+    Each level collapses a heavy-edge matching. The unmatched vertices
+    with a single neighbor are collapsed together with that neighbor.
+
+    Parameters
+    ----------
+    edges : ndarray
+    num_vertices : int
+    weights : array, optional
+    min_nodes : int, optional, default 100
+        the coarsening stops when a level has fewer vertices than this
+    max_levels : int, optional, default 20
+    min_reduction : float, optional, default 0.05
+        the coarsening stops when a level reduces the number of vertices
+        by less than this fraction
+    seed : int or Generator, optional
+
+    Returns
+    -------
+    levels : list
+        a list of (mapping, coarse_edges, num_coarse) tuples, from the
+        finest to the coarsest level. mapping associates the vertices of
+        the previous level with the vertices of this level.
+
+    """
+    rng = np.random.default_rng(seed)
+    levels = []
+    if weights is None:
+        weights = np.ones(edges.shape[0])
+    while num_vertices > min_nodes and len(levels) < max_levels:
+        network = CSRNetwork(edges, num_vertices=num_vertices)
+        match = heavy_edge_matching(network, weights, seed=rng)
+        vertices = np.arange(num_vertices, dtype=np.int64)
+        representative = np.where(
+            match >= 0, np.minimum(vertices, match), vertices)
+        # unmatched leaves (e.g. the leaves of a star) join their neighbor
+        indptr, indices, _ = network.csr()
+        leaves = np.nonzero((match == -1) & (np.diff(indptr) == 1))[0]
+        representative[leaves] = representative[indices[indptr[leaves]]]
+        _, mapping = np.unique(representative, return_inverse=True)
+        num_coarse = int(mapping.max()) + 1
+        if num_coarse > (1 - min_reduction)*num_vertices:
+            break
+        edges, weights = contract_edges(edges, mapping, num_coarse, weights)
+        levels.append((mapping, edges, num_coarse))
+        num_vertices = num_coarse
+    return levels
+
+
+class MultilevelHeliosFr(HeliosFr):
+    """A multilevel version of the HeliosFr layout
+
+    The coarse levels of the graph are laid out first and the result is
+    used as the initial positions of the full graph. After that, this
+    behaves like HeliosFr. With start, the coarse levels are refined by
+    the timer, a few iterations per tick, and the network draw shows
+    the intermediate levels. With steps, they are refined before the
+    first iteration.
+
+    Examples
+    --------
+
+        >>> layout = MultilevelHeliosFr(edges, network_draw)
+        >>> layout.steps(100)
+
+    """
+    def __init__(
+        self,
+        edges,
+        network_draw,
+        viscosity=0.3, a=0.0006, b=1,
+        max_workers=8, update_interval_workers=0,
+        velocities=None,
+        min_nodes=100, max_levels=20,
+        coarsest_iterations=300, level_iterations=50,
+        iterations_per_tick=10,
+        seed=None,
+    ):
+        """
+
+        Parameters
+        ----------
+        edges : ndarray or Network
+        network_draw : NetworkDraw
+        viscosity : float, optional
+        a : float, optional
+        b : float, optional
+        max_workers : int, optional
+            number of threads
+        update_interval_workers : float, optional
+        velocities : ndarray, optional
+        min_nodes : int, optional, default 100
+            number of nodes of the coarsest level
+        max_levels : int, optional, default 20
+        coarsest_iterations : int, optional, default 300
+            iterations performed in the coarsest level
+        level_iterations : int, optional, default 50
+            iterations performed in each intermediate level
+        iterations_per_tick : int, optional, default 10
+            iterations of the coarse levels performed by each tick of
+            the timer created by start
+        seed : int, optional
+
+        """
+        super().__init__(
+            edges, network_draw, viscosity=viscosity, a=a, b=b,
+            max_workers=max_workers,
+            update_interval_workers=update_interval_workers,
+            velocities=velocities)
+        self._coarsest_iterations = coarsest_iterations
+        self._level_iterations = level_iterations
+        self._iterations_per_tick = iterations_per_tick
+        # the nodes of 2D networks stay in the z=0 plane
+        self._dimension = 2 if network_draw._is_2d else 3
+        self._rng = np.random.default_rng(seed)
+        self._min_nodes = min_nodes
+        self._max_levels = max_levels
+        self._coarsen()
+        self._refine_timer = None
+
+    def _coarsen(self):
+        """Build the coarse levels of the current network"""
+        self._levels = coarsen(
+            self._edges.astype(np.int64), self._nodes_count,
+            min_nodes=self._min_nodes, max_levels=self._max_levels,
+            seed=self._rng)
+        self._refined = False
+        self._level = None
+        self._level_layout = None
+
+    @property
+    def num_levels(self):
+        """Number of coarse levels"""
+        return len(self._levels)
+
+    def _prolong(self, coarse_positions, coarse_edges, mapping):
+        positions = coarse_positions[mapping]
+        if len(coarse_edges) > 0:
+            lengths = np.linalg.norm(
+                coarse_positions[coarse_edges[:, 0]] -
+                coarse_positions[coarse_edges[:, 1]], axis=1)
+            scale = .1*lengths.mean()
+        else:
+            scale = 1e-3
+        dimension = self._dimension
+        positions[:, 0:dimension] += self._rng.normal(
+            scale=scale, size=(len(positions), dimension)).astype(np.float32)
+        return positions
+
+    def _begin_level(self, level, positions, iterations):
+        """Create the solver of a coarse level"""
+        _, coarse_edges, _ = self._levels[level]
+        self._level = level
+        self._level_positions = np.ascontiguousarray(positions)
+        self._level_edges = np.ascontiguousarray(
+            coarse_edges, dtype=np.uint64)
+        self._level_remaining = iterations
+        self._level_layout = heliosFR.FRLayout(
+            self._level_edges, self._level_positions,
+            np.zeros_like(self._level_positions), self._a, self._b,
+            self._viscosity, maxWorkers=self._max_workers,
+            updateInterval=0)
+
+    def _begin_refine(self):
+        if self._level is not None:
+            return
+        # the coarsest nodes start at the position of one of their members
+        positions = self._positions
+        for mapping, _, num_coarse in self._levels:
+            coarse_positions = np.empty(
+                (num_coarse, positions.shape[1]), dtype=np.float32)
+            coarse_positions[mapping] = positions
+            positions = coarse_positions
+        self._begin_level(
+            len(self._levels) - 1, positions, self._coarsest_iterations)
+
+    def _refine_step(self, iterations):
+        """Perform some iterations of the current coarse level
+
+        Parameters
+        ----------
+        iterations : int
+            maximum number of iterations
+
+        Returns
+        -------
+        refined : bool
+            True when all the levels have been laid out
+
+        """
+        if self._refined:
+            return True
+        if len(self._levels) == 0:
+            self._refined = True
+            return True
+        self._begin_refine()
+        iterations = min(iterations, self._level_remaining)
+        self._level_layout.iterate(iterations=iterations)
+        self._level_remaining -= iterations
+        if self._level_remaining > 0:
+            return False
+
+        mapping, coarse_edges, _ = self._levels[self._level]
+        positions = self._prolong(
+            self._level_positions, coarse_edges, mapping)
+        if self._level > 0:
+            self._begin_level(
+                self._level - 1, positions, self._level_iterations)
+            return False
+        # the full graph solver shares self._positions
+        self._positions[:] = positions
+        self._level_layout = None
+        self._refined = True
+        return True
+
+    def _expand_level(self):
+        """Copy the positions of the current coarse level to the nodes of
+        the full graph
+
+        """
+        if self._refined or self._level is None:
+            return
+        positions = self._level_positions
+        for level in range(self._level, -1, -1):
+            positions = positions[self._levels[level][0]]
+        self._positions[:] = positions
+
+    def _refine(self):
+        """Lay out all the coarse levels and prolong the positions to the
+        full graph
+
+        """
+        while not self._refine_step(np.iinfo(np.int32).max):
+            pass
+
+    def _rebuild(self, positions, edges, weights, vertex_map):
+        """Replace the network. If the coarse levels have not been
+        refined yet, they are built again for the new network and the
+        refinement restarts from the current positions.
+
+        """
+        refining = self._refine_timer is not None
+        super()._rebuild(positions, edges, weights, vertex_map)
+        if self._refined:
+            return
+        self._coarsen()
+        if refining:
+            self.start(self._ms)
+
+    def _refine_tick(self):
+        refined = self._refine_step(self._iterations_per_tick)
+        self._expand_level()
+        self.update()
+        if refined:
+            self._refine_timer.stop()
+            self._refine_timer = None
+            super().start(self._ms)
+
+    def start(self, ms=15):
+        """Refine the coarse levels with a timer and then start the
+        layout of the full graph
+
+        Parameters
+        ----------
+        ms : float, optional
+            Interval in milleseconds between two ticks. If ms is not
+            positive, the coarse levels are refined before starting.
+
+        """
+        if self._started or self._refine_timer is not None:
+            return
+        if self._refined or ms <= 0:
+            self._refine()
+            super().start(ms)
+            return
+        self._ms = ms
+        self._refine_timer = IntervalTimer(ms/1000, self._refine_tick)
+
+    def stop(self):
+        if self._refine_timer is not None:
+            self._refine_timer.stop()
+            self._refine_timer = None
+        super().stop()
+
+    def _aio_begin(self, ms):
+        if self._refined:
+            super()._aio_begin(ms)
+            return
+        self._aio_add_task(self._aio_refine(ms))
+
+    async def _aio_refine(self, ms):
+        while not self._refine_step(self._iterations_per_tick):
+            self._expand_level()
+            self._aio_frame_ready()
+            await asyncio.sleep(max(ms, 1)/1000)
+        super()._aio_begin(ms)
+
+    def steps(self, iterations):
+        if not self._refined:
+            self._refine()
+        super().steps(iterations)
@@ -0,0 +1,182 @@
+"""Layout Trajectory Recording
+
+The positions computed by a layout server can be streamed into a
+memory-mapped file instead of a shared memory block with one frame per
+step. The file starts with the 64 bytes typed header used by the shared
+memory arrays (see helios.layouts.ipc_tools), where the shape is the
+shape of a frame, the capacity is the maximum number of frames and the
+generation is the number of frames written so far. The frames follow
+the header.
+
+Examples
+--------
+
+    >>> layout.start(steps=1000, record_positions=True,
+    ...              record_path='trajectory.hlst')
+    >>> trajectory = TrajectoryFile('trajectory.hlst')
+    >>> trajectory.frame(500)
+
+"""
+
+import numpy as np
+
+from helios.layouts.ipc_tools import _GENERATION, _NUM_ROWS, _DIMENSION
+from helios.layouts.ipc_tools import _CAPACITY
+from helios.layouts.ipc_tools import _read_type_header, _write_type_header
+
+TRAJECTORY_MAGIC = b'HLST'
+_HEADER_BYTES = 64
+
+
+class TrajectoryFile:
+    """A sequence of position frames stored in a memory-mapped file"""
+    def __init__(
+            self, path, mode='r', num_nodes=None, dimension=None,
+            max_frames=None, dtype='float32'):
+        """
+
+        Parameters
+        ----------
+        path : str
+        mode : str, optional, default 'r'
+            'r' to read, 'r+' to append frames to an existing file or
+            'w+' to create a new file
+        num_nodes : int, optional
+            required by the 'w+' mode
+        dimension : int, optional
+            required by the 'w+' mode
+        max_frames : int, optional
+            required by the 'w+' mode. The file size is fixed when it
+            is created.
+        dtype : str, optional, default 'float32'
+            type used to store the positions. float16 halves the file
+            size. Ignored when opening an existing file.
+
+        """
+        if mode not in ('r', 'r+', 'w+'):
+            raise ValueError(f'Invalid mode {mode}')
+        self.path = path
+        if mode == 'w+':
+            if num_nodes is None or dimension is None or max_frames is None:
+                raise ValueError(
+                    'num_nodes, dimension and max_frames are required to '
+                    'create a trajectory file')
+            dtype = np.dtype(dtype)
+            size = _HEADER_BYTES + \
+                max_frames*num_nodes*dimension*dtype.itemsize
+            self._mmap = np.memmap(path, dtype=np.uint8, mode='w+',
+                                   shape=(size, ))
+            self._buf = memoryview(self._mmap)
+            self._fields = _write_type_header(
+                self._buf, TRAJECTORY_MAGIC, dtype, (num_nodes, dimension),
+                max_frames)
+            self._dtype = dtype
+        else:
+            self._mmap = np.memmap(path, dtype=np.uint8, mode=mode)
+            self._buf = memoryview(self._mmap)
+            self._fields, self._dtype = _read_type_header(
+                self._buf, TRAJECTORY_MAGIC, path)
+        self._writable = mode != 'r'
+        self._frame_shape = (
+            int(self._fields[_NUM_ROWS]), int(self._fields[_DIMENSION]))
+        self._frames = np.ndarray(
+            (int(self._fields[_CAPACITY]), ) + self._frame_shape,
+            dtype=self._dtype, buffer=self._buf, offset=_HEADER_BYTES)
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def frame_shape(self):
+        """(num_nodes, dimension)"""
+        return self._frame_shape
+
+    @property
+    def max_frames(self):
+        return self._frames.shape[0]
+
+    @property
+    def num_frames(self):
+        """Number of frames written so far"""
+        return int(self._fields[_GENERATION])
+
+    def __len__(self):
+        return self.num_frames
+
+    def write_frame(self, index, positions):
+        """Store the positions of a frame
+
+        Parameters
+        ----------
+        index : int
+        positions : ndarray
+            array with shape frame_shape
+
+        Returns
+        -------
+        written : bool
+            False if index is not lower than max_frames
+
+        """
+        if not self._writable:
+            raise ValueError(f'{self.path} was opened in read mode')
+        if index >= self.max_frames:
+            return False
+        self._frames[index] = positions
+        # publish the frame only after it has been written
+        if index >= self._fields[_GENERATION]:
+            self._fields[_GENERATION] = index + 1
+        return True
+
+    def append(self, positions):
+        """Store the positions after the last frame"""
+        return self.write_frame(self.num_frames, positions)
+
+    def frame(self, index):
+        """Return a read-only view of a frame
+
+        The data are read lazily from the file by the operating system.
+
+        Parameters
+        ----------
+        index : int
+
+        Returns
+        -------
+        positions : ndarray
+
+        """
+        if not 0 <= index < self.num_frames:
+            raise IndexError(
+                f'Frame {index} out of range, the trajectory has '
+                f'{self.num_frames} frames')
+        frame = self._frames[index]
+        frame.flags.writeable = False
+        return frame
+
+    @property
+    def frames(self):
+        """A read-only view of all the frames written so far"""
+        frames = self._frames[0:self.num_frames]
+        frames.flags.writeable = False
+        return frames
+
+    def flush(self):
+        if self._writable:
+            self._mmap.flush()
+
+    def close(self):
+        """Flush the frames and drop the memory map
+
+        The file is unmapped when the views returned by frame are
+        garbage collected.
+
+        """
+        if self._mmap is None:
+            return
+        self.flush()
+        self._fields = None
+        self._frames = None
+        self._buf = None
+        self._mmap = None
@@ -0,0 +1,236 @@
+"""Trajectory Replay
+
+Playback of recorded layout frames with seek, a playback rate
+independent of the recording rate and linear interpolation between the
+stored frames.
+
+Examples
+--------
+
+    >>> layout.start(steps=200, record_path='trajectory.hlst')
+    >>> player = TrajectoryPlayer(network_draw, layout.recording,
+    ...                           frame_rate=10)
+    >>> player.play(fps=60)
+    >>> player.seek(120.5)
+
+"""
+
+import time
+
+import numpy as np
+
+from fury.stream.tools import IntervalTimer
+
+
+class _ArrayFrames:
+    def __init__(self, frames):
+        self._frames = frames
+
+    def frame(self, index):
+        return self._frames[index]
+
+    def __len__(self):
+        return len(self._frames)
+
+
+class _LayoutFrames:
+    """The frames recorded by a NetworkLayoutIPCRender"""
+    def __init__(self, layout):
+        self._layout = layout
+
+    def frame(self, index):
+        return self._layout.recorded_frame(index)
+
+    def __len__(self):
+        return self._layout.recorded_frames
+
+
+class TrajectoryPlayer:
+    """Replay a sequence of frames into a NetworkDraw
+
+    The playback position is a float frame index. Fractional positions
+    are interpolated between the two surrounding frames. Seeking only
+    moves the position: the frame is computed and drawn once by the
+    next tick, so scrubbing faster than the display refresh rate
+    doesn't decode or upload the skipped frames.
+
+    """
+    def __init__(
+            self, network_draw, frames, frame_rate=30, loop=True,
+            interpolate=True):
+        """
+
+        Parameters
+        ----------
+        network_draw : NetworkDraw
+        frames : TrajectoryFile, NetworkLayoutIPCRender or ndarray
+            any object with a frame(index) method and a length, for
+            example a TrajectoryFile, a layout started with
+            record_positions or an array with shape
+            (num_frames, num_nodes, dimension)
+        frame_rate : float, optional, default 30
+            number of recorded frames played by second. It doesn't
+            depend on the rate used to record the frames or to draw them.
+        loop : bool, optional, default True
+            go back to the first frame after the last one
+        interpolate : bool, optional, default True
+            If False, the nearest frame is drawn.
+
+        """
+        if isinstance(frames, np.ndarray):
+            frames = _ArrayFrames(frames)
+        elif hasattr(frames, 'recorded_frame'):
+            frames = _LayoutFrames(frames)
+        self._network_draw = network_draw
+        self._frames = frames
+        self.frame_rate = frame_rate
+        self.loop = loop
+        self.interpolate = interpolate
+        self._position = 0.
+        self._playing = False
+        self._clock = None
+        self._interval_timer = None
+        self._drawn_position = None
+        # the last two decoded frames: {index: frame}
+        self._cache = {}
+        self._out = None
+
+    @property
+    def num_frames(self):
+        return len(self._frames)
+
+    @property
+    def position(self):
+        """The current (float) frame index"""
+        return self._position
+
+    @property
+    def playing(self):
+        return self._playing
+
+    def seek(self, position):
+        """Move the playback position
+
+        Parameters
+        ----------
+        position : float
+            frame index. It's clamped to the recorded frames.
+
+        """
+        last = max(self.num_frames - 1, 0)
+        self._position = float(min(max(position, 0), last))
+        self._clock = None
+
+    def _frame(self, index):
+        frame = self._cache.get(index)
+        if frame is None:
+            frame = np.asarray(self._frames.frame(index), dtype=np.float32)
+            self._cache = {
+                key: value for key, value in self._cache.items()
+                if abs(key - index) == 1}
+            self._cache[index] = frame
+        return frame
+
+    def positions_at(self, position):
+        """Return the positions of a (float) frame index
+
+        The returned array is reused by the next calls.
+
+        Parameters
+        ----------
+        position : float
+
+        Returns
+        -------
+        positions : ndarray
+
+        """
+        index = int(np.floor(position))
+        alpha = position - index
+        if not self.interpolate:
+            index = int(np.rint(position))
+            alpha = 0
+        if alpha == 0 or index + 1 >= self.num_frames:
+            return self._frame(min(index, self.num_frames - 1))
+        start = self._frame(index)
+        end = self._frame(index + 1)
+        if self._out is None or self._out.shape != start.shape:
+            self._out = np.empty_like(start)
+        np.subtract(end, start, out=self._out)
+        self._out *= alpha
+        self._out += start
+        return self._out
+
+    def _advance(self, now):
+        if self._clock is None:
+            self._clock = now
+            return
+        elapsed = now - self._clock
+        self._clock = now
+        position = self._position + elapsed*self.frame_rate
+        last = self.num_frames - 1
+        if position > last:
+            if self.loop and last > 0:
+                position = position % last
+            else:
+                position = last
+                self._playing = False
+        self._position = position
+
+    def tick(self, now=None):
+        """Advance the playback clock and draw the current position
+
+        This is called by the timer started by play, but it can also
+        be called by any render loop.
+
+        Parameters
+        ----------
+        now : float, optional
+            time in seconds. If None, time.perf_counter is used.
+
+        Returns
+        -------
+        drawn : bool
+            False if the frame drawn has not changed
+
+        """
+        if self.num_frames == 0:
+            return False
+        if self._playing:
+            self._advance(time.perf_counter() if now is None else now)
+        if self._position == self._drawn_position:
+            return False
+        self._network_draw.positions = self.positions_at(self._position)
+        self._network_draw.refresh()
+        self._drawn_position = self._position
+        return True
+
+    def play(self, fps=30):
+        """Start the playback
+
+        Parameters
+        ----------
+        fps : float, optional, default 30
+            number of times by second the NetworkDraw is updated. If 0,
+            no timer is created and tick must be called by the caller.
+
+        """
+        self._playing = True
+        self._clock = None
+        if fps > 0 and self._interval_timer is None:
+            self._interval_timer = IntervalTimer(1/fps, self.tick)
+
+    def pause(self):
+        """Stop the playback keeping the current position"""
+        self._playing = False
+        self._clock = None
+
+    def stop(self):
+        """Stop the playback and the timer"""
+        self.pause()
+        if self._interval_timer is not None:
+            self._interval_timer.stop()
+            self._interval_timer = None
+
+    def __del__(self):
+        self.stop()
@@ -0,0 +1,133 @@
+"""Layout Server Entry Point
+
+The render process describes a layout job with a JSON descriptor stored
+in a small shared memory block (see SharedMemJob). This module reads
+the descriptor, instantiates the server class registered for the
+layout and runs it.
+
+    $ python -m helios.layouts.server <job_buffer_name>
+
+"""
+
+import importlib
+import sys
+
+from helios.core import instrumentation
+from helios.layouts.ipc_tools import SharedMemJob, JOB_PROTOCOL_VERSION
+
+_LAYOUT_SERVERS = {
+    'mde': 'helios.layouts.mde:MDEServerCalc',
+    'forceatlas2': 'helios.layouts.forceatlas2gpu:ForceAtlas2ServerCalc',
+    'forceatlas2cpu':
+        'helios.layouts.forceatlas2cpu:ForceAtlas2CPUServerCalc',
+}
+
+
+def register_layout_server(name, server_path):
+    """Register a new server class
+
+    Parameters
+    ----------
+    name : str
+        the layout name used by the job descriptors
+    server_path : str
+        the path of the NetworkLayoutIPCServerCalc subclass in the
+        format 'module:Class'
+
+    """
+    _LAYOUT_SERVERS[name] = server_path
+
+
+def get_layout_server(name):
+    """Return the server class of a layout
+
+    Parameters
+    ----------
+    name : str
+        a registered layout name or a 'module:Class' path
+
+    Returns
+    -------
+    server_class : type
+
+    """
+    server_path = _LAYOUT_SERVERS.get(name, name)
+    if ':' not in server_path:
+        raise ValueError(
+            f'Unknown layout {name}. The registered layouts are: '
+            f'{list(_LAYOUT_SERVERS.keys())}')
+    module_name, class_name = server_path.split(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def run_descriptor(descriptor):
+    """Instantiate and run the server described by a job descriptor
+
+    Parameters
+    ----------
+    descriptor : dict
+
+    """
+    if descriptor.get('version') != JOB_PROTOCOL_VERSION:
+        raise ValueError(
+            f'Job protocol version {descriptor.get("version")} is not '
+            f'supported. Expected version {JOB_PROTOCOL_VERSION}')
+    server_class = get_layout_server(descriptor['layout'])
+    kwargs = {
+        f'{key}_buffer_name': buffer['name']
+        for key, buffer in descriptor['buffers'].items()
+    }
+    kwargs.update(descriptor['parameters'])
+    server = server_class(**kwargs)
+    if descriptor.get('recording') is not None:
+        server.open_recording(descriptor['recording'])
+    if descriptor.get('snapshot_codec') is not None:
+        server.set_snapshot_codec(**descriptor['snapshot_codec'])
+    if descriptor.get('notify') is None:
+        server.start(descriptor['steps'], descriptor['iters_by_step'])
+        return
+    server.open_notifier(descriptor['notify'])
+    try:
+        server.start(descriptor['steps'], descriptor['iters_by_step'])
+    finally:
+        server.close_notifier()
+
+
+def run_job(job_buffer_name):
+    """Read a job descriptor from the shared memory and run it
+
+    If the descriptor asks for instrumentation, the server-side summary
+    is written back in the job block (under the 'summary' key) when the
+    job finishes.
+
+    Parameters
+    ----------
+    job_buffer_name : str
+
+    """
+    from fury.stream.tools import remove_shm_from_resource_tracker
+    remove_shm_from_resource_tracker()
+    job = SharedMemJob(buffer_name=job_buffer_name)
+    try:
+        descriptor = job.descriptor
+        if not descriptor.get('instrumentation', False):
+            job.cleanup()
+            run_descriptor(descriptor)
+            return
+
+        instrumentation.enable()
+        try:
+            run_descriptor(descriptor)
+        finally:
+            instrumentation.disable()
+            job.write({
+                'version': JOB_PROTOCOL_VERSION,
+                'summary': instrumentation.summary(),
+            })
+    finally:
+        job.cleanup()
+
+
+if __name__ == '__main__':
+    run_job(sys.argv[1])
@@ -0,0 +1,312 @@
+"""Streaming Network Updates
+
+This module allows to add and remove nodes and edges of a network while
+its layout is running. The modifications are accumulated in a CSRNetwork
+and applied by commit, which rebuilds the NetworkDraw actors and the
+layout resources keeping the current positions of the nodes. The new
+nodes start near their neighbors (warm start).
+
+Each commit rebuilds the actors, so the modifications should be
+grouped: they are only applied by an explicit commit or at the end of
+a batch block.
+
+Examples
+--------
+
+    >>> layout = HeliosFr(edges, network_draw)
+    >>> layout.start()
+    >>> with layout.batch():
+    ...     new_nodes = layout.add_nodes(2)
+    ...     layout.add_edges(
+    ...         [[0, new_nodes[0]], [new_nodes[0], new_nodes[1]]])
+    >>> layout.remove_nodes([1])
+    >>> layout.commit()
+
+"""
+
+import contextlib
+
+import numpy as np
+
+from helios.core.network import CSRNetwork
+
+
+def warm_start_positions(
+        network, positions, placed=None, max_rounds=10, jitter=.1,
+        seed=None):
+    """Place the nodes without positions near their neighbors
+
+    Each round moves the unplaced nodes with at least one placed
+    neighbor to the mean position of their placed neighbors, so chains
+    of new nodes are placed in a breadth-first order. The nodes which
+    are not connected to any placed node are scattered around the
+    centroid of the network.
+
+    Parameters
+    ----------
+    network : CSRNetwork
+    positions : ndarray
+        array with shape (num_nodes, dimension). It will be modified in
+        place.
+    placed : ndarray, optional
+        boolean array with shape (num_nodes, ). If None, the nodes with
+        NaN positions are considered unplaced.
+    max_rounds : int, optional, default 10
+    jitter : float, optional, default 0.1
+        scale of the random displacement relative to the mean edge
+        length, it avoids placing nodes at the same position.
+    seed : int or Generator, optional
+
+    Returns
+    -------
+    positions : ndarray
+
+    """
+    rng = np.random.default_rng(seed)
+    if placed is None:
+        placed = ~np.isnan(positions).any(axis=1)
+    placed = np.array(placed, dtype=bool)
+    if placed.all():
+        return positions
+
+    edges = network.edges()
+    if placed.any():
+        centroid = positions[placed].mean(axis=0)
+        spread = positions[placed].std(axis=0).mean()
+    else:
+        centroid = np.zeros(positions.shape[1])
+        spread = 0
+    placed_edges = edges[placed[edges[:, 0]] & placed[edges[:, 1]]]
+    if len(placed_edges) > 0:
+        scale = np.linalg.norm(
+            positions[placed_edges[:, 0]] - positions[placed_edges[:, 1]],
+            axis=1).mean()
+    else:
+        scale = spread
+    scale = scale if scale > 0 else 1.
+
+    for _ in range(max_rounds):
+        unplaced = np.flatnonzero(~placed)
+        if len(unplaced) == 0:
+            break
+        neighbors, offsets = network.neighbors_of_vertices(unplaced)
+        owners = np.repeat(np.arange(len(unplaced)), np.diff(offsets))
+        valid = placed[neighbors]
+        counts = np.bincount(owners[valid], minlength=len(unplaced))
+        if not counts.any():
+            break
+        sums = np.zeros((len(unplaced), positions.shape[1]))
+        np.add.at(sums, owners[valid], positions[neighbors[valid]])
+        new = counts > 0
+        nodes = unplaced[new]
+        positions[nodes] = sums[new]/counts[new, np.newaxis] + rng.normal(
+            scale=jitter*scale, size=(len(nodes), positions.shape[1]))
+        placed[nodes] = True
+
+    unplaced = np.flatnonzero(~placed)
+    positions[unplaced] = centroid + rng.normal(
+        scale=spread if spread > 0 else scale,
+        size=(len(unplaced), positions.shape[1]))
+    return positions
+
+
+class StreamingLayoutMixin:
+    """Add and remove nodes and edges of the network of a layout.
+
+    The layout classes should implement _streaming_state, which returns
+    the current edges, weights and positions, and _rebuild, which
+    receives the new network.
+
+    """
+    _stream_network = None
+
+    def _streaming_state(self):
+        """Return the current state of the layout
+
+        Returns
+        -------
+        edges : ndarray
+        weights : ndarray or None
+        positions : ndarray
+            array with shape (num_nodes, dimension)
+
+        """
+        raise NotImplementedError(
+            f'{type(self).__name__} does not support streaming updates')
+
+    def _rebuild(self, positions, edges, weights, vertex_map):
+        """Replace the network of the layout keeping its state
+
+        Parameters
+        ----------
+        positions : ndarray
+            array with shape (num_nodes, dimension)
+        edges : ndarray
+        weights : ndarray or None
+        vertex_map : ndarray
+            maps the indices of the previous nodes to the new ones.
+            Removed nodes map to -1.
+
+        """
+        raise NotImplementedError(
+            f'{type(self).__name__} does not support streaming updates')
+
+    def _begin_stream(self):
+        if self._stream_network is not None:
+            return
+        edges, weights, positions = self._streaming_state()
+        self._stream_network = CSRNetwork(
+            np.array(edges, dtype=np.int64), num_vertices=len(positions),
+            weights=None if weights is None else np.array(weights))
+        self._stream_positions = np.array(positions, dtype=np.float64)
+        self._stream_vertex_map = np.arange(len(positions), dtype=np.int64)
+
+    @property
+    def network(self):
+        """The CSRNetwork with the uncommitted modifications or None if
+        the network has not been modified
+
+        """
+        return self._stream_network
+
+    def add_nodes(self, count, positions=None, commit=False):
+        """Add new nodes
+
+        Parameters
+        ----------
+        count : int
+        positions : ndarray, optional
+            array with shape (count, dimension). If None, the nodes will
+            be placed near their neighbors when commit is called.
+        commit : bool, optional, default False
+            If True, commit is called right away. Otherwise, the
+            modification will be applied by the next commit.
+
+        Returns
+        -------
+        nodes : ndarray
+            the indices of the new nodes
+
+        """
+        self._begin_stream()
+        nodes = self._stream_network.add_vertices(count)
+        new_positions = np.full(
+            (count, self._stream_positions.shape[1]), np.nan)
+        if positions is not None:
+            new_positions[:] = positions
+        self._stream_positions = np.concatenate(
+            [self._stream_positions, new_positions])
+        if commit:
+            self.commit()
+        return nodes
+
+    def add_edges(self, edges, weights=None, commit=False):
+        """Add new edges
+
+        Edges referencing nodes which don't exist will create them.
+
+        Parameters
+        ----------
+        edges : ndarray
+            array with shape (num_new_edges, 2)
+        weights : array, optional
+        commit : bool, optional, default False
+
+        """
+        self._begin_stream()
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        num_nodes = self._stream_network.vertex_count()
+        if len(edges) > 0 and edges.max() >= num_nodes:
+            self.add_nodes(int(edges.max()) + 1 - num_nodes, commit=False)
+        properties = {}
+        if weights is not None:
+            properties['weight'] = np.asarray(weights, dtype='float32')
+        self._stream_network.add_edges(edges, **properties)
+        if commit:
+            self.commit()
+
+    def remove_edges(self, edge_ids, commit=False):
+        """Remove edges
+
+        Parameters
+        ----------
+        edge_ids : array
+            indices (rows of the edge list) of the edges
+        commit : bool, optional, default False
+
+        """
+        self._begin_stream()
+        self._stream_network.delete_edges(edge_ids)
+        if commit:
+            self.commit()
+
+    def remove_nodes(self, nodes, commit=False):
+        """Remove nodes and their edges
+
+        The remaining nodes are relabeled to keep the indices contiguous.
+
+        Parameters
+        ----------
+        nodes : array
+        commit : bool, optional, default False
+
+        Returns
+        -------
+        vertex_map : ndarray
+            maps the node indices before this call to the new ones.
+            Removed nodes map to -1.
+
+        """
+        self._begin_stream()
+        vertex_map = self._stream_network.delete_vertices(nodes)
+        kept = vertex_map >= 0
+        self._stream_positions = self._stream_positions[kept]
+        previous = self._stream_vertex_map
+        self._stream_vertex_map = np.where(
+            previous >= 0, vertex_map[previous], -1)
+        if commit:
+            self.commit()
+        return vertex_map
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Group modifications applied by a single commit at the end of
+        the block
+
+        If the block raises an exception, nothing is committed and the
+        modifications stay pending.
+
+        Examples
+        --------
+
+            >>> with layout.batch():
+            ...     nodes = layout.add_nodes(10)
+            ...     layout.add_edges(np.c_[nodes[:-1], nodes[1:]])
+
+        """
+        yield self
+        self.commit()
+
+    def commit(self):
+        """Apply the pending modifications to the layout and the draw
+
+        The nodes which were already in the network keep their current
+        positions, even if the layout has moved them after the
+        modifications. Nodes added without positions are warm started
+        near their neighbors.
+
+        """
+        if self._stream_network is None:
+            return
+        _, _, current = self._streaming_state()
+        vertex_map = self._stream_vertex_map
+        kept = vertex_map >= 0
+        positions = self._stream_positions
+        positions[vertex_map[kept]] = current[kept]
+        positions = warm_start_positions(self._stream_network, positions)
+
+        network = self._stream_network
+        self._stream_network = None
+        self._rebuild(
+            positions.astype('float32'), network.edges(), network.weights(),
+            vertex_map)
@@ -0,0 +1,301 @@
+"""Persistent Layout Workers
+
+This module provides a pool of long-lived processes which execute the
+IPC network layout jobs. Each worker imports the heavy layout modules
+(torch, pymde, cudf, ...) only once, so starting or restarting a layout
+does not pay for the interpreter startup and the imports again.
+
+"""
+
+import collections
+import gc
+import importlib
+import multiprocessing
+import threading
+import time
+import traceback
+
+_DEFAULT_PRELOAD = (
+    'helios.layouts.mde',
+    'helios.layouts.forceatlas2gpu',
+    'helios.layouts.forceatlas2cpu',
+)
+
+
+def _worker_loop(conn, preload):
+    """Main loop of a worker process.
+
+    Parameters
+    ----------
+    conn : multiprocessing.connection.Connection
+        control channel with the pool
+    preload : tuple
+        names of the modules which will be imported before
+        accepting jobs
+
+    """
+    from fury.stream.tools import remove_shm_from_resource_tracker
+    from helios.layouts.server import run_job
+    remove_shm_from_resource_tracker()
+    for module_name in preload:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+    conn.send(('ready', None, None))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        job_id, job_buffer_name = message
+        try:
+            run_job(job_buffer_name)
+            result = ('done', job_id, None)
+        except Exception:
+            result = ('error', job_id, traceback.format_exc())
+        # release the shared memory resources loaded by the job
+        gc.collect()
+        conn.send(result)
+
+
+class LayoutJob:
+    """A layout job submitted to a LayoutWorkerPool
+
+    Attributes
+    ----------
+    error : str or None
+        the traceback of the job if it has failed
+
+    """
+    def __init__(self, pool, job_id, job_buffer_name):
+        self._pool = pool
+        self.job_id = job_id
+        self.job_buffer_name = job_buffer_name
+        self.error = None
+        self._finished = False
+
+    def _finish(self, error=None):
+        self.error = error
+        self._finished = True
+
+    def done(self):
+        """Return True if the job has finished (with or without errors)"""
+        if not self._finished:
+            self._pool._poll()
+        return self._finished
+
+    def wait(self, timeout=None):
+        """Wait the job to finish
+
+        Parameters
+        ----------
+        timeout : float, optional
+            in seconds
+
+        Returns
+        -------
+        finished : bool
+
+        """
+        start = time.time()
+        while not self.done():
+            if timeout is not None and time.time() - start > timeout:
+                return False
+            time.sleep(1/1000)
+        return True
+
+    def cancel(self):
+        """Cancel the job. A running job will have its worker replaced."""
+        self._pool._cancel(self)
+
+    def __repr__(self):
+        return f'LayoutJob(job_id={self.job_id}, done={self._finished})'
+
+
+class _LayoutWorker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.job = None
+        self.ready = False
+
+
+class LayoutWorkerPool:
+    """A pool of persistent processes which run the IPC layouts.
+
+    Examples
+    --------
+
+        >>> pool = LayoutWorkerPool(num_workers=1)
+        >>> mde = MDE(edges, network_draw, worker_pool=pool)
+        >>> mde.start()
+        >>> mde.stop()
+        >>> mde.start(steps=200) # starts in a few milliseconds
+
+    """
+    def __init__(self, num_workers=1, preload=_DEFAULT_PRELOAD):
+        """
+
+        Parameters
+        ----------
+        num_workers : int, optional, default 1
+        preload : tuple, optional
+            names of the modules imported by each worker right after its
+            creation. Modules that can't be imported are ignored.
+
+        """
+        self._context = multiprocessing.get_context('spawn')
+        self._preload = tuple(preload)
+        self._lock = threading.RLock()
+        self._pending = collections.deque()
+        self._next_job_id = 0
+        self._closed = False
+        self._workers = []
+        for _ in range(num_workers):
+            self._workers.append(self._spawn_worker())
+
+    def _spawn_worker(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_loop, args=(child_conn, self._preload),
+            daemon=True)
+        process.start()
+        child_conn.close()
+        return _LayoutWorker(process, parent_conn)
+
+    def _replace_worker(self, worker):
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+        index = self._workers.index(worker)
+        self._workers[index] = self._spawn_worker()
+
+    @property
+    def num_workers(self):
+        return len(self._workers)
+
+    def wait_ready(self, timeout=None):
+        """Wait until all the workers have imported the preload modules
+
+        Parameters
+        ----------
+        timeout : float, optional
+            in seconds
+
+        Returns
+        -------
+        ready : bool
+
+        """
+        start = time.time()
+        while not all(worker.ready for worker in self._workers):
+            if timeout is not None and time.time() - start > timeout:
+                return False
+            self._poll()
+            time.sleep(1/100)
+        return True
+
+    def submit(self, job_buffer_name):
+        """Submit a new layout job
+
+        Parameters
+        ----------
+        job_buffer_name : str
+            the name of the shared memory block which stores the
+            job descriptor (see SharedMemJob)
+
+        Returns
+        -------
+        job : LayoutJob
+
+        """
+        if self._closed:
+            raise RuntimeError('The LayoutWorkerPool has been shut down')
+        with self._lock:
+            job = LayoutJob(self, self._next_job_id, job_buffer_name)
+            self._next_job_id += 1
+            self._pending.append(job)
+        self._poll()
+        return job
+
+    def _poll(self):
+        """Collect the finished jobs and dispatch the pending ones"""
+        with self._lock:
+            for worker in list(self._workers):
+                try:
+                    while worker.conn.poll():
+                        status, _, error = worker.conn.recv()
+                        if status == 'ready':
+                            worker.ready = True
+                            continue
+                        job = worker.job
+                        worker.job = None
+                        if job is not None:
+                            job._finish(error)
+                except (EOFError, OSError):
+                    pass
+
+                if not worker.process.is_alive() and not self._closed:
+                    if worker.job is not None:
+                        worker.job._finish('The layout worker has died')
+                        worker.job = None
+                    self._replace_worker(worker)
+
+            for worker in self._workers:
+                if len(self._pending) == 0:
+                    break
+                if worker.job is None:
+                    job = self._pending.popleft()
+                    worker.job = job
+                    worker.conn.send((job.job_id, job.job_buffer_name))
+
+    def _cancel(self, job):
+        with self._lock:
+            if job in self._pending:
+                self._pending.remove(job)
+                job._finish('cancelled')
+                return
+            for worker in self._workers:
+                if worker.job is job:
+                    worker.job = None
+                    self._replace_worker(worker)
+                    job._finish('cancelled')
+                    return
+
+    def shutdown(self):
+        """Stop all the workers"""
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            for job in self._pending:
+                job._finish('cancelled')
+            self._pending.clear()
+            for worker in self._workers:
+                try:
+                    worker.conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for worker in self._workers:
+                worker.process.join(timeout=1)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join()
+                if worker.job is not None:
+                    worker.job._finish('cancelled')
+                worker.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def __del__(self):
+        self.shutdown()
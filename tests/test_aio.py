@@ -0,0 +1,93 @@
+import asyncio
+
+import numpy as np
+import numpy.testing as npt
+
+from helios import NetworkDraw
+from helios.layouts import ForceAtlas2, HeliosFr, LayoutWorkerPool
+
+
+def test_heliosfr_async():
+    edges = np.array([[0, 1], [1, 2], [2, 0]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(3, 3)), edges=edges)
+    layout = HeliosFr(edges, network_draw)
+
+    async def run():
+        await layout.start_async(ms=10)
+        assert layout.running_async
+        assert layout._interval_timer is None
+        frames = []
+        async for positions in layout.frames():
+            frames.append(positions)
+            if len(frames) == 3:
+                await layout.stop_async()
+        return frames
+
+    frames = asyncio.run(run())
+    assert len(frames) == 3
+    assert frames[0].shape == (3, 3)
+    assert not layout.running_async
+    assert not layout._started
+
+
+def test_forceatlas2_async():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [0, 2]])
+    network_draws = [
+        NetworkDraw(positions=np.random.normal(size=(4, 2)), edges=edges)
+        for _ in range(2)]
+    with LayoutWorkerPool(num_workers=2, preload=()) as pool:
+        layouts = [
+            ForceAtlas2(
+                edges, network_draw, backend='cpu', worker_pool=pool)
+            for network_draw in network_draws]
+
+        async def consume(layout):
+            await layout.start_async(ms=0, steps=10, iters_by_step=5)
+            frames = [positions async for positions in layout.frames()]
+            assert await layout.next_frame() is None
+            return frames
+
+        async def run():
+            # both layouts are driven by the same loop
+            return await asyncio.wait_for(
+                asyncio.gather(*[consume(layout) for layout in layouts]),
+                timeout=60)
+
+        for layout, frames in zip(layouts, asyncio.run(run())):
+            assert len(frames) > 0
+            assert frames[-1].shape == (4, 2)
+            assert not layout._started
+            assert layout.job.error is None
+            npt.assert_almost_equal(
+                frames[-1], layout._shm_manager.positions.data)
+            layout.cleanup()
+
+
+def test_sync_stop_detaches_loop():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [0, 2]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 2)), edges=edges)
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        layouts = [
+            HeliosFr(edges, network_draw),
+            ForceAtlas2(
+                edges, network_draw, backend='cpu', worker_pool=pool)]
+
+        async def run(layout):
+            for _ in range(2):
+                await layout.start_async(ms=1)
+                assert await layout.next_frame() is not None
+                waiter = asyncio.ensure_future(layout.next_frame())
+                await asyncio.sleep(0)
+                tasks = list(layout._aio_tasks)
+                layout.stop()
+                assert not layout.running_async
+                assert await waiter is None
+                await asyncio.sleep(0)
+                assert all(task.done() for task in tasks)
+
+        for layout in layouts:
+            asyncio.run(asyncio.wait_for(run(layout), timeout=60))
+            assert not layout._started
+        layouts[1].cleanup()
@@ -0,0 +1,67 @@
+import numpy as np
+import numpy.testing as npt
+import pymde
+
+from helios.layouts.cache import ArrayCache, array_digest
+from helios.layouts.ipc_tools import ShmManagerMultiArrays
+from helios.layouts.mde import MDEServerCalc
+
+
+def test_array_cache(tmp_path):
+    edges = np.array([[0, 1], [1, 2]])
+    key = array_digest(edges, None, method='test')
+    assert key == array_digest(edges.copy(), None, method='test')
+    assert key != array_digest(edges, None, method='other')
+    assert key != array_digest(edges.astype('int32'), None, method='test')
+    assert key != array_digest(edges, np.ones(2), method='test')
+
+    cache = ArrayCache(str(tmp_path))
+    assert cache.load(key) is None
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'distances': np.arange(5.)}
+
+    for _ in range(2):
+        arrays = cache.get_or_compute(key, compute)
+        assert isinstance(arrays['distances'], np.memmap)
+        npt.assert_equal(arrays['distances'], np.arange(5.))
+    assert len(calls) == 1
+    # copy-on-write arrays never modify the cache
+    arrays['distances'][0] = 10
+    npt.assert_equal(cache.load(key)['distances'], np.arange(5.))
+    assert key in cache
+    cache.clear()
+    assert key not in cache
+
+
+def test_mde_shortest_paths_cache(tmp_path, monkeypatch):
+    edges = pymde.all_edges(10).cpu().numpy()[::3]
+    shm_manager = ShmManagerMultiArrays()
+    shm_manager.add_multi_buffer(
+        'positions', np.random.normal(size=(10, 2)), 'float32')
+    shm_manager.add_array('info', np.zeros(4), 'float32')
+    shm_manager.add_array('edges', edges, 'int64')
+    kwargs = dict(
+        edges_buffer_name=shm_manager.edges._buffer_name,
+        positions_buffer_name=shm_manager.positions._buffer_name,
+        info_buffer_name=shm_manager.info._buffer_name,
+        use_shortest_path=True,
+        cache_dir=str(tmp_path),
+    )
+    server = MDEServerCalc(**kwargs)
+    distances = server.mde.distortion_function.weights.numpy()
+
+    def fail(*args, **kwargs):
+        raise AssertionError('the shortest paths should be cached')
+
+    monkeypatch.setattr(pymde.preprocess.graph, 'shortest_paths', fail)
+    cached_server = MDEServerCalc(**kwargs)
+    npt.assert_almost_equal(
+        cached_server.mde.distortion_function.weights.numpy(), distances)
+    npt.assert_equal(
+        cached_server.mde.edges.numpy(), server.mde.edges.numpy())
+    cached_server.start(2, 2)
+    assert shm_manager.info._repr[1] == 1
+    shm_manager.cleanup()
@@ -1,9 +1,13 @@
 import numpy as np
 import numpy.testing as npt
+import pytest
 from fury import window
 
-from helios import NetworkDraw
+from helios import BatchRenderer, NetworkDraw
 from helios.backends.fury.actors import _MARKER2Id
+from helios.backends.fury.aggregation import EdgeDensityGrid, FuryEdgeDensity
+from helios.backends.fury.aggregation import rasterize_edges
+from helios.backends.fury.offscreen import PNGWriter
 
 
 def test_network_draw_only_nodes_2d_symbols(interactive=False):
@@ -150,3 +154,336 @@ def test_network_draw_update_pos(interactive=False):
         arr = window.snapshot(network_draw.showm.scene)
         report = window.analyze_snapshot(arr, colors=colors)
         npt.assert_equal(report.objects, 1)
+
+
+def test_network_draw_shader_offsets(interactive=False):
+    num_nodes = 8
+    thetas = [2*np.pi*i/(num_nodes) for i in range(num_nodes)]
+    positions = 2*np.array(
+       [[np.cos(t), np.sin(t)] for t in thetas]
+    )
+    network_draw = NetworkDraw(
+            positions=positions,
+            scales=.5,
+            colors=(0, 1, 0),
+            node_opacity=1,
+            node_edge_width=0,
+            marker='o',
+            shader_offsets=True,
+    )
+    assert network_draw.nodes._centers_geo.dtype == np.float32
+    npt.assert_almost_equal(network_draw.positions[:, 0:2], positions)
+
+    if interactive:
+        window.show(network_draw.showm.scene)
+
+    arr = window.snapshot(network_draw.showm.scene)
+    colors = np.array([[0, 1, 0] for i in range(num_nodes)])
+    report = window.analyze_snapshot(arr, colors=colors)
+    npt.assert_equal(report.objects, num_nodes)
+
+    network_draw.positions = np.zeros_like(positions)
+    network_draw.update()
+    npt.assert_equal(network_draw.nodes._centers_geo, 0)
+    arr = window.snapshot(network_draw.showm.scene)
+    report = window.analyze_snapshot(arr, colors=colors)
+    npt.assert_equal(report.objects, 1)
+
+
+def test_positions_upload_only_centers():
+    num_nodes = 8
+    thetas = 2*np.pi*np.arange(num_nodes)/num_nodes
+    positions = 2*np.c_[np.cos(thetas), np.sin(thetas)]
+    colors = np.array([[0, 1, 0]]*num_nodes)
+    for shader_offsets in [False, True]:
+        network_draw = NetworkDraw(
+            positions=positions, scales=.5, colors=(0, 1, 0),
+            node_opacity=1, node_edge_width=0, marker='o',
+            shader_offsets=shader_offsets, offscreen=True,
+            window_size=(200, 200))
+        network_draw.refresh()
+        report = window.analyze_snapshot(
+            network_draw.capture(), colors=colors)
+        npt.assert_equal(report.objects, num_nodes)
+        polydata = network_draw.nodes.vtk_actor.GetMapper().GetInput()
+        points_mtime = polydata.GetPoints().GetData().GetMTime()
+        offsets = polydata.GetPointData().GetArray('vOffset')
+        offsets_mtime = None if offsets is None else offsets.GetMTime()
+
+        # the layouts only set the positions, without calling update
+        network_draw.positions = np.zeros_like(positions)
+        network_draw.refresh()
+        assert polydata.GetPoints().GetData().GetMTime() > points_mtime
+        if shader_offsets:
+            assert offsets.GetMTime() == offsets_mtime
+        report = window.analyze_snapshot(
+            network_draw.capture(), colors=colors)
+        npt.assert_equal(report.objects, 1)
+
+
+def test_network_draw_edge_index_buffer(interactive=False):
+    num_nodes = 8
+    thetas = [2*np.pi*i/(num_nodes) for i in range(num_nodes)]
+    positions = 2*np.array(
+       [[np.cos(t), np.sin(t)] for t in thetas]
+    )
+    edges = np.array([[i, (i+1) % num_nodes] for i in range(num_nodes)])
+    for shader_offsets in [False, True]:
+        network_draw = NetworkDraw(
+                positions=positions,
+                edges=edges,
+                scales=.5,
+                colors=(0, 1, 0),
+                node_opacity=1,
+                edge_line_color=(1, 0, 0),
+                edge_line_opacity=1,
+                shader_offsets=shader_offsets,
+                edge_index_buffer=True,
+        )
+        if interactive:
+            window.show(network_draw.showm.scene)
+        arr = window.snapshot(network_draw.showm.scene)
+        report = window.analyze_snapshot(arr, colors=[(255, 0, 0)])
+        assert report.colors_found[0]
+
+        edges_points = network_draw.edges.vtk_actor.GetMapper().\
+            GetInput().GetPoints()
+        npt.assert_almost_equal(
+            edges_points.GetPoint(network_draw.nodes._centers_length),
+            [positions[1, 0], positions[1, 1], 0], decimal=5)
+
+        new_positions = positions*2
+        network_draw.positions = new_positions
+        npt.assert_almost_equal(
+            edges_points.GetPoint(network_draw.nodes._centers_length),
+            [new_positions[1, 0], new_positions[1, 1], 0], decimal=5)
+
+        network_draw.edges.colors = np.zeros((num_nodes, 3))
+        npt.assert_equal(network_draw.edges.colors, 0)
+
+
+def test_network_draw_offscreen():
+    positions = np.array([[-1, 0, 0], [1, 0, 0]])
+    network_draw = NetworkDraw(
+        positions=positions, colors=(0, 1, 0), scales=.5, node_opacity=1,
+        node_edge_width=0, offscreen=True, window_size=(64, 48))
+    assert network_draw.showm is None
+    assert network_draw.iren is None
+    network_draw.refresh()
+    image = network_draw.capture()
+    assert image.shape == (48, 64, 3)
+    report = window.analyze_snapshot(image, colors=[(0, 255, 0)])
+    npt.assert_equal(report.objects, 2)
+    assert network_draw.capture() is image
+    npt.assert_equal(
+        image, window.snapshot(
+            network_draw.scene, render_window=network_draw.window))
+
+
+def test_batch_renderer(tmp_path):
+    rng = np.random.default_rng(0)
+    graphs = [
+        {'positions': rng.normal(size=(num_nodes, 3)),
+         'edges': np.array([[0, 1], [1, 2]])}
+        for num_nodes in [3, 5, 8]]
+    with BatchRenderer(
+            window_size=(32, 32), colors=(1, 0, 0), node_opacity=1,
+            node_edge_width=0) as renderer:
+        images = renderer.render_batch(graphs)
+        assert len(images) == 3
+        for image in images:
+            assert image.shape == (32, 32, 3)
+            assert image[..., 0].max() == 255
+        network_draw = renderer.network_draw(**graphs[0])
+        npt.assert_equal(renderer.render(network_draw), images[0])
+
+        writer = PNGWriter(str(tmp_path / 'thumb_{:02d}.png'))
+        assert renderer.render_batch(graphs, writer) == 3
+        writer.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        'thumb_00.png', 'thumb_01.png', 'thumb_02.png']
+
+
+def test_network_draw_lod():
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-10, 10, size=(100, 3))
+    positions[:, 2] = 0
+    kwargs = dict(
+        colors=(1, 0, 0), scales=.3, node_opacity=1, node_edge_width=0,
+        offscreen=True, window_size=(200, 200))
+    network_draw = NetworkDraw(
+        positions, lod=True, lod_pixel_threshold=0, **kwargs)
+    reference = NetworkDraw(positions, **kwargs)
+    for draw in [network_draw, reference]:
+        draw.scene.ResetCamera()
+        draw.refresh()
+    assert network_draw.lod.counts == (0, 0, 100)
+    npt.assert_equal(network_draw.capture(), reference.capture())
+    # nothing changed since the last render
+    assert not network_draw.lod.update()
+
+    camera = network_draw.scene.GetActiveCamera()
+    camera.Zoom(4)
+    network_draw.refresh()
+    culled, points, markers = network_draw.lod.counts
+    assert culled > 50 and points == 0 and markers == 100 - culled
+
+    # the sub-pixel nodes are drawn as points
+    camera.Zoom(1/20)
+    network_draw.lod.pixel_threshold = 1
+    network_draw.refresh()
+    assert network_draw.lod.counts == (0, 100, 0)
+    assert network_draw.capture()[..., 0].max() == 255
+
+    network_draw.set_network(positions[0:50])
+    network_draw.refresh()
+    assert sum(network_draw.lod.counts) == 50
+
+
+def test_rasterize_edges():
+    density = rasterize_edges(
+        np.array([[0.5, 0.5], [0.5, 0.5]]), np.array([[3.5, 0.5], [0.5, 0.5]]),
+        origin=np.zeros(2), cell_size=1, shape=(2, 4))
+    npt.assert_equal(density, [[2, 1, 1, 1], [0, 0, 0, 0]])
+    # a diagonal crosses one cell by column
+    density = rasterize_edges(
+        np.array([[0., 0.]]), np.array([[3.9, 1.9]]), np.zeros(2), 1,
+        (2, 4), chunk_size=1)
+    npt.assert_equal(density.sum(axis=0), [1, 1, 1, 1])
+
+
+def test_edge_density_grid():
+    rng = np.random.default_rng(0)
+    positions = rng.normal(size=(200, 2))
+    edges = rng.integers(0, 200, size=(1000, 2))
+    grid = EdgeDensityGrid(edges, resolution=64, tolerance=0)
+    assert grid.update(positions)
+    assert grid.density.sum() >= len(edges)
+    assert not grid.update(positions)
+
+    # moving a few nodes updates only their edges
+    positions[0:5] += .05
+    assert grid.update(positions)
+    full = EdgeDensityGrid(edges, resolution=64)
+    full.reset(positions)
+    full.origin, full.cell_size = grid.origin, grid.cell_size
+    full.density[:] = 0
+    full._rasterize(positions, edges, 1.)
+    npt.assert_almost_equal(grid.density, full.density)
+
+    # the grid follows the layout when it leaves the bounds
+    positions += 100
+    assert grid.update(positions)
+    assert grid.bounds[0] > 90
+
+
+def test_network_draw_edge_density():
+    rng = np.random.default_rng(0)
+    positions = rng.normal(size=(100, 2))
+    edges = rng.integers(0, 100, size=(5000, 2))
+    network_draw = NetworkDraw(
+        positions, edges, edge_density=32, edge_line_color=(0, 0, 1),
+        edge_line_opacity=1, node_opacity=0, offscreen=True,
+        window_size=(64, 64))
+    assert isinstance(network_draw.edges, FuryEdgeDensity)
+    assert len(network_draw.vtk_actors) == 2
+    density = network_draw.edges.density
+    assert density.shape == (32, 32)
+    network_draw.scene.ResetCamera()
+    network_draw.refresh()
+    assert network_draw.capture()[..., 2].max() > 0
+
+    network_draw.positions = positions*2
+    assert network_draw.edges._grid.bounds[1] > 2*positions[:, 0].max()
+    network_draw.set_network(positions[0:50], edges[edges.max(1) < 50])
+    assert isinstance(network_draw.edges, FuryEdgeDensity)
+
+
+def test_network_draw_pick():
+    positions = np.array([[0., 0.], [1., 0.], [0., 1.], [1., 1.]])
+    network_draw = NetworkDraw(
+        positions, scales=.1, offscreen=True, window_size=(200, 200))
+    network_draw.scene.ResetCamera()
+    network_draw.refresh()
+    scene = network_draw.scene
+    display = []
+    for x, y in positions:
+        scene.SetWorldPoint(x, y, 0, 1)
+        scene.WorldToDisplay()
+        display.append(scene.GetDisplayPoint()[0:2])
+    display = np.array(display)
+
+    for node, (x, y) in enumerate(display):
+        assert network_draw.pick(x + 2, y - 2) == node
+    center = display.mean(axis=0)
+    assert network_draw.pick(*center, radius=2) == -1
+    npt.assert_equal(
+        network_draw.select_box(*(display[0] - 5), *(display[3] - 5)), [0])
+    npt.assert_equal(
+        network_draw.select_box(*(display[0] - 5), *(display[3] + 5)),
+        [0, 1, 2, 3])
+    lasso = np.array(
+        [display[0] - 10, display[1] + [30, -10], display[2] + [-10, 30]])
+    npt.assert_equal(network_draw.select_lasso(lasso), [0, 1, 2])
+
+    # the index follows the positions
+    network_draw.positions = positions[::-1].copy()
+    network_draw.refresh()
+    assert network_draw.pick(*display[0]) == 3
+    network_draw.set_network(positions[0:2])
+    assert network_draw.spatial_index.num_nodes == 2
+
+
+def test_set_node_attributes():
+    rng = np.random.default_rng(0)
+    num_nodes = 20
+    positions = rng.normal(size=(num_nodes, 2))
+    network_draw = NetworkDraw(
+        positions, colors=rng.uniform(size=(num_nodes, 3)),
+        marker=['o']*num_nodes, node_edge_width=np.zeros(num_nodes),
+        offscreen=True, window_size=(64, 64))
+    nodes = network_draw.nodes
+    network_draw.refresh()
+    point_data = nodes.vtk_actor.GetMapper().GetInput().GetPointData()
+    mtimes = {
+        name: point_data.GetArray(name).GetMTime()
+        for name in ['colors', 'vMarker', 'vEdgeWidth']}
+    colors = np.array(nodes.colors)
+    edge_width = np.array(nodes.edge_width)
+
+    network_draw.set_node_attributes([2, 5], colors=(255, 0, 0))
+    nodes.set_node_attributes(
+        [5, 7], edge_width=[.1, .2], marker=['s', 'd'])
+    colors[[2, 5]] = (255, 0, 0)
+    edge_width[[5, 7]] = [.1, .2]
+    npt.assert_equal(nodes.colors, colors)
+    npt.assert_almost_equal(nodes.edge_width, edge_width)
+    npt.assert_equal(nodes.marker[[0, 5, 7]], [0, 1, 2])
+    # all the vertices of the billboards are written
+    npt.assert_equal(
+        nodes._colors_geo[
+            2*nodes._centers_length:3*nodes._centers_length],
+        [[255, 0, 0]]*nodes._centers_length)
+    # the arrays are uploaded at the next render
+    for name, mtime in mtimes.items():
+        assert point_data.GetArray(name).GetMTime() == mtime
+    network_draw.refresh()
+    for name, mtime in mtimes.items():
+        assert point_data.GetArray(name).GetMTime() > mtime
+    assert not nodes._dirty_attributes
+
+    # moving the nodes doesn't upload the attributes again
+    mtimes = {name: point_data.GetArray(name).GetMTime() for name in mtimes}
+    center_mtime = point_data.GetArray('center').GetMTime()
+    network_draw.positions = positions + 1
+    network_draw.refresh()
+    assert point_data.GetArray('center').GetMTime() > center_mtime
+    for name, mtime in mtimes.items():
+        assert point_data.GetArray(name).GetMTime() == mtime
+
+    nodes.edge_width = .3
+    npt.assert_almost_equal(nodes.edge_width, .3)
+    with pytest.raises(ValueError):
+        nodes.set_node_attributes([0], marker_opacity=.5)
+    with pytest.raises(ValueError):
+        nodes.set_node_attributes([0], size=1)
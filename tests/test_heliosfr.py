@@ -1,9 +1,14 @@
+import asyncio
+
 import networkx as nx
 import numpy as np
+import numpy.testing as npt
 from fury import window
 
 from helios import NetworkDraw
-from helios.layouts import HeliosFr
+from helios.core.network import CSRNetwork
+from helios.layouts import HeliosFr, MultilevelHeliosFr
+from helios.layouts.multilevel import coarsen, heavy_edge_matching
 
 
 def test_draw(interactive=False):
@@ -38,3 +43,131 @@ def test_draw(interactive=False):
         layout.steps(300)
         if interactive:
             window.show(network_draw.showm.scene)
+
+
+def test_network_edges_not_copied():
+    edges = np.array([[0, 1], [1, 2], [2, 3]])
+    network = CSRNetwork(edges)
+    network_draw = NetworkDraw(positions=np.random.normal(size=(4, 3)))
+    layout = HeliosFr(network, network_draw)
+    assert layout._edges.dtype == np.uint64
+    assert np.shares_memory(layout._edges, network.edges())
+    layout.steps(5)
+
+
+def test_heavy_edge_matching():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0]])
+    weights = np.array([1., 5., 1., 5.])
+    match = heavy_edge_matching(CSRNetwork(edges), weights, seed=0)
+    npt.assert_equal(match, [3, 2, 1, 0])
+
+    g = nx.grid_2d_graph(20, 20)
+    g = nx.convert_node_labels_to_integers(g)
+    edges = np.array(g.edges())
+    match = heavy_edge_matching(CSRNetwork(edges), seed=0)
+    matched = np.nonzero(match >= 0)[0]
+    npt.assert_equal(match[match[matched]], matched)
+    levels = coarsen(edges, len(g), min_nodes=20, seed=0)
+    assert len(levels) > 1
+    num_vertices = len(g)
+    for mapping, coarse_edges, num_coarse in levels:
+        assert mapping.shape[0] == num_vertices
+        assert num_coarse < num_vertices
+        assert coarse_edges.max() < num_coarse
+        num_vertices = num_coarse
+    assert num_vertices <= 20
+
+    # the leaves of a star collapse into the center
+    star = np.c_[np.zeros(50, dtype=int), np.arange(1, 51)]
+    levels = coarsen(star, 51, min_nodes=1, seed=0)
+    assert levels[0][2] == 1
+
+
+def test_multilevel_heliosfr():
+    g = nx.grid_2d_graph(20, 20)
+    g = nx.convert_node_labels_to_integers(g)
+    edges = np.array(g.edges())
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(len(g), 3)), edges=edges)
+    layout = MultilevelHeliosFr(
+        edges, network_draw, min_nodes=20, seed=0)
+    assert layout.num_levels > 1
+    layout.steps(10)
+    assert np.all(np.isfinite(layout._positions))
+    npt.assert_almost_equal(
+        network_draw.positions, layout._positions, decimal=4)
+
+
+def test_multilevel_heliosfr_2d():
+    rng = np.random.default_rng(0)
+    edges = rng.integers(0, 2000, size=(4000, 2))
+    network_draw = NetworkDraw(
+        positions=rng.normal(size=(2000, 2)), edges=edges)
+    layout = MultilevelHeliosFr(edges, network_draw, seed=0)
+    assert layout.num_levels > 0
+    layout.steps(5)
+    npt.assert_equal(layout._positions[:, 2], 0)
+    npt.assert_equal(network_draw.positions[:, 2], 0)
+
+
+def test_multilevel_heliosfr_start():
+    g = nx.grid_2d_graph(20, 20)
+    g = nx.convert_node_labels_to_integers(g)
+    edges = np.array(g.edges())
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(len(g), 2)), edges=edges)
+    layout = MultilevelHeliosFr(
+        edges, network_draw, min_nodes=20, coarsest_iterations=30,
+        level_iterations=10, iterations_per_tick=5, seed=0)
+
+    async def run():
+        # start returns before the coarse levels are laid out
+        layout.start(ms=1)
+        assert not layout._refined and not layout._started
+        while not layout._started:
+            await asyncio.sleep(.01)
+        layout.stop()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=60))
+    assert layout._refined
+    assert layout._refine_timer is None
+    npt.assert_equal(layout._positions[:, 2], 0)
+
+
+def test_multilevel_heliosfr_streaming():
+    g = nx.grid_2d_graph(20, 20)
+    g = nx.convert_node_labels_to_integers(g)
+    edges = np.array(g.edges())
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(len(g), 3)), edges=edges)
+    layout = MultilevelHeliosFr(
+        edges, network_draw, min_nodes=20, seed=0)
+    # the network is modified before the coarse levels are refined
+    layout.add_nodes(5)
+    layout.add_edges([[0, 400], [400, 401]])
+    layout.commit()
+    assert layout.num_levels > 1
+    layout.steps(5)
+    assert layout._positions.shape == (405, 3)
+    assert np.all(np.isfinite(layout._positions))
+
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(len(g), 2)), edges=edges)
+    layout = MultilevelHeliosFr(
+        edges, network_draw, min_nodes=20, coarsest_iterations=30,
+        level_iterations=10, iterations_per_tick=5, seed=0)
+
+    async def run():
+        layout.start(ms=1)
+        await asyncio.sleep(.05)
+        with layout.batch():
+            layout.add_edges([[0, 400], [400, 401]])
+        assert layout._refine_timer is not None
+        while not layout._started:
+            await asyncio.sleep(.01)
+        layout.stop()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=60))
+    assert layout._positions.shape == (402, 3)
+    assert np.all(np.isfinite(layout._positions))
+    npt.assert_equal(layout._positions[:, 2], 0)
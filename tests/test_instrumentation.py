@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+import numpy.testing as npt
+
+from helios import NetworkDraw
+from helios.core import instrumentation
+from helios.core.instrumentation import Instrumentation
+
+
+def test_instrumentation_timers():
+    inst = Instrumentation()
+    with inst.timer('stage'):
+        pass
+    inst.count('frames')
+    assert inst.summary() == {'timers': {}, 'counters': {}}
+
+    samples = []
+    inst.add_callback(lambda name, seconds: samples.append(name))
+    inst.enabled = True
+    for _ in range(10):
+        with inst.timer('stage'):
+            time.sleep(1/1000)
+        inst.count('frames', 2)
+    inst.add_sample('other', 2.)
+    summary = inst.summary(histograms=True)
+    stage = summary['timers']['stage']
+    assert stage['count'] == 10
+    assert 1e-3 <= stage['min'] <= stage['p50'] <= stage['p99']
+    assert stage['p99'] <= stage['max']
+    assert stage['rate'] > 0
+    assert sum(stage['histogram']['counts']) == 10
+    assert summary['timers']['other']['p50'] == 2.
+    assert summary['counters']['frames']['count'] == 20
+    assert samples == ['stage']*10 + ['other']
+
+    inst.reset()
+    assert inst.summary()['timers'] == {}
+
+
+def test_instrumentation_draw():
+    positions = np.random.normal(size=(10, 3))
+    edges = np.array([[0, 1], [1, 2]])
+    network_draw = NetworkDraw(positions=positions, edges=edges)
+    instrumentation.enable()
+    try:
+        network_draw.positions = positions + 1
+        network_draw.refresh()
+        summary = instrumentation.summary()
+    finally:
+        instrumentation.disable()
+    for stage in [
+            'nodes.positions', 'edges.positions', 'draw.refresh',
+            'draw.window_render', 'draw.iren_render']:
+        assert summary['timers'][stage]['count'] == 1
+    assert summary['counters']['draw.frames']['count'] == 1
+    npt.assert_almost_equal(network_draw.positions, positions + 1)
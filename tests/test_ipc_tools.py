@@ -1,5 +1,10 @@
+import os
+import threading
+import time
+
 import numpy as np
 import numpy.testing as npt
+import pytest
 
 import helios.layouts.ipc_tools as ipc
 
@@ -26,6 +31,86 @@ def test_shared_mem_array():
     assert shm._repr.ndim == 1
 
 
+def test_shared_mem_typed_header():
+    arr = np.arange(6, dtype='int32').reshape(3, 2)
+    shm = ipc.SharedMemArrayManager(data=arr)
+    # the dtype and the shape are read from the header
+    shm_h = ipc.SharedMemArrayManager(buffer_name=shm._buffer_name)
+    assert shm_h._dtype == np.dtype('int32')
+    npt.assert_equal(shm_h.data, arr)
+    assert shm_h.data.ctypes.data % 64 == 0
+    shm_h.cleanup()
+    npt.assert_raises(
+        ValueError, ipc.SharedMemArrayManager,
+        buffer_name=shm._buffer_name, dtype='float32')
+    npt.assert_raises(
+        ValueError, ipc.SharedMemMultiBuffer, buffer_name=shm._buffer_name)
+    shm.cleanup()
+
+    # row counts above 2**24 are not representable by float32
+    num_rows = 2**24 + 3
+    shm = ipc.SharedMemArrayManager(
+        data=np.zeros(num_rows, dtype='float32'))
+    shm_h = ipc.SharedMemArrayManager(buffer_name=shm._buffer_name)
+    assert shm_h.data.shape == (num_rows, )
+    shm_h.cleanup()
+    shm.cleanup()
+
+    # 2D arrays with a single column keep their shape
+    shm = ipc.SharedMemArrayManager(data=np.zeros((4, 1)))
+    shm_h = ipc.SharedMemArrayManager(buffer_name=shm._buffer_name)
+    assert shm_h.data.shape == (4, 1)
+    shm_h.cleanup()
+    shm.cleanup()
+
+    arr = np.random.normal(size=(5, 3)).astype('float32')
+    shm = ipc.SharedMemMultiBuffer(data=arr)
+    shm_h = ipc.SharedMemMultiBuffer(buffer_name=shm._buffer_name)
+    assert shm_h._dtype == np.dtype('float32')
+    for slot in shm_h._slots:
+        assert slot.ctypes.data % 64 == 0
+        npt.assert_equal(slot, arr)
+    shm_h.cleanup()
+    shm.cleanup()
+
+
+def test_shared_mem_array_growth():
+    arr = np.arange(8, dtype='float32').reshape(4, 2)
+    shm = ipc.SharedMemArrayManager(data=arr, capacity=6)
+    assert shm._capacity == 6
+    shm_h = ipc.SharedMemArrayManager(
+        buffer_name=shm._buffer_name, dtype='float32')
+
+    # in place resize inside of the reserved capacity
+    assert not shm.resize(5)
+    npt.assert_equal(shm.data[0:4], arr)
+    npt.assert_equal(shm.data[4], [0, 0])
+    assert shm_h._repr.shape == (4, 2)
+    assert shm_h.data.shape == (5, 2)
+
+    # the data setter grows the array, reallocating the resource
+    old_name = shm._buffer_name
+    new_data = np.ones((9, 2), dtype='float32')
+    shm.data = new_data
+    assert shm._buffer_name != old_name
+    assert shm._capacity == 12
+    npt.assert_equal(shm.data, new_data)
+
+    # the reader follows the forward name of the old resource
+    assert shm_h.sync()
+    assert shm_h._buffer_name == shm._buffer_name
+    npt.assert_equal(shm_h.data, new_data)
+    shm_h._repr[0] = -1
+    npt.assert_equal(shm.data[0], [-1, -1])
+    assert not shm_h.sync()
+
+    # smaller arrays are written at the beginning
+    shm.data = np.zeros((2, 2), dtype='float32')
+    npt.assert_equal(shm.data[0:3], [[0, 0], [0, 0], [1, 1]])
+    shm_h.cleanup()
+    shm.cleanup()
+
+
 def test_shm_manager_multi_arrays():
     shm_manager = ipc.ShmManagerMultiArrays()
     arr2d = np.random.normal(size=(4, 2))
@@ -46,3 +131,166 @@ def test_shm_manager_multi_arrays():
         dtype=arr1d.dtype)
     npt.assert_equal(shm_manager_h.arr2d_h._repr, arr2d)
     npt.assert_equal(shm_manager_h.arr1d_h._repr, arr1d)
+
+
+def test_shared_mem_multi_buffer():
+    arr = np.random.normal(size=(5, 2)).astype('float32')
+    shm = ipc.SharedMemMultiBuffer(data=arr, num_buffers=3)
+    shm_h = ipc.SharedMemMultiBuffer(
+        buffer_name=shm._buffer_name, dtype='float32')
+    assert shm_h._num_buffers == 3
+    assert shm_h.generation == 0
+    npt.assert_equal(shm_h.data, arr)
+
+    out = np.zeros_like(arr)
+    assert shm.read(out, last_generation=0) is None
+    for i in range(1, 5):
+        assert shm_h.write(arr + i) == i
+        assert shm.generation == i
+        assert shm.read(out, last_generation=i-1) == i
+        npt.assert_equal(out, arr + i)
+
+    # a slot being written (odd sequence) should not be read
+    slot = shm.generation % 3
+    shm._seqs[slot] += 1
+    assert shm.read(out) is None
+    shm._seqs[slot] += 1
+    assert shm.read(out) == shm.generation
+
+    shm_h.cleanup()
+    shm.cleanup()
+
+    shm_manager = ipc.ShmManagerMultiArrays()
+    shm_manager.add_multi_buffer('positions', arr, num_buffers=2)
+    shm_manager_h = ipc.ShmManagerMultiArrays()
+    shm_manager_h.load_multi_buffer(
+        'positions', shm_manager.positions._buffer_name, 'float32')
+    shm_manager_h.positions.data = arr*2
+    npt.assert_equal(shm_manager.positions.data, arr*2)
+    shm_manager_h.cleanup()
+    shm_manager.cleanup()
+
+
+def test_shared_mem_job():
+    descriptor = {
+        'version': ipc.JOB_PROTOCOL_VERSION,
+        'layout': 'mde',
+        'steps': 10,
+        'iters_by_step': 2,
+        'buffers': {
+            'edges': {'name': 'edges', 'dtype': 'int64', 'shape': [3, 2]}},
+        'parameters': {'use_shortest_path': False},
+    }
+    job = ipc.SharedMemJob(descriptor, capacity=256)
+    job_copy = ipc.SharedMemJob(buffer_name=job._buffer_name)
+    assert job_copy.descriptor == descriptor
+
+    descriptor['steps'] = 20
+    assert job.write(descriptor)
+    assert job_copy.descriptor['steps'] == 20
+    descriptor['parameters']['names'] = ['x'*64]*8
+    assert not job.write(descriptor)
+    assert job_copy.descriptor['steps'] == 20
+
+    job._buffer.buf[0:4] = b'XXXX'
+    with npt.assert_raises(ValueError):
+        job_copy.descriptor
+    job_copy.cleanup()
+    job.cleanup()
+
+    arr = ipc.SharedMemArrayManager(
+        dtype='float32', data=np.zeros((5, 3)))
+    npt.assert_equal(
+        ipc.buffer_descriptor(arr),
+        {'name': arr._buffer_name, 'dtype': 'float32', 'shape': [5, 3]})
+    arr.cleanup()
+
+
+def test_shared_mem_command_ring():
+    ring = ipc.SharedMemCommandRing(num_slots=2, slot_size=64)
+    ring_copy = ipc.SharedMemCommandRing(buffer_name=ring._buffer_name)
+    assert ring_copy._num_rows == 2
+    assert ring_copy.pop() is None
+
+    assert ring.push('pause')
+    assert ring.push('set_parameter', name='gravity', value=2.)
+    assert not ring.push('resume')
+    assert len(ring_copy) == 2
+    assert ring_copy.pop() == {'command': 'pause'}
+    assert ring.push('resume')
+    assert ring_copy.pop_all() == [
+        {'command': 'set_parameter', 'name': 'gravity', 'value': 2.},
+        {'command': 'resume'},
+    ]
+    assert len(ring) == 0
+    with npt.assert_raises(ValueError):
+        ring.push('pin_nodes', nodes=list(range(100)))
+
+    manager = ipc.ShmManagerMultiArrays()
+    manager.add_command_ring('commands', num_slots=4)
+    npt.assert_equal(
+        ipc.buffer_descriptor(manager.commands)['shape'], [4, 8192])
+    manager.cleanup()
+    ring_copy.cleanup()
+    ring.cleanup()
+
+
+def test_shm_manager_replace_array():
+    shm_manager = ipc.ShmManagerMultiArrays()
+    shm_manager.add_array('edges', np.zeros((4, 2)), 'int64', capacity=6)
+    loaded = ipc.SharedMemArrayManager(
+        buffer_name=shm_manager.edges._buffer_name, dtype='int64')
+    shm_manager.add_multi_buffer('positions', np.zeros((4, 3)), 'float32')
+
+    edges = np.arange(12).reshape(6, 2)
+    name = shm_manager.edges._buffer_name
+    assert not shm_manager.replace_array('edges', edges)
+    assert shm_manager.edges._buffer_name == name
+    npt.assert_equal(shm_manager.edges.data, edges)
+    npt.assert_equal(loaded.data, edges)
+    assert shm_manager.replace_array('edges', np.ones((7, 2)))
+    assert shm_manager.edges._capacity == 12
+    npt.assert_equal(loaded.data, np.ones((7, 2)))
+    loaded.cleanup()
+
+    # the capacity is doubled when the resource is too small
+    positions = np.ones((5, 3))
+    assert shm_manager.replace_array('positions', positions)
+    assert shm_manager.positions._capacity == 8
+    npt.assert_equal(shm_manager.positions.data, positions)
+    assert not shm_manager.replace_array('positions', np.ones((8, 3)))
+    assert not shm_manager.replace_array('positions', np.ones((2, 3)))
+    loaded = ipc.SharedMemMultiBuffer(
+        buffer_name=shm_manager.positions._buffer_name, dtype='float32')
+    assert loaded.data.shape == (2, 3)
+    loaded.cleanup()
+    shm_manager.cleanup()
+
+
+@pytest.mark.skipif(
+    not ipc.NOTIFY_SUPPORTED, reason='named pipes are not supported')
+def test_frame_notifier():
+    notifier = ipc.FrameNotifier()
+    assert notifier.wait(0) == b''
+    writer = ipc.FrameNotifier(notifier.path)
+    assert writer.notify()
+    assert writer.notify()
+    assert notifier.wait(1) == ipc.FRAME_EVENT*2
+    assert notifier.poll() == b''
+
+    def notify_later():
+        time.sleep(.1)
+        writer.notify(ipc.END_EVENT)
+
+    thread = threading.Thread(target=notify_later)
+    thread.start()
+    assert notifier.wait(10) == ipc.END_EVENT
+    thread.join()
+    # the read end stays open, so the waits don't see an end of file
+    writer.cleanup()
+    assert notifier.wait(.05) == b''
+    with npt.assert_raises(ValueError):
+        writer.wait(0)
+    path = notifier.path
+    notifier.cleanup()
+    assert not os.path.exists(path)
@@ -0,0 +1,127 @@
+import time
+
+import networkx as nx
+import numpy as np
+import numpy.testing as npt
+
+from helios import NetworkDraw
+from helios.layouts import ForceAtlas2
+from helios.layouts.forceatlas2cpu import ForceAtlas2Engine, QuadTree
+from helios.layouts.forceatlas2cpu import NUMBA_AVAILABLE, repulsion_forces
+from helios.layouts.workers import LayoutWorkerPool
+
+
+def _exact_repulsion(positions, masses):
+    delta = positions[:, np.newaxis, :] - positions[np.newaxis, :, :]
+    dist2 = (delta**2).sum(axis=2)
+    np.fill_diagonal(dist2, np.inf)
+    factor = masses[:, np.newaxis]*masses[np.newaxis, :]/dist2
+    return (factor[:, :, np.newaxis]*delta).sum(axis=1)
+
+
+def test_barnes_hut_repulsion():
+    rng = np.random.default_rng(0)
+    positions = rng.normal(size=(500, 2))
+    masses = rng.integers(1, 5, 500).astype('float64')
+    tree = QuadTree(positions, masses)
+    npt.assert_almost_equal(tree.masses[0], masses.sum())
+    npt.assert_almost_equal(
+        tree.centers_of_mass[0], np.average(positions, 0, masses))
+
+    exact = _exact_repulsion(positions, masses)
+    scale = np.abs(exact).max()
+    backends = [False, True] if NUMBA_AVAILABLE else [False]
+    for use_numba in backends:
+        forces = repulsion_forces(
+            positions, masses, theta=0, chunk_size=128,
+            use_numba=use_numba)
+        npt.assert_almost_equal(forces/scale, exact/scale)
+        forces = repulsion_forces(
+            positions, masses, theta=.5, chunk_size=128,
+            use_numba=use_numba)
+        assert np.abs(forces - exact).max()/scale < .02
+
+
+def test_forceatlas2_engine():
+    s = 50
+    probs = np.array([[.5, .01, .01], [.01, .5, .01], [.01, .01, .5]])
+    g = nx.stochastic_block_model([s, s, s], probs, seed=0)
+    edges = np.array(g.edges())
+    positions = np.random.default_rng(0).normal(size=(3*s, 2))
+    engine = ForceAtlas2Engine(edges, 3*s)
+    engine.iterate(positions, 200)
+    assert np.all(np.isfinite(positions))
+    blocks = np.repeat([0, 1, 2], s)
+    centers = np.array([positions[blocks == i].mean(0) for i in range(3)])
+    spread = max(positions[blocks == i].std() for i in range(3))
+    gaps = [
+        np.linalg.norm(centers[i] - centers[j])
+        for i, j in [(0, 1), (0, 2), (1, 2)]]
+    assert min(gaps) > spread
+
+
+def test_forceatlas2_cpu_backend():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [0, 2]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 2)), edges=edges)
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        layout = ForceAtlas2(
+            edges, network_draw, backend='cpu', worker_pool=pool)
+        assert layout._layout_name == 'forceatlas2cpu'
+        layout.start(0, 10, 5)
+        assert layout.job.wait(timeout=60)
+        assert layout.job.error is None
+        assert layout._shm_manager.info._repr[1] == 1
+        assert layout._shm_manager.info._repr[2] == 9
+        layout.stop()
+        layout.cleanup()
+
+
+def test_forceatlas2_frame_notifier():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [0, 2]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 2)), edges=edges)
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        layout = ForceAtlas2(
+            edges, network_draw, backend='cpu', worker_pool=pool)
+        layout.start(1, 10, 5, notify=True)
+        assert layout._notifier is not None
+        assert layout._wait_thread is not None
+        # the waiting thread draws the last frame and stops the layout
+        assert layout.job.wait(timeout=60)
+        start = time.time()
+        while layout._started:
+            assert time.time() - start < 10
+            time.sleep(.01)
+        assert layout._wait_thread is None
+        assert layout._last_generation == \
+            layout._shm_manager.positions.generation
+        npt.assert_almost_equal(
+            network_draw.positions[:, 0:2],
+            layout._shm_manager.positions.data)
+        layout.cleanup()
+        assert layout._notifier is None
+
+
+def test_forceatlas2_offscreen_draw():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [0, 2]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 2)), edges=edges,
+        offscreen=True, window_size=(64, 64))
+    assert network_draw.offscreen
+    assert network_draw.iren is None
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        layout = ForceAtlas2(
+            edges, network_draw, backend='cpu', worker_pool=pool)
+        # there is no interactor, the frames are drawn without it
+        layout.start(1, 10, 5, without_iren_start=False)
+        assert layout._id_timer is None
+        assert layout.job.wait(timeout=60)
+        start = time.time()
+        while layout._started:
+            assert time.time() - start < 10
+            time.sleep(.01)
+        npt.assert_almost_equal(
+            network_draw.positions[:, 0:2],
+            layout._shm_manager.positions.data)
+        layout.cleanup()
@@ -0,0 +1,72 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from helios.core.network import CSRNetwork, edges_and_weights
+
+
+def test_csr_network_neighbors():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [0, 3]])
+    net = CSRNetwork(edges)
+    assert net.vertex_count() == 4
+    assert net.edge_count() == 4
+    npt.assert_equal(net.degrees(), [2, 2, 2, 2])
+    npt.assert_equal(np.sort(net.neighbors_of_vertex(0)), [1, 3])
+
+    neighbors, offsets = net.neighbors_of_vertices([1, 3])
+    npt.assert_equal(offsets, [0, 2, 4])
+    npt.assert_equal(np.sort(neighbors[0:2]), [0, 2])
+    npt.assert_equal(np.sort(neighbors[2:4]), [0, 2])
+
+    indptr, indices, edge_ids = net.csr()
+    npt.assert_equal(indptr, [0, 2, 4, 6, 8])
+    npt.assert_equal(np.sort(edge_ids[indptr[2]:indptr[3]]), [1, 2])
+
+    directed = CSRNetwork(edges, directed=True)
+    npt.assert_equal(directed.degrees(), [2, 1, 1, 0])
+    npt.assert_equal(directed.in_degrees(), [0, 1, 1, 2])
+
+    with pytest.raises(ValueError):
+        CSRNetwork(edges, num_vertices=2)
+
+
+def test_csr_network_batch_updates():
+    net = CSRNetwork(
+        np.array([[0, 1], [1, 2]]), weights=np.array([2., 3.]))
+    net.add_edges(np.array([[2, 3]]), weight=np.array([4.]))
+    net.add_edges(np.array([[3, 4], [4, 0]]))
+    assert net.edge_count() == 5
+    assert net.vertex_count() == 5
+    npt.assert_equal(net.weights(), [2., 3., 4., 1., 1.])
+    npt.assert_equal(net.degrees(), [2, 2, 2, 2, 2])
+
+    net.delete_edges([0])
+    npt.assert_equal(net.edges(), [[1, 2], [2, 3], [3, 4], [4, 0]])
+    npt.assert_equal(net.weights(), [3., 4., 1., 1.])
+
+    vertex_map = net.delete_vertices([2])
+    npt.assert_equal(vertex_map, [0, 1, -1, 2, 3])
+    assert net.vertex_count() == 4
+    npt.assert_equal(net.edges(), [[2, 3], [3, 0]])
+    npt.assert_equal(net.weights(), [1., 1.])
+    npt.assert_equal(net.degrees(), [1, 0, 1, 2])
+
+    new_vertices = net.add_vertices(2)
+    npt.assert_equal(new_vertices, [4, 5])
+    npt.assert_equal(net.degrees(), [1, 0, 1, 2, 0, 0])
+
+
+def test_edges_and_weights():
+    edges = np.array([[0, 1], [1, 2]])
+    weights = np.array([.5, .1])
+    arr, w = edges_and_weights(edges)
+    assert arr is edges
+    assert w is None
+
+    net = CSRNetwork(edges, weights=weights)
+    arr, w = edges_and_weights(net)
+    npt.assert_equal(arr, edges)
+    npt.assert_equal(w, weights)
+
+    arr, w = edges_and_weights(net, np.ones(2))
+    npt.assert_equal(w, [1, 1])
@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+import numpy.testing as npt
+
+from helios import NetworkDraw
+from helios.layouts import ForceAtlas2, LayoutWorkerPool
+from helios.layouts.codecs import get_codec
+from helios.layouts.recording import TrajectoryFile
+
+
+def test_trajectory_file(tmp_path):
+    path = os.path.join(tmp_path, 'trajectory.hlst')
+    writer = TrajectoryFile(
+        path, mode='w+', num_nodes=4, dimension=2, max_frames=3,
+        dtype='float16')
+    reader = TrajectoryFile(path)
+    assert reader.dtype == np.float16
+    assert reader.frame_shape == (4, 2)
+    assert reader.max_frames == 3
+    assert len(reader) == 0
+
+    frames = np.random.normal(size=(4, 4, 2))
+    for frame in frames[0:3]:
+        assert writer.append(frame)
+    assert not writer.append(frames[3])
+    assert len(reader) == 3
+    npt.assert_allclose(reader.frame(1), frames[1], atol=1e-2)
+    npt.assert_allclose(reader.frames, frames[0:3], atol=1e-2)
+    npt.assert_raises(IndexError, reader.frame, 3)
+    npt.assert_raises(ValueError, reader.write_frame, 0, frames[0])
+    writer.close()
+    reader.close()
+    assert os.path.getsize(path) == 64 + 3*4*2*2
+
+
+def test_record_positions_into_file(tmp_path):
+    path = os.path.join(tmp_path, 'trajectory.hlst')
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [0, 2]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 2)), edges=edges)
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        layout = ForceAtlas2(
+            edges, network_draw, backend='cpu', worker_pool=pool)
+        layout.start(0, 20, 2, record_path=path, record_window=4)
+        assert layout.job.wait(timeout=60)
+        assert layout.job.error is None
+        # only the window is kept in the shared memory
+        assert layout._shm_manager.snapshots_positions.data.shape == (16, 2)
+        recording = layout.recording
+        assert len(recording) == 20
+        npt.assert_equal(
+            recording.frame(19), layout._shm_manager.positions.data)
+        npt.assert_equal(layout._snapshot(18), recording.frame(18))
+        npt.assert_equal(layout._snapshot(0), recording.frame(0))
+        layout.update()
+        npt.assert_allclose(
+            network_draw.positions[:, 0:2], recording.frame(0))
+        layout.stop()
+        layout.cleanup()
+
+
+def test_record_into_file_with_delta_codec(tmp_path):
+    path = os.path.join(tmp_path, 'trajectory.hlst')
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [0, 2]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 2)), edges=edges)
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        layout = ForceAtlas2(
+            edges, network_draw, backend='cpu', worker_pool=pool)
+        layout.start(
+            0, 40, 2, record_path=path, snapshot_codec='delta16')
+        assert layout.job.wait(timeout=60)
+        assert layout.job.error is None
+        codec = layout._snapshot_codec
+        assert layout._shm_manager.snapshots_positions.data.shape[0] == \
+            (16 + codec.max_chain)*codec.frame_nbytes
+        recording = layout.recording
+        expected = [recording.frame(step) for step in range(25, 40)]
+
+        def from_file(step):
+            raise AssertionError(f'The frame {step} was read from the file')
+
+        # the recent frames are decoded from the shared memory window
+        recording.frame = from_file
+        for step, frame in zip(range(25, 40), expected):
+            npt.assert_allclose(layout._snapshot(step), frame, atol=1e-3)
+        layout.stop()
+        layout.cleanup()
+
+
+def test_snapshot_codecs():
+    rng = np.random.default_rng(0)
+    frames = np.cumsum(
+        rng.normal(scale=.01, size=(20, 50, 3)), axis=0).astype('float32')
+    frames += rng.normal(size=(1, 50, 3)).astype('float32')
+    tolerances = {
+        'float32': 0, 'float16': 1e-2, 'uint16': 1e-3, 'uint8': 5e-2,
+        'delta16': 1e-3, 'delta8': 5e-2}
+    for name, tolerance in tolerances.items():
+        codec = get_codec(name, (50, 3))
+        assert codec.frame_nbytes <= 50*3*4
+        # a ring with 8 frames
+        storage = np.zeros((8, codec.frame_nbytes), dtype='uint8')
+        for step, frame in enumerate(frames):
+            storage[step % 8] = codec.encode(frame, step)
+        for step in range(20 - 8 + codec.max_chain, 20):
+            decoded = codec.decode(storage, step)
+            assert decoded.dtype == np.float32
+            npt.assert_allclose(decoded, frames[step], atol=tolerance)
+
+    codec = get_codec('delta8', (50, 3), keyframe_interval=4)
+    assert codec.parameters() == {'name': 'delta8', 'keyframe_interval': 4}
+    npt.assert_raises(ValueError, get_codec, 'xor', (50, 3))
+
+
+def test_record_positions_with_codec():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [0, 2]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 2)), edges=edges)
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        layout = ForceAtlas2(
+            edges, network_draw, backend='cpu', worker_pool=pool)
+        layout.start(
+            0, 10, 2, record_positions=True, snapshot_codec='delta16')
+        assert layout.job.wait(timeout=60)
+        assert layout.job.error is None
+        snapshots = layout._shm_manager.snapshots_positions.data
+        assert snapshots.dtype == np.uint8
+        npt.assert_allclose(
+            layout._snapshot(9), layout._shm_manager.positions.data,
+            atol=1e-3)
+        layout.stop()
+
+        layout.start(0, 10, 2, record_positions=True)
+        assert layout.job.wait(timeout=60)
+        npt.assert_equal(
+            layout._snapshot(9), layout._shm_manager.positions.data)
+        layout.stop()
+        layout.cleanup()
@@ -0,0 +1,62 @@
+import numpy as np
+import numpy.testing as npt
+
+from helios import NetworkDraw
+from helios.layouts import ForceAtlas2, LayoutWorkerPool, TrajectoryPlayer
+
+
+def test_trajectory_player():
+    frames = np.arange(5, dtype='float32')[:, None, None]*np.ones((5, 4, 3))
+    network_draw = NetworkDraw(positions=frames[0], edges=None)
+    player = TrajectoryPlayer(network_draw, frames, frame_rate=2)
+    assert player.num_frames == 5
+
+    player.seek(1.25)
+    npt.assert_allclose(player.positions_at(player.position), 1.25)
+    assert player.tick()
+    npt.assert_allclose(network_draw.positions, 1.25)
+    # nothing changed since the last tick
+    assert not player.tick()
+
+    # the playback rate doesn't depend on the number of ticks
+    player.play(fps=0)
+    player.tick(now=10)
+    player.tick(now=10.5)
+    player.tick(now=11)
+    assert player.position == 3.25
+    npt.assert_allclose(network_draw.positions, 3.25)
+    player.tick(now=12)
+    assert player.position == 1.25
+
+    player.loop = False
+    player.tick(now=15)
+    assert player.position == 4
+    assert not player.playing
+
+    player.interpolate = False
+    npt.assert_allclose(player.positions_at(2.6), 3)
+    player.seek(100)
+    assert player.position == 4
+    player.stop()
+
+
+def test_layout_replay():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [0, 2]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 2)), edges=edges)
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        layout = ForceAtlas2(
+            edges, network_draw, backend='cpu', worker_pool=pool)
+        assert layout.recorded_frames == 0
+        layout.start(0, 10, 2, record_positions=True)
+        assert layout.job.wait(timeout=60)
+        assert layout.recorded_frames == 10
+        player = layout.replay(frame_rate=5)
+        assert player.num_frames == 10
+        player.seek(9)
+        player.tick()
+        npt.assert_allclose(
+            network_draw.positions[:, 0:2],
+            layout._shm_manager.positions.data)
+        layout.stop()
+        layout.cleanup()
@@ -0,0 +1,79 @@
+import numpy as np
+import numpy.testing as npt
+
+from helios.core.spatial import SpatialIndex, points_in_polygon
+
+
+def _brute_radius(positions, point, radius):
+    distances = np.linalg.norm(positions - point, axis=1)
+    return np.flatnonzero(distances <= radius)
+
+
+def test_points_in_polygon():
+    square = np.array([[0, 0], [2, 0], [2, 2], [0, 2]])
+    points = np.array([[1, 1], [3, 1], [-1, 1], [1.9, 0.1]])
+    npt.assert_equal(
+        points_in_polygon(points, square), [True, False, False, True])
+    triangle = np.array([[0, 0], [4, 0], [0, 4]])
+    npt.assert_equal(
+        points_in_polygon([[1, 1], [3, 3]], triangle), [True, False])
+
+
+def test_spatial_index_queries():
+    rng = np.random.default_rng(0)
+    for dimension in [2, 3]:
+        positions = rng.normal(size=(2000, dimension))
+        index = SpatialIndex(positions)
+        assert index.num_nodes == 2000 and index.dimension == dimension
+
+        lower, upper = -np.full(dimension, .5), np.full(dimension, .8)
+        expected = np.flatnonzero(
+            np.all((positions >= lower) & (positions <= upper), axis=1))
+        npt.assert_equal(index.query_box(lower, upper), expected)
+        npt.assert_equal(index.query_box(upper, lower), expected)
+
+        point = np.full(dimension, .2)
+        nodes, distances = index.query_radius(point, .4)
+        npt.assert_equal(
+            np.sort(nodes), _brute_radius(positions, point, .4))
+        assert np.all(np.diff(distances) >= 0)
+
+        nodes, distances = index.nearest(point, k=10)
+        all_distances = np.linalg.norm(positions - point, axis=1)
+        npt.assert_equal(nodes, np.argsort(all_distances)[0:10])
+        npt.assert_almost_equal(distances, np.sort(all_distances)[0:10])
+
+        # far from all the nodes
+        far = np.full(dimension, 100.)
+        assert index.pick(far, 1.) == -1
+        assert index.nearest(far, k=3)[0].shape == (3, )
+        assert index.pick(positions[7], 1e-9) == 7
+
+    polygon = np.array([[-1, -1], [1, -1], [0, 1]])
+    expected = np.flatnonzero(points_in_polygon(positions[:, 0:2], polygon))
+    npt.assert_equal(index.query_polygon(polygon), expected)
+
+
+def test_spatial_index_update():
+    rng = np.random.default_rng(1)
+    positions = rng.uniform(-1, 1, size=(5000, 2))
+    index = SpatialIndex(positions, max_moved=100)
+    # a few nodes move to other cells
+    positions[0:50] = rng.uniform(-1, 1, size=(50, 2))
+    assert not index.update(positions)
+    assert len(index._moved) > 0
+    point = np.array([.1, -.2])
+    nodes, _ = index.query_radius(point, .3)
+    npt.assert_equal(np.sort(nodes), _brute_radius(positions, point, .3))
+    npt.assert_equal(
+        index.query_box([-.5, -.5], [0, 0]),
+        np.flatnonzero(np.all(
+            (positions >= -.5) & (positions <= 0), axis=1)))
+
+    # too many nodes moved
+    positions[:] = rng.uniform(-1, 1, size=(5000, 2))
+    assert index.update(positions)
+    assert len(index._moved) == 0
+    # the layout leaves the bounds of the grid
+    assert index.update(positions + 10)
+    assert index.pick(positions[3] + 10, 1e-9) == 3
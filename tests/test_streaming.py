@@ -0,0 +1,148 @@
+import os
+import signal
+import time
+
+import numpy as np
+import numpy.testing as npt
+
+from helios import NetworkDraw
+from helios.core.network import CSRNetwork
+from helios.layouts import ForceAtlas2, HeliosFr, LayoutWorkerPool, MDE
+from helios.layouts.streaming import warm_start_positions
+
+
+def test_warm_start_positions():
+    network = CSRNetwork(
+        np.array([[0, 1], [1, 2], [2, 3], [3, 4]]), num_vertices=6)
+    positions = np.full((6, 2), np.nan)
+    positions[0:2] = [[0, 0], [1, 0]]
+    positions = warm_start_positions(network, positions, seed=0)
+    assert not np.isnan(positions).any()
+    # the chain 2-3-4 is placed near the node 1
+    for node in [2, 3, 4]:
+        assert np.linalg.norm(positions[node] - positions[1]) < 1
+    npt.assert_equal(positions[0:2], [[0, 0], [1, 0]])
+
+
+def test_heliosfr_streaming():
+    edges = np.array([[0, 1], [1, 2], [2, 0]])
+    positions = np.random.normal(size=(3, 3))
+    network_draw = NetworkDraw(positions=positions, edges=edges)
+    layout = HeliosFr(edges, network_draw)
+    layout.steps(10)
+    before = np.array(layout._positions)
+
+    nodes = layout.add_nodes(1)
+    npt.assert_equal(nodes, [3])
+    layout.add_edges([[2, 3], [3, 4]], commit=False)
+    assert layout.network.vertex_count() == 5
+    layout.commit()
+    assert layout.network is None
+    assert network_draw.positions.shape[0] == 5
+    assert network_draw.edges.edges.shape[0] == 5
+    npt.assert_allclose(layout._positions[0:3], before, rtol=1e-5)
+    layout.steps(10)
+
+    with layout.batch():
+        vertex_map = layout.remove_nodes([0])
+        assert network_draw.positions.shape[0] == 5
+    npt.assert_equal(vertex_map, [-1, 0, 1, 2, 3])
+    assert network_draw.positions.shape[0] == 4
+    npt.assert_equal(
+        layout._edges, [[0, 1], [1, 2], [2, 3]])
+    layout.remove_edges([2], commit=True)
+    assert len(layout._edges) == 2
+    layout.steps(10)
+    assert not np.isnan(layout._positions).any()
+
+
+def _wait_network_version(layout, version, timeout=60):
+    start = time.time()
+    while layout._shm_manager.info._repr[4] != version:
+        assert time.time() - start < timeout
+        layout._draw_last_frame()
+        time.sleep(.01)
+
+
+def test_forceatlas2_streaming():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 2)), edges=edges)
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        layout = ForceAtlas2(
+            edges, network_draw, backend='cpu', worker_pool=pool)
+        layout.start(0, 100000, 5)
+        job = layout.job
+        with layout.batch():
+            layout.add_edges([[3, 4], [4, 5]], weights=[1, 2])
+        # the running server follows the new network
+        _wait_network_version(layout, 1)
+        assert layout._started
+        assert layout.job is job
+        assert layout._shm_manager.positions.data.shape == (6, 2)
+        assert layout._shm_manager.edges.data.shape == (6, 2)
+        npt.assert_equal(
+            layout._shm_manager.weights.data, [1, 1, 1, 1, 1, 2])
+
+        # modifications made before the server follows the previous
+        # version are composed and sent afterwards
+        process = pool._workers[0].process
+        os.kill(process.pid, signal.SIGSTOP)
+        try:
+            layout.remove_nodes([0], commit=True)
+            assert layout._pending_network is None
+            layout.add_edges([[0, 4]], commit=True)
+            layout.remove_nodes([4], commit=True)
+            npt.assert_equal(layout._pending_network[3], [0, 1, 2, 3, -1])
+            assert not layout._draw_last_frame()
+        finally:
+            os.kill(process.pid, signal.SIGCONT)
+        _wait_network_version(layout, 3)
+        assert layout._pending_network is None
+        assert layout.job is job
+        npt.assert_equal(
+            layout._shm_manager.vertex_map.data, [0, 1, 2, 3, -1])
+        generation = layout._shm_manager.positions.generation
+        start = time.time()
+        while layout._shm_manager.positions.generation <= generation:
+            assert time.time() - start < 60
+            time.sleep(.01)
+        assert network_draw.positions.shape[0] == 4
+        assert layout._shm_manager.positions.data.shape == (4, 2)
+        assert not np.isnan(layout._shm_manager.positions.data).any()
+        layout.stop()
+        assert job.error is None
+        descriptor = layout._job_descriptor(10, 5)
+        assert descriptor['buffers']['positions']['shape'] == [4, 2]
+        assert descriptor['buffers']['edges']['shape'] == [3, 2]
+
+        layout.start(0, 10, 5)
+        assert layout.job.wait(timeout=60)
+        assert layout.job.error is None
+        assert not np.isnan(layout._shm_manager.positions.data).any()
+        layout.stop()
+        layout.cleanup()
+
+
+def test_mde_streaming():
+    edges = np.array([[0, 1], [1, 2], [2, 3], [3, 0]])
+    network_draw = NetworkDraw(
+        positions=np.random.normal(size=(4, 3)), edges=edges)
+    layout = MDE(edges, network_draw, use_shortest_path=True)
+    layout.start(0, 100000, 1)
+    process = layout._pserver
+    with layout.batch():
+        nodes = layout.add_nodes(2)
+        layout.add_edges([[0, nodes[0]], [nodes[0], nodes[1]]])
+    _wait_network_version(layout, 1)
+    assert layout._pserver is process
+    generation = layout._shm_manager.positions.generation
+    start = time.time()
+    while layout._shm_manager.positions.generation <= generation + 1:
+        assert time.time() - start < 60
+        time.sleep(.01)
+    assert layout._server_running()
+    assert layout._shm_manager.positions.data.shape == (6, 3)
+    assert not np.isnan(layout._shm_manager.positions.data).any()
+    layout.stop()
+    layout.cleanup()
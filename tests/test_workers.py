@@ -0,0 +1,172 @@
+import os
+import signal
+
+import numpy as np
+import numpy.testing as npt
+import time
+import pymde
+
+from helios import NetworkDraw
+from helios.core import instrumentation
+from helios.layouts import MDE
+from helios.layouts.ipc_tools import SharedMemJob, JOB_PROTOCOL_VERSION
+from helios.layouts.workers import LayoutWorkerPool
+
+
+class SleepServer:
+    def __init__(self, delay=0):
+        self._delay = delay
+
+    def start(self, steps, iters_by_step):
+        time.sleep(self._delay)
+
+
+def _job(layout, delay=0):
+    return SharedMemJob({
+        'version': JOB_PROTOCOL_VERSION,
+        'layout': layout,
+        'steps': 1,
+        'iters_by_step': 1,
+        'buffers': {},
+        'parameters': {'delay': delay},
+    })
+
+
+def test_worker_pool_jobs():
+    sleep_server = f'{__name__}:SleepServer'
+    with LayoutWorkerPool(num_workers=1, preload=()) as pool:
+        assert pool.wait_ready(timeout=60)
+        process = pool._workers[0].process
+        job_shm = _job(sleep_server)
+        job = pool.submit(job_shm._buffer_name)
+        invalid_shm = _job('invalid_layout')
+        second_job = pool.submit(invalid_shm._buffer_name)
+        assert job.wait(timeout=10)
+        assert job.error is None
+        assert second_job.wait(timeout=10)
+        assert 'ValueError' in second_job.error
+        # the same process should be reused between jobs
+        assert pool._workers[0].process is process
+
+        sleep_shm = _job(sleep_server, 60)
+        job = pool.submit(sleep_shm._buffer_name)
+        time.sleep(.2)
+        job.cancel()
+        assert job.done()
+        assert job.error == 'cancelled'
+        last_shm = _job(sleep_server)
+        assert pool.submit(last_shm._buffer_name).wait(timeout=60)
+        for shm in [job_shm, invalid_shm, sleep_shm, last_shm]:
+            shm.cleanup()
+
+
+def test_mde_worker_pool():
+    n_items = 20
+    edges = pymde.all_edges(n_items).cpu().numpy()
+    centers = np.random.normal(size=(n_items, 2))
+    network = NetworkDraw(positions=centers, edges=edges)
+    with LayoutWorkerPool(num_workers=1) as pool:
+        mde = MDE(
+            edges, network, use_shortest_path=False,
+            constraint_name='standardized', worker_pool=pool)
+        for steps in [5, 10]:
+            mde.start(0, steps, 10)
+            assert mde.job.wait(timeout=60)
+            assert mde.job.error is None
+            assert mde._shm_manager.info._repr[1] == 1
+            assert mde._shm_manager.info._repr[2] == steps - 1
+            assert mde._check_and_sync() is False
+            assert not mde._started
+
+        # a running layout should stop gracefully
+        mde.start(0, 100000, 1)
+        time.sleep(.5)
+        mde.stop()
+        assert mde.job.done()
+        assert mde.job.error is None
+        mde.cleanup()
+
+
+def test_mde_live_commands():
+    n_items = 20
+    edges = pymde.all_edges(n_items).cpu().numpy()
+    centers = np.random.normal(size=(n_items, 2))
+    network = NetworkDraw(positions=centers, edges=edges)
+    with LayoutWorkerPool(num_workers=1) as pool:
+        mde = MDE(
+            edges, network, use_shortest_path=False, worker_pool=pool)
+        mde.pin_nodes([0, 1], [[5, 5], [-5, -5]])
+        mde.start(0, 100000, 1)
+        start = time.time()
+        while mde._shm_manager.info._repr[2] < 2:
+            assert time.time() - start < 60
+            time.sleep(.01)
+
+        assert mde.pause()
+        start = time.time()
+        while not mde.paused:
+            assert time.time() - start < 10
+            time.sleep(.01)
+        step = mde._shm_manager.info._repr[2]
+        time.sleep(.2)
+        assert mde._shm_manager.info._repr[2] == step
+        positions = mde._shm_manager.positions.data
+        npt.assert_almost_equal(positions[0:2], [[5, 5], [-5, -5]])
+
+        mde.set_parameter('iters_by_step', 2)
+        mde.unpin_nodes([1])
+        mde.resume()
+        start = time.time()
+        while mde._shm_manager.info._repr[2] < step + 2:
+            assert time.time() - start < 10
+            time.sleep(.01)
+        assert not mde.paused
+        mde.stop()
+        assert mde.job.error is None
+        npt.assert_almost_equal(
+            mde._shm_manager.positions.data[0], [5, 5])
+        mde.cleanup()
+
+
+def test_mde_server_summary():
+    n_items = 20
+    edges = pymde.all_edges(n_items).cpu().numpy()
+    centers = np.random.normal(size=(n_items, 2))
+    network = NetworkDraw(positions=centers, edges=edges)
+    with LayoutWorkerPool(num_workers=1) as pool:
+        mde = MDE(
+            edges, network, use_shortest_path=False, worker_pool=pool)
+        instrumentation.enable()
+        try:
+            mde.start(0, 5, 2)
+        finally:
+            instrumentation.disable()
+        assert mde.job.wait(timeout=60)
+        summary = mde.server_summary()
+        assert summary['counters']['server.steps']['count'] == 5
+        assert summary['timers']['server.update']['count'] == 5
+        mde.stop()
+        mde.cleanup()
+
+
+def test_mde_stop_hung_server():
+    n_items = 20
+    edges = pymde.all_edges(n_items).cpu().numpy()
+    centers = np.random.normal(size=(n_items, 2))
+    network = NetworkDraw(positions=centers, edges=edges)
+    mde = MDE(edges, network, use_shortest_path=False)
+    for timeout, max_duration in [(0, .3), (.5, 2)]:
+        mde.start(0, 100000, 1)
+        start = time.time()
+        while mde._shm_manager.info._repr[2] < 1:
+            assert time.time() - start < 60
+            time.sleep(.01)
+        process = mde._pserver
+        # a hung server doesn't consume the stop command
+        os.kill(process.pid, signal.SIGSTOP)
+        start = time.time()
+        mde.stop(timeout=timeout)
+        assert time.time() - start < max_duration
+        assert process.poll() is not None
+        assert not mde._started
+    mde.cleanup()